@@ -0,0 +1,400 @@
+"""
+Session-affinity front dispatcher for multi-process serving.
+
+The front process spawns N workers, each running ``api.main:app`` on its own
+Unix socket, and routes every request to a worker chosen by consistent-hashing
+the request's session_id. A session's turns therefore always land on the same
+worker and its in-process memory stays valid, while all cores are used.
+
+    client ──► AffinityDispatcher (public port)
+                 │  hash(session_id) on a ring of virtual nodes
+                 ├──► worker 0  (uvicorn api.main:app --uds ...)
+                 ├──► worker 1
+                 └──► worker N-1
+
+Workers are health-checked through /health/live; a dead or unhealthy worker
+is taken off the ring (only its sessions move), restarted, and re-added once
+it answers again. On SIGTERM the front server stops accepting and finishes
+in-flight requests, then workers are sent SIGTERM so they drain in turn.
+"""
+import os
+import re
+import sys
+import json
+import uuid
+import signal
+import asyncio
+import hashlib
+import logging
+import tempfile
+import subprocess
+from bisect import bisect
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+import httpx
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).parent.parent
+
+# Hop-by-hop headers are per-connection and must not be forwarded;
+# content-length is recomputed because the body may be rewritten
+_HOP_BY_HOP = {
+    b"connection", b"keep-alive", b"proxy-authenticate", b"proxy-authorization",
+    b"te", b"trailers", b"transfer-encoding", b"upgrade", b"content-length",
+}
+# Client-supplied forwarding headers are dropped: workers trust the one the dispatcher sets
+_BRANCH_ID = b"x-branch-session-id"   # api.routers.chat.BRANCH_ID_HEADER
+_UNTRUSTED = {b"x-forwarded-for", _BRANCH_ID}
+_SESSION_PATH_RE = re.compile(r"/chat/(?:history|session)/([^/?]+)")
+_MAX_ROUTING_BODY = 64 * 1024   # only JSON bodies up to this size are inspected
+
+
+class HashRing:
+    """Consistent-hash ring with virtual nodes; removing a node only moves its keys."""
+
+    def __init__(self, replicas: int = 128):
+        self._replicas = replicas
+        self._keys: List[int] = []
+        self._nodes: Dict[int, int] = {}
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+    def add(self, node: int):
+        for r in range(self._replicas):
+            h = self._hash(f"{node}:{r}")
+            if h not in self._nodes:
+                self._nodes[h] = node
+        self._keys = sorted(self._nodes)
+
+    def remove(self, node: int):
+        self._nodes = {h: n for h, n in self._nodes.items() if n != node}
+        self._keys = sorted(self._nodes)
+
+    def nodes(self) -> List[int]:
+        return sorted(set(self._nodes.values()))
+
+    def get(self, key: str) -> Optional[int]:
+        if not self._keys:
+            return None
+        idx = bisect(self._keys, self._hash(key)) % len(self._keys)
+        return self._nodes[self._keys[idx]]
+
+
+class WorkerProcess:
+    """One ``api.main:app`` uvicorn process listening on a Unix socket."""
+
+    def __init__(self, index: int, socket_dir: str):
+        self.index = index
+        self.socket_path = os.path.join(socket_dir, f"worker-{index}.sock")
+        self.process: Optional[subprocess.Popen] = None
+        self.client: Optional[httpx.AsyncClient] = None
+        self.failures = 0
+
+    def start(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        cmd = [
+            sys.executable, "-m", "uvicorn", "api.main:app",
+            "--uds", self.socket_path,
+            "--log-level", settings.log_level.lower(),
+            "--timeout-graceful-shutdown", str(settings.graceful_timeout_seconds),
+        ]
+        env = dict(os.environ, CONRUX_WORKER_ID=str(self.index))
+        self.process = subprocess.Popen(cmd, cwd=str(ROOT), env=env)
+        self.client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(uds=self.socket_path),
+            base_url="http://worker",
+            timeout=httpx.Timeout(None, connect=5.0),
+        )
+        self.failures = 0
+        logger.info(f"Worker {self.index} started | pid={self.process.pid}")
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    async def healthy(self) -> bool:
+        if not self.alive:
+            return False
+        try:
+            resp = await self.client.get(f"{settings.api_prefix}/health/live", timeout=2.0)
+            return resp.status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    def terminate(self):
+        if self.alive:
+            self.process.send_signal(signal.SIGTERM)
+
+    async def wait(self, timeout: float):
+        if self.process is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.to_thread(self.process.wait), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Worker {self.index} did not drain in {timeout}s — killing")
+            self.process.kill()
+        if self.client is not None:
+            await self.client.aclose()
+
+
+def session_key(
+    path: str, query: bytes, headers: Dict[bytes, bytes], body: bytes
+) -> Tuple[Optional[str], bytes]:
+    """
+    Extract the session id a request belongs to (path, query, then JSON body).
+
+    A POST to /chat without a session_id gets one assigned here, so the
+    conversation starts on the worker its later turns will hash to.
+    Returns the key and the (possibly rewritten) body.
+    """
+    match = _SESSION_PATH_RE.search(path)
+    if match:
+        return match.group(1), body
+    if query:
+        values = parse_qs(query.decode("latin-1")).get("session_id")
+        if values:
+            return values[0], body
+    content_type = headers.get(b"content-type", b"")
+    if body and b"json" in content_type and len(body) <= _MAX_ROUTING_BODY:
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return None, body
+        if not isinstance(data, dict):
+            return None, body
+        if data.get("session_id"):
+            return str(data["session_id"]), body
+        if path.endswith("/chat"):
+            data["session_id"] = str(uuid.uuid4())
+            return data["session_id"], json.dumps(data).encode()
+    return None, body
+
+
+class AffinityDispatcher:
+    """ASGI app that owns the worker pool and proxies requests by session affinity."""
+
+    def __init__(self, num_workers: int, health_interval: float = 2.0):
+        self._socket_dir = tempfile.mkdtemp(prefix="conrux-")
+        self._workers = [WorkerProcess(i, self._socket_dir) for i in range(num_workers)]
+        self._ring = HashRing()
+        self._health_interval = health_interval
+        self._health_task: Optional[asyncio.Task] = None
+
+    # ── Lifespan ──────────────────────────────────────────────────────────
+
+    async def _startup(self):
+        for worker in self._workers:
+            worker.start()
+        # Wait (up to ~30s) for workers to come up before taking traffic
+        for _ in range(150):
+            states = await asyncio.gather(*(w.healthy() for w in self._workers))
+            if all(states):
+                break
+            await asyncio.sleep(0.2)
+        for worker, ok in zip(self._workers, states):
+            if ok:
+                self._ring.add(worker.index)
+        logger.info(f"Affinity dispatcher ready | workers on ring: {self._ring.nodes()}")
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def _shutdown(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+        for worker in self._workers:
+            worker.terminate()
+        await asyncio.gather(*(
+            w.wait(settings.graceful_timeout_seconds + 5) for w in self._workers
+        ))
+        logger.info("Affinity dispatcher: all workers drained.")
+
+    async def _health_loop(self):
+        on_ring = set(self._ring.nodes())
+        while True:
+            await asyncio.sleep(self._health_interval)
+            for worker in self._workers:
+                ok = await worker.healthy()
+                if ok:
+                    worker.failures = 0
+                    if worker.index not in on_ring:
+                        self._ring.add(worker.index)
+                        on_ring.add(worker.index)
+                        logger.info(f"Worker {worker.index} back on the ring")
+                    continue
+                worker.failures += 1
+                if worker.index in on_ring and (not worker.alive or worker.failures >= 3):
+                    self._ring.remove(worker.index)
+                    on_ring.discard(worker.index)
+                    logger.warning(f"Worker {worker.index} removed from ring — sessions rehashed")
+                if not worker.alive:
+                    if worker.client is not None:
+                        await worker.client.aclose()
+                    worker.start()
+
+    # ── Proxy ─────────────────────────────────────────────────────────────
+
+    def _colocated_id(self, key: str) -> str:
+        """A fresh session id that hashes to the same worker as ``key``."""
+        node = self._ring.get(key)
+        while True:
+            candidate = str(uuid.uuid4())
+            if self._ring.get(candidate) == node:
+                return candidate
+
+    def _route(self, key: Optional[str], client: Optional[Tuple[str, int]]) -> Optional[WorkerProcess]:
+        node = self._ring.get(key or (client[0] if client else ""))
+        return self._workers[node] if node is not None else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await self._startup()
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await self._shutdown()
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        limit = settings.max_request_body_mb * 1024 * 1024
+        headers = dict(scope["headers"])
+        declared = headers.get(b"content-length", b"")
+        if declared.isdigit() and int(declared) > limit:
+            await _send_simple(send, 413, b'{"success":false,"error":"Request body too large"}')
+            return
+
+        # Buffer only as much body as routing may inspect; the rest streams to the worker
+        chunks, size, more = [], 0, True
+        while more and size <= _MAX_ROUTING_BODY:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunk = message.get("body", b"")
+            chunks.append(chunk)
+            size += len(chunk)
+            more = message.get("more_body", False)
+        body = b"".join(chunks)
+        if size > limit:
+            await _send_simple(send, 413, b'{"success":false,"error":"Request body too large"}')
+            return
+
+        key, body = session_key(scope["path"], scope.get("query_string", b""), headers, body)
+        worker = self._route(key, scope.get("client"))
+        if worker is None:
+            await _send_simple(send, 503, b'{"success":false,"error":"No healthy workers"}')
+            return
+
+        url = scope.get("raw_path") or scope["path"].encode()
+        if scope.get("query_string"):
+            url += b"?" + scope["query_string"]
+        fwd_headers = [
+            (k, v) for k, v in scope["headers"]
+            if k.lower() not in _HOP_BY_HOP and k.lower() not in _UNTRUSTED
+        ]
+        if scope.get("client"):
+            fwd_headers.append((b"x-forwarded-for", scope["client"][0].encode()))
+        if key and scope["path"].endswith("/fork"):
+            # A branch id on the parent's worker, so the branch stays local
+            fwd_headers.append((_BRANCH_ID, self._colocated_id(key).encode()))
+
+        body_read = asyncio.Event()
+        if more:
+            content = _stream_body(body, receive, limit, body_read)
+        else:
+            content = body
+            body_read.set()
+        request = worker.client.build_request(
+            scope["method"], url.decode("latin-1"), headers=fwd_headers, content=content
+        )
+        # A client that hangs up cancels the upstream request, so the worker sees the
+        # disconnect too and stops generating
+        proxy = asyncio.ensure_future(self._proxy(worker, request, send))
+        watcher = asyncio.ensure_future(_wait_disconnect(receive, body_read))
+        try:
+            await asyncio.wait({proxy, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            watcher.cancel()
+            if not proxy.done():
+                proxy.cancel()
+            await asyncio.gather(watcher, return_exceptions=True)
+        try:
+            await proxy
+        except (asyncio.CancelledError, _ClientDisconnected):
+            pass
+
+    async def _proxy(self, worker: WorkerProcess, request: httpx.Request, send):
+        try:
+            response = await worker.client.send(request, stream=True)
+        except _BodyTooLarge:
+            await _send_simple(send, 413, b'{"success":false,"error":"Request body too large"}')
+            return
+        except httpx.HTTPError as e:
+            logger.error(f"Worker {worker.index} unreachable: {e}")
+            await _send_simple(send, 502, b'{"success":false,"error":"Worker unavailable"}')
+            return
+
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": [
+                    (k, v) for k, v in response.headers.raw if k.lower() not in _HOP_BY_HOP
+                ],
+            })
+            async for chunk in response.aiter_raw():
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            await response.aclose()
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+class _ClientDisconnected(Exception):
+    pass
+
+
+async def _stream_body(head: bytes, receive, limit: int, body_read: asyncio.Event):
+    """Yield the already-read head, then the rest of the request body as it arrives."""
+    yield head
+    size, more = len(head), True
+    while more:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise _ClientDisconnected()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > limit:
+            raise _BodyTooLarge()
+        more = message.get("more_body", False)
+        if chunk:
+            yield chunk
+    body_read.set()
+
+
+async def _wait_disconnect(receive, body_read: asyncio.Event):
+    """Return once the client disconnects (only listens after the body is fully read)."""
+    await body_read.wait()
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _send_simple(send, status: int, body: bytes):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"retry-after", b"1")],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -5,15 +5,19 @@ Mounts:
   /api/v1/health   — health & info
   /api/v1/chat     — conversation endpoints
   /api/v1/analyze  — image & document endpoints
+  /api/v1/admin    — session export / import (ADMIN_ENABLED only)
   /                — serves the luxury HTML frontend
 """
+import asyncio
 import logging
 import sys
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 # ── Project root on path ─────────────────────────────────────────────────────
@@ -21,11 +25,23 @@ ROOT = Path(__file__).parent.parent   # project root (parent of api/)
 sys.path.insert(0, str(ROOT))
 
 from config.settings import settings
-from api.middleware.auth import APIKeyAuthMiddleware
+from api.middleware.auth import APIKeyAuthMiddleware, configured_key_hashes
 from api.middleware.logging_middleware import LoggingMiddleware
-from api.routers import health, chat, images, documents
-from src.core.memory_manager import memory_manager
-from src.core.session_manager import session_manager
+from api.middleware.rate_limit import RateLimitMiddleware
+from api.middleware.degradation import DegradationHeaderMiddleware
+from api.middleware.deadline import DeadlineMiddleware
+from api.middleware.compression import CompressionMiddleware
+from api.responses import FastJSONResponse
+from api.static_assets import StaticAssets
+from api.routers import health, chat, images, documents, admin
+from src.core.gemini_client import gemini_client
+from src.core.session_store import session_store
+from src.core.rate_limit import rate_limiter
+from src.core.concurrency import Overloaded, chat_limiter, analysis_limiter
+from src.core.scheduler import chat_scheduler, analysis_scheduler, parse_weights
+from src.core.degrade import degrade_controller
+from src.core.deadline import DeadlineExceeded
+from src.core.storage import create_backend
 
 # ── Logging setup ────────────────────────────────────────────────────────────
 logging.basicConfig(
@@ -39,6 +55,99 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# ── Startup / Shutdown ───────────────────────────────────────────────────────
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Configure the module singletons for this process, and release them on exit.
+
+    The singletons (session store, Gemini client, limiters, schedulers) are
+    constructed at import, but their constructors only set defaults: no
+    connections, threads, files or SDK imports. Everything that costs time or
+    must not cross a fork happens here, so the production server can preload
+    the app in its master and each worker still opens its own backend,
+    janitor thread, spill directory and executor. Keeping the instances
+    module-level lets routers and middleware import them directly.
+    """
+    gemini_client.configure()   # fails startup without GEMINI_API_KEY; the SDK loads on first call
+    chat.pipeline.configure()
+    max_messages = settings.max_context_messages * 2
+    if settings.retrieval_enabled:
+        # Retrieval searches the whole retained history, not just the context window
+        max_messages = max(max_messages, settings.retrieval_max_messages)
+    session_store.configure(
+        ttl=settings.session_ttl_seconds,
+        max_messages=max_messages,
+        num_shards=settings.session_shards,
+        max_sessions=settings.max_sessions,
+        max_bytes=settings.max_memory_mb * 1024 * 1024,
+        max_session_bytes=settings.max_session_kb * 1024,
+        backend=create_backend(settings, max_messages),
+        near_cache_ms=settings.redis_near_cache_ms,
+        warm_after=settings.session_warm_after_seconds,
+        cold_after=settings.session_cold_after_seconds,
+        spill_dir=settings.session_spill_dir,
+        retrieval_index=settings.retrieval_enabled,
+        search_index=settings.search_enabled,
+    )
+    session_store.start_maintenance(settings.session_sweep_interval_seconds)
+    rate_limiter.configure(
+        redis_url=settings.redis_url if settings.rate_limit_backend.lower() == "redis" else None,
+        key_prefix=settings.redis_key_prefix,
+    )
+    chat_limiter.configure(
+        enabled=settings.concurrency_limit_enabled,
+        initial_limit=settings.concurrency_initial_limit,
+        min_limit=settings.concurrency_min_limit,
+        max_limit=settings.concurrency_max_limit,
+    )
+    analysis_limiter.configure(
+        enabled=settings.concurrency_limit_enabled,
+        initial_limit=max(1, settings.concurrency_initial_limit // 2),
+        min_limit=settings.concurrency_min_limit,
+        max_limit=settings.concurrency_max_limit,
+    )
+    weights = parse_weights(settings.scheduler_weights)
+    for scheduler in (chat_scheduler, analysis_scheduler):
+        scheduler.configure(
+            enabled=settings.scheduler_enabled,
+            weights=weights,
+            default_weight=settings.scheduler_default_weight,
+            max_queue=settings.scheduler_max_queue,
+            max_tenant_queue=settings.scheduler_max_queue_per_tenant,
+            max_wait=settings.scheduler_max_wait_seconds,
+        )
+    degrade_controller.configure(
+        enabled=settings.degrade_enabled,
+        p95_ms=settings.degrade_p95_ms,
+        error_rate=settings.degrade_error_rate,
+        queue_depth=settings.degrade_queue_depth,
+        step_up_after=settings.degrade_step_up_seconds,
+        step_down_after=settings.degrade_step_down_seconds,
+        context_messages=settings.degrade_context_messages,
+        max_tokens=settings.degrade_max_tokens,
+        fast_model=settings.degrade_fast_model,
+        text_model=settings.text_model,
+        queue_depth_fn=lambda: chat_scheduler.queued + analysis_scheduler.queued,
+    )
+    chat_limiter.add_listener(degrade_controller.record)
+    analysis_limiter.add_listener(degrade_controller.record)
+    # Blocking Gemini calls run via asyncio.to_thread; size the pool so the
+    # limiters, not the default executor's cpu-based cap, decide concurrency
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=2 * settings.concurrency_max_limit + 8)
+    )
+    logger.info(
+        f"✦ {settings.app_name} v{settings.app_version} started "
+        f"on {settings.api_host}:{settings.api_port}"
+    )
+    yield
+    evicted = session_store.evict_expired()
+    session_store.close()
+    await rate_limiter.aclose()
+    logger.info(f"✦ Shutdown complete. Evicted {evicted} expired sessions.")
+
+
 # ── App factory ──────────────────────────────────────────────────────────────
 def create_app() -> FastAPI:
     app = FastAPI(
@@ -51,11 +160,17 @@ def create_app() -> FastAPI:
         docs_url="/docs",
         redoc_url="/redoc",
         openapi_url="/openapi.json",
+        default_response_class=FastJSONResponse,
+        lifespan=lifespan,
     )
 
     # ── Middleware (order matters: outermost added last) ────────────────
+    app.add_middleware(DeadlineMiddleware)
+    app.add_middleware(RateLimitMiddleware)
     app.add_middleware(LoggingMiddleware)
     app.add_middleware(APIKeyAuthMiddleware)
+    app.add_middleware(DegradationHeaderMiddleware)
+    app.add_middleware(CompressionMiddleware)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.allowed_origins,
@@ -70,37 +185,58 @@ def create_app() -> FastAPI:
     app.include_router(chat.router,      prefix=prefix)
     app.include_router(images.router,    prefix=prefix)
     app.include_router(documents.router, prefix=prefix)
+    if settings.admin_enabled:
+        # Export/import read and overwrite every conversation: never mount them open
+        if not configured_key_hashes():
+            raise ValueError(
+                "ADMIN_ENABLED requires API-key auth: set CHATBOT_API_KEY or CHATBOT_API_KEY_HASHES."
+            )
+        app.include_router(admin.router, prefix=prefix)
+
+    # ── Load shedding ────────────────────────────────────────────────────
+    @app.exception_handler(Overloaded)
+    async def overloaded_handler(request: Request, exc: Overloaded):
+        return JSONResponse(
+            status_code=503,
+            content={"success": False, "error": "Server busy", "detail": str(exc)},
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
+    @app.exception_handler(DeadlineExceeded)
+    async def deadline_handler(request: Request, exc: DeadlineExceeded):
+        return JSONResponse(
+            status_code=504,
+            content={"success": False, "error": "Deadline exceeded", "detail": str(exc)},
+        )
 
     # ── Static frontend ──────────────────────────────────────────────────
     frontend_dir = ROOT / "frontend"
-    if frontend_dir.exists():
+    if frontend_dir.exists() and settings.static_cache_enabled:
+        assets = StaticAssets(frontend_dir)
+
+        @app.api_route("/static/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+        async def serve_static(path: str, request: Request):
+            response = assets.response(f"/static/{path}", request)
+            if response is None:
+                raise HTTPException(status_code=404, detail="Not Found")
+            return response
+
+        @app.api_route("/", methods=["GET", "HEAD"], include_in_schema=False)
+        async def serve_frontend(request: Request):
+            return assets.response("/", request)
+    elif frontend_dir.exists():
+        # Straight from disk: edits show up without a restart
         app.mount("/static", StaticFiles(directory=str(frontend_dir)), name="static")
 
         @app.get("/", include_in_schema=False)
         async def serve_frontend():
             return FileResponse(str(frontend_dir / "index.html"))
 
-    # ── Startup / Shutdown ────────────────────────────────────────────────
-    @app.on_event("startup")
-    async def on_startup():
-        memory_manager.configure(
-            ttl=settings.session_ttl_seconds,
-            max_messages=settings.max_context_messages * 2
-        )
-        session_manager.configure(ttl=settings.session_ttl_seconds)
-        logger.info(
-            f"✦ {settings.app_name} v{settings.app_version} started "
-            f"on {settings.api_host}:{settings.api_port}"
-        )
-
-    @app.on_event("shutdown")
-    async def on_shutdown():
-        evicted = session_manager.evict_expired()
-        logger.info(f"✦ Shutdown complete. Evicted {evicted} expired sessions.")
-
     return app
 
 
+# Built at import: uvicorn loads "api.main:app" and the production server preloads it
+# before forking; the lifespan above does the per-process setup.
 app = create_app()
 
 
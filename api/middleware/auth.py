@@ -1,43 +1,126 @@
 """
 API Key authentication middleware.
-Validates X-API-Key header against CHATBOT_API_KEY from settings.
-If CHATBOT_API_KEY is not set, auth is disabled (open access).
+Validates the X-API-Key header against CHATBOT_API_KEY and/or the SHA-256
+digests listed in CHATBOT_API_KEY_HASHES. If neither is set, auth is
+disabled (open access).
+
+Implemented as plain ASGI: requests that pass are handed to the app untouched
+(no request/response wrapping), so streaming responses and cancellation work
+as if the middleware were not there.
 """
+import hmac
+import json
+import hashlib
 import logging
-from fastapi import Request, HTTPException, status
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import List, Optional
+from urllib.parse import parse_qs
+
 from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
 # Paths that bypass auth entirely
-PUBLIC_PATHS = {"/", "/docs", "/redoc", "/openapi.json", "/api/v1/health", "/api/v1/info"}
+PUBLIC_PATHS = {
+    "/", "/docs", "/redoc", "/openapi.json",
+    "/api/v1/health", "/api/v1/health/live", "/api/v1/info",
+}
+# Path prefixes that bypass auth (frontend assets loaded by the public page)
+PUBLIC_PREFIXES = ("/static/",)
+
+_UNAUTHORIZED_BODY = json.dumps({
+    "success": False,
+    "error": "Invalid or missing API key",
+    "detail": "Provide your API key via the X-API-Key header",
+}).encode()
+
+
+def hash_key(api_key: str) -> str:
+    """Hex SHA-256 digest of an API key, the form stored in CHATBOT_API_KEY_HASHES."""
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+def configured_key_hashes() -> List[bytes]:
+    """Digests of every accepted key: the plain CHATBOT_API_KEY plus CHATBOT_API_KEY_HASHES."""
+    digests = []
+    if settings.chatbot_api_key:
+        digests.append(hash_key(settings.chatbot_api_key))
+    if settings.chatbot_api_key_hashes:
+        digests.extend(
+            h.strip().lower() for h in settings.chatbot_api_key_hashes.split(",") if h.strip()
+        )
+    for h in digests:
+        if len(h) != 64 or any(c not in "0123456789abcdef" for c in h):
+            raise ValueError(f"CHATBOT_API_KEY_HASHES entry is not a hex SHA-256 digest: {h[:12]}…")
+    return [bytes.fromhex(h) for h in digests]
 
 
-class APIKeyAuthMiddleware(BaseHTTPMiddleware):
-    """Optional API key authentication middleware."""
+class APIKeyAuthMiddleware:
+    """
+    Optional API key authentication middleware.
+
+    The presented key is hashed once and compared against every configured
+    digest with ``hmac.compare_digest``, without stopping at the first match,
+    so timing reveals neither the key nor which one matched. The matching
+    key's id (first 12 hex digits of its digest) is put in
+    ``request.state.api_key_id`` for per-key accounting downstream.
+    """
+
+    def __init__(self, app, key_hashes: Optional[List[bytes]] = None):
+        self.app = app
+        self._key_hashes = configured_key_hashes() if key_hashes is None else key_hashes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        # Public paths first: they never need the key, configured or not
+        path = scope["path"]
+        if path in PUBLIC_PATHS or path.startswith(PUBLIC_PREFIXES):
+            return await self.app(scope, receive, send)
 
-    async def dispatch(self, request: Request, call_next):
         # Skip auth if no key is configured
-        if not settings.chatbot_api_key:
-            return await call_next(request)
-
-        # Skip auth for public paths
-        if request.url.path in PUBLIC_PATHS:
-            return await call_next(request)
-
-        # Validate the key
-        api_key = request.headers.get("X-API-Key") or request.query_params.get("api_key")
-        if not api_key or api_key != settings.chatbot_api_key:
-            logger.warning(f"Unauthorized request to {request.url.path} from {request.client.host}")
-            return JSONResponse(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                content={
-                    "success": False,
-                    "error": "Invalid or missing API key",
-                    "detail": "Provide your API key via the X-API-Key header"
-                }
+        if not self._key_hashes:
+            return await self.app(scope, receive, send)
+
+        matched = self._match(self._presented_key(scope))
+        if matched is None:
+            client = scope.get("client")
+            logger.warning(
+                f"Unauthorized request to {path} from {client[0] if client else 'unknown'}"
             )
+            await send({
+                "type": "http.response.start",
+                "status": 401,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(_UNAUTHORIZED_BODY)).encode()),
+                    (b"www-authenticate", b'ApiKey header="X-API-Key"'),
+                ],
+            })
+            await send({"type": "http.response.body", "body": _UNAUTHORIZED_BODY})
+            return
+
+        scope.setdefault("state", {})["api_key_id"] = matched.hex()[:12]
+        return await self.app(scope, receive, send)
+
+    @staticmethod
+    def _presented_key(scope) -> Optional[bytes]:
+        for name, value in scope["headers"]:
+            if name == b"x-api-key":
+                return value
+        query = scope.get("query_string")
+        if query and b"api_key=" in query:
+            values = parse_qs(query.decode("latin-1")).get("api_key")
+            if values:
+                return values[0].encode("latin-1")
+        return None
 
-        return await call_next(request)
+    def _match(self, api_key: Optional[bytes]) -> Optional[bytes]:
+        if not api_key:
+            return None
+        digest = hashlib.sha256(api_key).digest()
+        matched = None
+        for candidate in self._key_hashes:
+            if hmac.compare_digest(digest, candidate):
+                matched = candidate
+        return matched
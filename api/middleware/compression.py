@@ -0,0 +1,208 @@
+"""
+Response compression middleware (gzip, and brotli when installed).
+
+The encoding is negotiated from Accept-Encoding (q-values honoured, brotli
+preferred on a tie). Responses are left alone when they are small (under
+COMPRESSION_MIN_SIZE), already encoded, of an already-compressed type
+(images, archives, ...), partial, or marked ``Cache-Control: no-transform``.
+
+Streaming responses (StreamingResponse, text/event-stream) are compressed
+chunk by chunk with a sync flush after each one, so every event or token
+reaches the client as soon as the app sends it.
+"""
+import zlib
+from typing import List, Optional, Tuple
+
+from config.settings import settings
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+# Content types not worth compressing again (prefixes)
+_COMPRESSED_TYPES = (
+    "image/", "audio/", "video/", "font/woff",
+    "application/gzip", "application/x-gzip", "application/zip", "application/x-7z-compressed",
+    "application/x-bzip2", "application/x-xz", "application/zstd", "application/x-rar-compressed",
+    "application/pdf", "application/octet-stream", "application/vnd.openxmlformats-officedocument",
+)
+_COMPRESSIBLE_IMAGES = frozenset({"image/svg+xml", "image/x-icon", "image/bmp"})
+
+
+def negotiate(accept_encoding: str, brotli_available: bool = brotli is not None) -> Optional[str]:
+    """The best of ``br`` / ``gzip`` acceptable to the client, or None."""
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    offered = ("br", "gzip") if brotli_available else ("gzip",)
+    best, best_q = None, 0.0
+    for coding in offered:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type in _COMPRESSIBLE_IMAGES:
+        return True
+    return not media_type.startswith(_COMPRESSED_TYPES)
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 31)   # 31 = gzip container
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._z.compress(data) + self._z.flush()
+
+
+class _BrotliEncoder:
+    def __init__(self, quality: int):
+        self._c = brotli.Compressor(quality=quality)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._c.process(data) + self._c.finish()
+
+
+class CompressionMiddleware:
+    """Compress HTTP response bodies per the client's Accept-Encoding."""
+
+    def __init__(self, app):
+        self.app = app
+        self.enabled = settings.compression_enabled
+        self.min_size = settings.compression_min_size
+        self.gzip_level = settings.compression_gzip_level
+        self.brotli_quality = settings.compression_brotli_quality
+
+    def _encoder(self, coding: str):
+        if coding == "br":
+            return _BrotliEncoder(self.brotli_quality)
+        return _GzipEncoder(self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            return await self.app(scope, receive, send)
+        accept = b""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value
+                break
+        coding = negotiate(accept.decode("latin-1")) if accept else None
+        if coding is None:
+            return await self.app(scope, receive, send)
+
+        start: Optional[dict] = None     # held until the first body chunk shows the size
+        encoder = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, encoder, passthrough
+            if passthrough:
+                return await send(message)
+            if encoder is not None:
+                if message["type"] != "http.response.body":
+                    return await send(message)
+                more = message.get("more_body", False)
+                data = message.get("body", b"")
+                payload = encoder.chunk(data) if more else encoder.finish(data)
+                if payload or not more:
+                    await send({"type": "http.response.body", "body": payload, "more_body": more})
+                return
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                passthrough = True
+                if start is not None:
+                    await send(start)
+                return await send(message)
+
+            # First body chunk: decide now that the size is known
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            headers = list(start.get("headers", ()))
+            if not self._should_compress(start["status"], headers, len(body), more):
+                passthrough = True
+                await send(start)
+                return await send(message)
+
+            encoder = self._encoder(coding)
+            headers = _encoded_headers(headers, coding)
+            if more:
+                payload = encoder.chunk(body)
+            else:
+                payload = encoder.finish(body)
+                headers.append((b"content-length", str(len(payload)).encode()))
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": payload, "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _should_compress(self, status: int, headers: List[Tuple[bytes, bytes]], size: int, more: bool) -> bool:
+        if status < 200 or status in (204, 206, 304):
+            return False
+        content_type = b""
+        length = None
+        for name, value in headers:
+            name = name.lower()
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+            elif name == b"content-length":
+                length = int(value)
+            elif name == b"cache-control" and b"no-transform" in value.lower():
+                return False
+        if not content_type or not compressible(content_type.decode("latin-1")):
+            return False
+        if not more:
+            return size >= self.min_size
+        # A stream: judge by the declared length when there is one
+        return length is None or length >= self.min_size
+
+
+def _encoded_headers(headers: List[Tuple[bytes, bytes]], coding: str) -> List[Tuple[bytes, bytes]]:
+    """Response headers for the encoded body: length dropped, ETag weakened, Vary extended."""
+    out = []
+    vary = None
+    for name, value in headers:
+        lname = name.lower()
+        if lname == b"content-length":
+            continue
+        if lname == b"etag" and not value.startswith(b"W/"):
+            value = b"W/" + value    # the encoded bytes are a different representation
+        elif lname == b"vary":
+            vary = value
+            continue
+        out.append((name, value))
+    if vary is None:
+        vary = b"Accept-Encoding"
+    elif b"accept-encoding" not in vary.lower() and vary.strip() != b"*":
+        vary += b", Accept-Encoding"
+    out.append((b"vary", vary))
+    out.append((b"content-encoding", coding.encode()))
+    return out
@@ -0,0 +1,136 @@
+"""
+Deadline and disconnect middleware for AI requests (see src/core/deadline.py).
+
+POST /chat and POST /analyze/* get a deadline of DEADLINE_CHAT_SECONDS or
+DEADLINE_ANALYSIS_SECONDS; a client may ask for less with X-Request-Timeout
+(seconds), never more. The request runs in its own task: when the deadline
+passes it is cancelled and answered with 504, and when the client
+disconnects it is cancelled with no response at all.
+"""
+import json
+import asyncio
+import logging
+
+from config.settings import settings
+from api.middleware.rate_limit import route_class
+from src.core.deadline import Deadline, current_deadline, deadline_stats
+
+logger = logging.getLogger(__name__)
+
+_MIN_TIMEOUT = 0.1
+
+
+class DeadlineMiddleware:
+    """Bound AI requests in time and stop their work when the client leaves."""
+
+    def __init__(self, app):
+        self.app = app
+        self._prefix = settings.api_prefix
+        self._defaults = {
+            "chat": settings.deadline_chat_seconds,
+            "analysis": settings.deadline_analysis_seconds,
+        }
+
+    def _timeout(self, scope, default: float) -> float:
+        for name, value in scope["headers"]:
+            if name == b"x-request-timeout":
+                try:
+                    return min(default, max(_MIN_TIMEOUT, float(value)))
+                except ValueError:
+                    break
+        return default
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        request_class = route_class(scope, self._prefix)
+        if request_class is None or not self._defaults[request_class]:
+            return await self.app(scope, receive, send)
+
+        deadline = Deadline(self._timeout(scope, self._defaults[request_class]))
+        deadline_stats.requests += 1
+        disconnected = asyncio.Event()
+        watcher = None
+        body_done = False
+        started = False
+
+        async def watch():
+            # Owns ``receive`` once the body is in; nothing but a disconnect can arrive
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        async def receive_wrapper():
+            nonlocal body_done, watcher
+            if body_done:
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+            elif not message.get("more_body", False):
+                body_done = True
+                watcher = asyncio.create_task(watch())
+            return message
+
+        async def send_wrapper(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        # The task copies the context, deadline included, at creation
+        token = current_deadline.set(deadline)
+        try:
+            task = asyncio.create_task(self.app(scope, receive_wrapper, send_wrapper))
+        finally:
+            current_deadline.reset(token)
+        gone = asyncio.create_task(disconnected.wait())
+        try:
+            await asyncio.wait({task, gone}, timeout=deadline.remaining(), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            gone.cancel()
+            if task.done() and watcher is not None:
+                watcher.cancel()
+        if task.done():
+            return task.result()
+
+        reason = "disconnected" if disconnected.is_set() else "expired"
+        deadline.cancel(reason)
+        task.cancel()
+        if reason == "expired":
+            deadline_stats.expired += 1
+            logger.warning(f"{scope['method']} {scope['path']} exceeded its {deadline.timeout:g}s deadline")
+            if not started:
+                await self._send_timeout(send, deadline)
+        else:
+            deadline_stats.disconnected += 1
+            logger.info(f"Client left {scope['method']} {scope['path']}; request cancelled")
+
+        # Wait for the work to wind down (a thread finishes its current step)
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+        if not deadline.upstream_started and not deadline.saved:
+            deadline.note_saved()   # cancelled before its Gemini call went out
+
+    @staticmethod
+    async def _send_timeout(send, deadline: Deadline):
+        body = json.dumps({
+            "success": False,
+            "error": "Deadline exceeded",
+            "detail": f"The request did not complete within {deadline.timeout:g}s.",
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 504,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
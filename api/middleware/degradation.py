@@ -0,0 +1,27 @@
+"""
+Degradation level header middleware.
+Adds X-Degradation-Level (0 = full quality … 4 = analysis off, see
+src/core/degrade.py) to every HTTP response.
+"""
+from src.core.degrade import degrade_controller
+
+
+class DegradationHeaderMiddleware:
+    """Report the current degradation level on every response."""
+
+    def __init__(self, app, controller=None):
+        self.app = app
+        self._controller = controller or degrade_controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", ())) + [
+                    (b"x-degradation-level", str(self._controller.level).encode()),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,50 +1,75 @@
 """
 Structured request/response logging middleware.
 Logs method, path, status code, and processing time for every request.
+
+Implemented as plain ASGI: it only wraps ``send`` to add the X-Request-ID and
+X-Process-Time-Ms headers, so response bodies (including streams) pass
+through unbuffered.
 """
+import os
 import time
 import logging
-import uuid
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
 
 logger = logging.getLogger("api.access")
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
+class LoggingMiddleware:
     """Log every incoming request with timing information."""
 
-    async def dispatch(self, request: Request, call_next):
-        request_id = str(uuid.uuid4())[:8]
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = os.urandom(4).hex()
         start_time = time.perf_counter()
+        method, path = scope["method"], scope["path"]
 
-        # Attach request ID to state for downstream use
-        request.state.request_id = request_id
+        # Attach request ID to state for downstream use (request.state.request_id)
+        scope.setdefault("state", {})["request_id"] = request_id
 
-        logger.info(
-            f"[{request_id}] → {request.method} {request.url.path} "
-            f"| client={request.client.host if request.client else 'unknown'}"
-        )
+        if logger.isEnabledFor(logging.INFO):
+            client = scope.get("client")
+            logger.info(
+                f"[{request_id}] → {method} {path} "
+                f"| client={client[0] if client else 'unknown'}"
+            )
+
+        status = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # Time to response start — for streams, the body is still to come
+                elapsed = (time.perf_counter() - start_time) * 1000
+                message["headers"] = list(message.get("headers", ())) + [
+                    (b"x-request-id", request_id.encode()),
+                    (b"x-process-time-ms", f"{elapsed:.1f}".encode()),
+                ]
+            await send(message)
 
         try:
-            response = await call_next(request)
+            await self.app(scope, receive, send_wrapper)
         except Exception as exc:
             elapsed = (time.perf_counter() - start_time) * 1000
             logger.error(
-                f"[{request_id}] ✗ {request.method} {request.url.path} "
+                f"[{request_id}] ✗ {method} {path} "
                 f"| ERROR={type(exc).__name__} | {elapsed:.1f}ms"
             )
             raise
 
+        # Logged once the whole body has been sent
         elapsed = (time.perf_counter() - start_time) * 1000
-        status = response.status_code
-        level = logging.INFO if status < 400 else logging.WARNING if status < 500 else logging.ERROR
-        logger.log(
-            level,
-            f"[{request_id}] ← {request.method} {request.url.path} "
-            f"| {status} | {elapsed:.1f}ms"
+        level = (
+            logging.WARNING if status is None else
+            logging.INFO if status < 400 else logging.WARNING if status < 500 else logging.ERROR
         )
-
-        response.headers["X-Request-ID"] = request_id
-        response.headers["X-Process-Time-Ms"] = f"{elapsed:.1f}"
-        return response
+        if logger.isEnabledFor(level):
+            logger.log(
+                level,
+                f"[{request_id}] ← {method} {path} "
+                f"| {status if status is not None else 'no response'} | {elapsed:.1f}ms"
+            )
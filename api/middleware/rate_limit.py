@@ -0,0 +1,192 @@
+"""
+Per-route-class rate limiting middleware (GCRA, see src/core/rate_limit.py).
+
+Only AI work is limited: POST /chat under RATE_LIMIT_CHAT and POST
+/analyze/* under RATE_LIMIT_ANALYSIS. Each class has its own budget per
+client. The client is the authenticated API key (set by
+APIKeyAuthMiddleware), else the client IP. With RATE_LIMIT_KEY=session a
+request carrying a session_id must also fit that session's budget; session
+ids are chosen by clients, so the session budget is nested inside the
+client's own and keyed by it too (a fresh id per request gains nothing, and
+nobody can spend another client's session budget).
+
+Every limited route's response carries X-RateLimit-Limit,
+X-RateLimit-Remaining and X-RateLimit-Reset (seconds until the full burst is
+available); rejected requests get a 429 with Retry-After before the app
+runs, so no Gemini work is ever scheduled for them.
+"""
+import json
+import math
+import logging
+import re
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from config.settings import settings
+from src.core.rate_limit import Decision, Rate, parse_rate, rate_limiter
+
+logger = logging.getLogger(__name__)
+
+_SESSION_PATH_RE = re.compile(r"/chat/(?:history|session)/([^/?]+)")
+_MAX_PEEK_BODY = 64 * 1024   # JSON bodies up to this size are inspected for a session_id
+
+
+def client_ip(scope) -> str:
+    client = scope.get("client")
+    if client and client[0]:
+        return client[0]
+    # Behind the affinity dispatcher workers listen on a Unix socket (no peer
+    # address). The dispatcher replaces any client-sent X-Forwarded-For with
+    # its own; the last hop of the last header is the one a trusted proxy
+    # appended, never a value the client chose
+    forwarded = None
+    for name, value in scope["headers"]:
+        if name == b"x-forwarded-for":
+            forwarded = value
+    if forwarded:
+        return forwarded.decode("latin-1").rsplit(",", 1)[-1].strip() or "unknown"
+    return "unknown"
+
+
+def tenant_id(scope) -> str:
+    """Who a request's upstream work is accounted to: its API key id, else its client IP."""
+    return scope.get("state", {}).get("api_key_id") or client_ip(scope)
+
+
+def route_class(scope, prefix: str) -> Optional[str]:
+    """``"chat"`` for POST {prefix}/chat, ``"analysis"`` for POST {prefix}/analyze/*, else None."""
+    if scope["method"] != "POST":
+        return None
+    path = scope["path"]
+    if path == f"{prefix}/chat":
+        return "chat"
+    if path.startswith(f"{prefix}/analyze/"):
+        return "analysis"
+    return None
+
+
+def _headers(decision: Decision) -> List[Tuple[bytes, bytes]]:
+    return [
+        (b"x-ratelimit-limit", str(decision.limit).encode()),
+        (b"x-ratelimit-remaining", str(decision.remaining).encode()),
+        (b"x-ratelimit-reset", str(math.ceil(decision.reset_after)).encode()),
+    ]
+
+
+class RateLimitMiddleware:
+    """Reject over-limit AI requests with 429 before they reach the app."""
+
+    def __init__(self, app, limiter=None):
+        self.app = app
+        self._limiter = limiter or rate_limiter
+        self._prefix = settings.api_prefix
+        self._rates = {
+            "chat": parse_rate(settings.rate_limit_chat),
+            "analysis": parse_rate(settings.rate_limit_analysis),
+        }
+        self._key_mode = settings.rate_limit_key.lower()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.rate_limit_enabled:
+            return await self.app(scope, receive, send)
+        request_class = route_class(scope, self._prefix)
+        if request_class is None:
+            return await self.app(scope, receive, send)
+
+        client_key = None
+        if self._key_mode != "ip":
+            key_id = scope.get("state", {}).get("api_key_id")
+            client_key = key_id and f"k:{key_id}"
+        if client_key is None:
+            client_key = f"ip:{client_ip(scope)}"
+        keys = [client_key]
+        if self._key_mode == "session":
+            session_id, receive = await self._session_key(scope, receive)
+            if session_id:
+                keys.append(f"{client_key}:s:{session_id}")
+
+        rate: Rate = self._rates[request_class]
+        decision = None
+        for key in keys:
+            checked = await self._limiter.acheck(f"{request_class}:{key}", rate)
+            # Report the tightest budget: the rejecting one, else the one with least left
+            if decision is None or not checked.allowed or checked.remaining < decision.remaining:
+                decision = checked
+            if not checked.allowed:
+                client_key = key
+                break
+        headers = _headers(decision)
+
+        if not decision.allowed:
+            retry_after = max(1, math.ceil(decision.retry_after))
+            logger.warning(
+                f"Rate limited {request_class} request from {client_key} | retry in {retry_after}s"
+            )
+            body = json.dumps({
+                "success": False,
+                "error": "Rate limit exceeded",
+                "detail": f"Limit is {rate.count} requests per {int(rate.period)}s; retry in {retry_after}s.",
+            }).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(retry_after).encode()),
+                ] + headers,
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", ())) + headers
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _session_key(self, scope, receive):
+        """
+        The session_id from the path, query or (small) JSON body. A body read
+        here is replayed to the app through the returned ``receive``.
+        """
+        match = _SESSION_PATH_RE.search(scope["path"])
+        if match:
+            return match.group(1), receive
+        query = scope.get("query_string")
+        if query and b"session_id=" in query:
+            values = parse_qs(query.decode("latin-1")).get("session_id")
+            if values:
+                return values[0], receive
+
+        headers = dict(scope["headers"])
+        if b"json" not in headers.get(b"content-type", b""):
+            return None, receive
+        try:
+            if int(headers[b"content-length"]) > _MAX_PEEK_BODY:
+                return None, receive
+        except (KeyError, ValueError):
+            # Chunked or malformed: not worth buffering an unbounded body for a key
+            return None, receive
+
+        messages = []
+        body = b""
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+
+        async def replay():
+            return messages.pop(0) if messages else await receive()
+
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return None, replay
+        session_id = data.get("session_id") if isinstance(data, dict) else None
+        return (str(session_id) if session_id else None), replay
@@ -1,18 +1,20 @@
 """Pydantic v2 schemas for all API request and response models."""
 import uuid
 from datetime import datetime
-from typing import Optional, List, Any, Dict
+from typing import Optional, List, Any, Dict, Generic, TypeVar
 from pydantic import BaseModel, Field
 
+T = TypeVar("T")
+
 
 # ══════════════════════════════════════════════════════════════════
 #  SHARED
 # ══════════════════════════════════════════════════════════════════
 
-class APIResponse(BaseModel):
-    """Standard API response envelope."""
+class APIResponse(BaseModel, Generic[T]):
+    """Standard API response envelope; ``APIResponse[Model]`` types its data."""
     success: bool
-    data: Optional[Any] = None
+    data: Optional[T] = None
     error: Optional[str] = None
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
@@ -59,11 +61,16 @@ class ChatResponse(BaseModel):
     """Chat response data."""
     response: str
     session_id: str
-    message_id: str
+    message_id: str = Field(..., description="Id of the stored assistant message")
+    user_message_id: Optional[str] = Field(None, description="Id of the stored user message")
     model: str
     tokens_used: Optional[int] = None
     latency_ms: Optional[float] = None
+    ai_latency_ms: Optional[float] = None
+    total_pipeline_latency_ms: Optional[float] = None
     pipeline_stages: Optional[List[str]] = None
+    context_info: Dict[str, Any] = Field(default_factory=dict)
+    input_metadata: Dict[str, Any] = Field(default_factory=dict)
 
 
 class ConversationHistory(BaseModel):
@@ -75,6 +82,21 @@ class ConversationHistory(BaseModel):
     last_active: datetime
 
 
+class HistoryPageResponse(BaseModel):
+    """One page of a session's history (see GET /chat/history/{id})."""
+    session_id: str
+    messages: List[Message]
+    message_count: int
+    total_messages: int
+    has_more: bool
+    next_before: Optional[str] = Field(None, description="Cursor for the next (older) page")
+
+
+class ForkRequest(BaseModel):
+    """Fork a session at one of its messages."""
+    message_id: str = Field(..., description="Last message the branch keeps")
+
+
 class SessionCreate(BaseModel):
     """Response when a new session is created."""
     session_id: str
@@ -134,3 +156,17 @@ class ModelInfoResponse(BaseModel):
     temperature: float
     rate_limits: Dict[str, str]
     supported_file_types: Dict[str, List[str]]
+
+
+# ══════════════════════════════════════════════════════════════════
+#  TYPED ENVELOPES
+# ══════════════════════════════════════════════════════════════════
+# Parametrized once here and used as response_model for the OpenAPI schema.
+# Routes return api.responses.api_response(), which FastAPI sends as-is
+# instead of validating the payload against these again.
+
+ChatEnvelope = APIResponse[ChatResponse]
+SessionEnvelope = APIResponse[SessionCreate]
+HistoryEnvelope = APIResponse[HistoryPageResponse]
+ImageAnalysisEnvelope = APIResponse[ImageAnalysisResponse]
+DocumentAnalysisEnvelope = APIResponse[DocumentAnalysisResponse]
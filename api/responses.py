@@ -0,0 +1,36 @@
+"""
+Fast response path for the JSON API.
+
+``FastJSONResponse`` encodes with src.core.serialization (orjson when
+installed) and is the app's default response class. Routes build the
+standard envelope with ``api_response``: the payload is already plain data,
+so it is returned as a response and FastAPI skips validating and
+re-serializing it against the route's ``response_model``, which is kept for
+the OpenAPI schema only.
+"""
+from typing import Any, Dict, Mapping, Optional
+
+from fastapi.responses import JSONResponse
+
+from src.core.serialization import dumps
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the fast encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def api_response(
+    data: Any = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    status_code: int = 200,
+    headers: Optional[Mapping[str, str]] = None,
+) -> FastJSONResponse:
+    """A successful ``APIResponse`` envelope, serialized in one pass."""
+    return FastJSONResponse(
+        {"success": True, "data": data, "error": None, "metadata": metadata or {}},
+        status_code=status_code,
+        headers=headers,
+    )
@@ -0,0 +1,130 @@
+"""
+Admin router — bulk session transfer and search (mounted only when ADMIN_ENABLED=true).
+GET  /api/v1/admin/sessions/export — Stream every session as gzip NDJSON
+POST /api/v1/admin/sessions/import — Bulk-load a gzip NDJSON export
+GET  /api/v1/admin/sessions/search — Full-text search across sessions (SEARCH_ENABLED)
+
+Both directions stream, so memory stays flat however large the dump is.
+With a SESSION_BACKEND the export reads the backend, so it includes sessions
+evicted from memory and each session's full stored history. With the memory
+backend only the cached sessions exist, and in affinity mode each worker
+holds its own: export from every worker to capture them all.
+
+Search reveals every tenant's session and message ids, so it lives here,
+behind the admin gate, rather than on the chat router.
+"""
+import time
+import asyncio
+import logging
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+
+from api.models.schemas import APIResponse
+from api.responses import api_response
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+@router.get(
+    "/sessions/export",
+    summary="Export all sessions",
+    description=(
+        "Stream every session and its messages as gzip-compressed NDJSON (one session per line). "
+        "Read from the storage backend when one is configured, else from the in-memory cache."
+    ),
+)
+async def export_sessions():
+    """Stream sessions one store batch at a time; the body is never built in memory."""
+    from src.core.session_store import session_store
+    from src.core.transfer import gzip_ndjson
+    from config.settings import settings
+
+    filename = f"sessions-{datetime.utcnow():%Y%m%dT%H%M%SZ}.ndjson.gz"
+    logger.info(f"Session export started | cached sessions={session_store.count()}")
+    # A sync iterator: Starlette pulls it from a worker thread, off the event loop
+    return StreamingResponse(
+        gzip_ndjson(session_store.export_sessions(), level=settings.export_gzip_level),
+        media_type="application/gzip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post(
+    "/sessions/import",
+    response_model=APIResponse,
+    summary="Import sessions",
+    description="Bulk-load a gzip NDJSON export (as produced by /admin/sessions/export) sent as the raw request body.",
+)
+async def import_sessions(request: Request):
+    """Inflate and parse the body as it arrives, inserting sessions in batches."""
+    from src.core.session_store import session_store
+    from src.core.transfer import ImportFormatError, read_gzip_ndjson
+
+    start = time.perf_counter()
+    imported = skipped = messages = 0
+    try:
+        async for batch in read_gzip_ndjson(request.stream()):
+            done, dropped = await asyncio.to_thread(session_store.import_sessions, batch)
+            imported += done
+            skipped += dropped
+            messages += sum(len(s.messages) for s in batch)
+    except ImportFormatError as e:
+        logger.warning(f"Session import stopped at {e} | imported={imported}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid import data ({e}); {imported} sessions were imported before it.",
+        )
+
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+    logger.info(
+        f"Session import done | sessions={imported} skipped={skipped} "
+        f"messages={messages} latency={elapsed_ms}ms"
+    )
+    return api_response(
+        data={"imported": imported, "skipped_expired": skipped, "messages": messages},
+        metadata={"latency_ms": elapsed_ms},
+    )
+
+
+@router.get(
+    "/sessions/search",
+    response_model=APIResponse,
+    summary="Search conversations",
+    description=(
+        'Find messages across all sessions. Words are ANDed; "quoted text" must '
+        "appear as an exact phrase and word* matches any word with that prefix. "
+        "Results are newest first. Requires SEARCH_ENABLED=true."
+    )
+)
+async def search(
+    q: str = Query(..., min_length=1, max_length=500, description="Search query"),
+    limit: int = Query(20, ge=1, le=200, description="Maximum results"),
+):
+    """Full-text search over conversation history."""
+    from src.core.session_store import session_store
+
+    start = time.perf_counter()
+    try:
+        hits, total = session_store.search(q, limit)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+    return api_response(
+        data={
+            "query": q,
+            "results": [
+                {
+                    "session_id": h.session_id,
+                    "message_id": h.message_id,
+                    "role": h.role,
+                    "timestamp": datetime.utcfromtimestamp(h.timestamp).isoformat(),
+                }
+                for h in hits
+            ],
+            "sessions": list(dict.fromkeys(h.session_id for h in hits)),
+            "candidates": total,
+        },
+        metadata={"latency_ms": round((time.perf_counter() - start) * 1000, 3)},
+    )
@@ -2,29 +2,39 @@
 Chat router — text conversation endpoints.
 POST /api/v1/chat              — Send a message (returns full response)
 POST /api/v1/chat/session      — Create a new session
-GET  /api/v1/chat/history/{id} — Retrieve conversation history
+GET  /api/v1/chat/history/{id} — Retrieve conversation history (cursor-paginated, ETag)
 DELETE /api/v1/chat/history/{id} — Clear a session's history
+POST /api/v1/chat/session/{id}/fork     — Branch a session at a message
+GET  /api/v1/chat/session/{id}/branches — List a session's branches
 """
 import uuid
 import time
 import logging
-from fastapi import APIRouter, HTTPException, Request, status
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
 from fastapi.responses import StreamingResponse
 
 from api.models.schemas import (
-    ChatRequest, ChatResponse, SessionCreate,
-    ConversationHistory, APIResponse
+    ChatRequest, APIResponse, ForkRequest,
+    ChatEnvelope, SessionEnvelope, HistoryEnvelope
 )
+from api.responses import api_response
+from api.middleware.rate_limit import tenant_id
+from src.core.concurrency import Overloaded
+from src.core.deadline import ClientDisconnected, DeadlineExceeded
 from src.pipeline.pipeline_manager import PipelineManager
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["Chat"])
 pipeline = PipelineManager()
 
+# Set by api.affinity on fork requests; the dispatcher drops any client-sent copy
+BRANCH_ID_HEADER = "x-branch-session-id"
+
 
 @router.post(
     "/chat",
-    response_model=APIResponse,
+    response_model=ChatEnvelope,
     summary="Send a chat message",
     description="Send a message to the AI. Optionally provide a session_id for multi-turn conversation."
 )
@@ -41,14 +51,14 @@ async def chat(request: Request, body: ChatRequest):
             session_id=session_id,
             system_prompt=body.system_prompt,
             temperature=body.temperature,
+            tenant=tenant_id(request.scope),
         )
 
         latency = (time.perf_counter() - start) * 1000
         result["latency_ms"] = round(latency, 2)
         result["session_id"] = session_id
 
-        return APIResponse(
-            success=True,
+        return api_response(
             data=result,
             metadata={
                 "request_id": getattr(request.state, "request_id", "n/a"),
@@ -58,6 +68,10 @@ async def chat(request: Request, body: ChatRequest):
 
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except (Overloaded, DeadlineExceeded):
+        raise  # 503 + Retry-After / 504, see the handlers in api.main
+    except ClientDisconnected:
+        raise  # nobody is waiting; DeadlineMiddleware drops it without a response
     except Exception as e:
         logger.error(f"Chat pipeline error: {e}", exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -65,7 +79,7 @@ async def chat(request: Request, body: ChatRequest):
 
 @router.post(
     "/chat/session",
-    response_model=APIResponse,
+    response_model=SessionEnvelope,
     summary="Create a new chat session",
     description="Create a new conversation session and return its ID."
 )
@@ -77,8 +91,7 @@ async def create_session():
     session_id = str(uuid.uuid4())
     session_manager.create_session(session_id)
 
-    return APIResponse(
-        success=True,
+    return api_response(
         data={
             "session_id": session_id,
             "created_at": datetime.utcnow().isoformat(),
@@ -89,29 +102,45 @@ async def create_session():
 
 @router.get(
     "/chat/history/{session_id}",
-    response_model=APIResponse,
+    response_model=HistoryEnvelope,
     summary="Get conversation history",
-    description="Retrieve the full conversation history for a session."
+    description=(
+        "Retrieve a session's conversation history, newest page last. Page backwards "
+        "with ?before=<message_id>&limit=N (next_before in the response is the next "
+        "cursor). Responses carry an ETag; send it as If-None-Match to get a 304 "
+        "while the session is unchanged."
+    )
 )
-async def get_history(session_id: str):
+async def get_history(
+    request: Request,
+    session_id: str,
+    before: Optional[str] = Query(None, description="Return messages older than this message_id"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size (all messages if omitted)"),
+):
     """Get conversation history for a session."""
-    from src.core.memory_manager import memory_manager
+    from src.core.session_store import session_store
 
-    history = memory_manager.get_history(session_id)
-    if history is None:
+    known_etags = [
+        tag.strip() for tag in request.headers.get("if-none-match", "").split(",") if tag.strip()
+    ]
+    try:
+        page = session_store.history_page(session_id, before, limit, known_etags)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Message '{before}' not found in session '{session_id}'."
+        )
+    if page is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Session '{session_id}' not found or expired."
         )
 
-    return APIResponse(
-        success=True,
-        data={
-            "session_id": session_id,
-            "messages": [m.model_dump() for m in history],
-            "message_count": len(history),
-        }
-    )
+    headers = {"ETag": page.etag, "Cache-Control": "private, no-cache"}
+    if page.body is None:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    # Pre-serialized (and cached) JSON — returned as-is, no re-validation
+    return Response(content=page.body, media_type="application/json", headers=headers)
 
 
 @router.delete(
@@ -122,13 +151,74 @@ async def get_history(session_id: str):
 )
 async def clear_history(session_id: str):
     """Clear conversation history for a session."""
-    from src.core.memory_manager import memory_manager
-    from src.core.session_manager import session_manager
+    from src.core.session_store import session_store
 
-    memory_manager.clear(session_id)
-    session_manager.reset(session_id)
+    session_store.reset(session_id)
 
-    return APIResponse(
-        success=True,
+    return api_response(
         data={"session_id": session_id, "message": "Conversation history cleared."}
     )
+
+
+@router.post(
+    "/chat/session/{session_id}/fork",
+    response_model=APIResponse,
+    summary="Fork a session",
+    description=(
+        "Create a branch of the session that keeps its history up to and including "
+        "message_id, e.g. to edit and regenerate from that point. Branches share "
+        "the common history with their parent instead of copying it."
+    )
+)
+async def fork_session(session_id: str, body: ForkRequest, request: Request):
+    """Branch a conversation at one of its messages."""
+    from src.core.session_store import SessionExists, session_store
+
+    # The affinity dispatcher picks a branch id on the parent's worker (clients cannot set it)
+    branch_id = request.headers.get(BRANCH_ID_HEADER)
+    try:
+        branch = session_store.fork(session_id, body.message_id, branch_id)
+    except SessionExists:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Session '{branch_id}' already exists."
+        )
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Message '{body.message_id}' not found in session '{session_id}'."
+        )
+    if branch is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Session '{session_id}' not found or expired."
+        )
+
+    return api_response(
+        data={
+            **branch.to_dict(),
+            "history_length": len(branch.buffer),
+            "message": "Branch created. Use its session_id in subsequent /chat requests.",
+        }
+    )
+
+
+@router.get(
+    "/chat/session/{session_id}/branches",
+    response_model=APIResponse,
+    summary="List branches",
+    description="Return the session's parent (if it is a branch) and the branches forked from it."
+)
+async def list_branches(session_id: str):
+    """List the branches of a session."""
+    from src.core.session_store import session_store
+
+    branches = session_store.list_branches(session_id)
+    if branches is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Session '{session_id}' not found or expired."
+        )
+
+    return api_response(data=branches)
+
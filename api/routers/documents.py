@@ -5,30 +5,49 @@ POST /api/v1/analyze/document — Upload document + query → AI analysis
 import uuid
 import time
 import logging
-from fastapi import APIRouter, HTTPException, File, Form, UploadFile, status
+from fastapi import APIRouter, HTTPException, File, Form, Request, UploadFile, status
 
-from api.models.schemas import APIResponse
+from api.models.schemas import DocumentAnalysisEnvelope
+from api.responses import api_response
+from api.middleware.rate_limit import tenant_id
+from src.core.concurrency import Overloaded
+from src.core.deadline import ClientDisconnected, DeadlineExceeded, run_in_thread
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["Analysis"])
 
+# Extracted text per unit of fair-queuing cost: a long document takes
+# proportionally more of its tenant's turns than a short one
+_COST_CHARS = 50_000
+
 
 @router.post(
     "/analyze/document",
-    response_model=APIResponse,
+    response_model=DocumentAnalysisEnvelope,
     summary="Analyze a document with Gemini",
     description="Upload a document (PDF, DOCX, TXT, CSV, JSON, XLSX) and ask a question about it."
 )
 async def analyze_document(
+    request: Request,
     file: UploadFile = File(..., description="Document file"),
     query: str = Form(default="Summarize this document.", description="Your question about the document"),
     session_id: str = Form(default=None, description="Optional session ID")
 ):
     """Process and analyze an uploaded document."""
     from src.core.gemini_client import gemini_client
+    from src.core.scheduler import analysis_scheduler
+    from src.core.degrade import degrade_controller
     from src.utils.file_processor import file_processor
     from config.settings import settings
 
+    policy = degrade_controller.policy()
+    if not policy.analysis_enabled:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Document analysis is paused while the service is under heavy load.",
+            headers={"Retry-After": str(degrade_controller.retry_after())},
+        )
+
     start = time.perf_counter()
     session_id = session_id or str(uuid.uuid4())
 
@@ -68,7 +87,8 @@ async def analyze_document(
                 return self._content
 
         mock = MockUpload(content_bytes, file.filename, len(content_bytes))
-        success, text_content, error = file_processor.process_text_file(mock)
+        # Parsing (PDF, DOCX, spreadsheets) is CPU-bound — keep it off the event loop
+        success, text_content, error = await run_in_thread(file_processor.process_text_file, mock)
 
         if not success:
             raise HTTPException(
@@ -82,23 +102,27 @@ async def analyze_document(
             "Extract key information, provide structured insights, and reference specific sections when relevant."
         )
 
-        analysis = gemini_client.process_document(text_content, query, ext, system_instruction)
+        cost = max(1.0, len(text_content) / _COST_CHARS)
+        async with analysis_scheduler.slot(tenant_id(request.scope), cost):
+            analysis = await run_in_thread(
+                gemini_client.process_document, text_content, query, ext, system_instruction,
+                model=policy.model, max_tokens=policy.max_tokens,
+            )
         latency = (time.perf_counter() - start) * 1000
 
-        return APIResponse(
-            success=True,
+        return api_response(
             data={
                 "analysis": analysis,
                 "session_id": session_id,
                 "filename": file.filename,
                 "file_type": ext.upper(),
                 "file_size_kb": round(file_size_kb, 2),
-                "model": settings.text_model,
+                "model": policy.model or settings.text_model,
                 "latency_ms": round(latency, 2)
             }
         )
 
-    except HTTPException:
+    except (HTTPException, Overloaded, DeadlineExceeded, ClientDisconnected):
         raise
     except Exception as e:
         logger.error(f"Document analysis error: {e}", exc_info=True)
@@ -1,7 +1,8 @@
 """
 Health & Info router.
-GET /api/v1/health  — API status + Gemini connectivity
-GET /api/v1/info    — Model info, capabilities, limits
+GET /api/v1/health       — API status + Gemini connectivity
+GET /api/v1/health/live  — Cheap liveness probe (no upstream calls)
+GET /api/v1/info         — Model info, capabilities, limits
 """
 import time
 import logging
@@ -21,7 +22,13 @@ _start_time = time.time()
 async def health_check():
     """Check API health and Gemini API connectivity."""
     from src.core.gemini_client import gemini_client
-    from src.core.session_manager import session_manager
+    from src.core.session_store import session_store
+    from src.pipeline.stages import summary_stage
+    from src.core.rate_limit import rate_limiter
+    from src.core.concurrency import chat_limiter, analysis_limiter
+    from src.core.scheduler import chat_scheduler, analysis_scheduler
+    from src.core.degrade import degrade_controller
+    from src.core.deadline import deadline_stats
     from config.settings import settings
 
     gemini_status = "unknown"
@@ -38,7 +45,20 @@ async def health_check():
             "version": settings.app_version,
             "app_name": settings.app_name,
             "gemini_status": gemini_status,
-            "active_sessions": session_manager.count(),
+            "active_sessions": session_store.count(),
+            "session_store": session_store.stats(),
+            "summarizer": summary_stage.stats() if settings.summary_enabled else None,
+            "rate_limiter": rate_limiter.stats() if settings.rate_limit_enabled else None,
+            "concurrency": {
+                "chat": chat_limiter.stats(),
+                "analysis": analysis_limiter.stats(),
+            },
+            "scheduler": {
+                "chat": chat_scheduler.stats(),
+                "analysis": analysis_scheduler.stats(),
+            },
+            "degradation": degrade_controller.stats(),
+            "deadlines": deadline_stats.as_dict(),
             "uptime_seconds": round(time.time() - _start_time, 1),
             "timestamp": datetime.utcnow().isoformat(),
             "python_version": sys.version.split()[0],
@@ -46,6 +66,12 @@ async def health_check():
     }
 
 
+@router.get("/health/live", summary="Liveness probe")
+async def liveness():
+    """Report that this process is serving requests, without touching Gemini."""
+    return {"success": True, "data": {"status": "alive"}}
+
+
 @router.get("/info", summary="Model & configuration info")
 async def model_info():
     """Return current model configuration and supported capabilities."""
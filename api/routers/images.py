@@ -5,10 +5,14 @@ POST /api/v1/analyze/image — Upload image + prompt → Gemini vision analysis
 import uuid
 import time
 import logging
-from fastapi import APIRouter, HTTPException, File, Form, UploadFile, status
+from fastapi import APIRouter, HTTPException, File, Form, Request, UploadFile, status
 from fastapi.responses import JSONResponse
 
-from api.models.schemas import APIResponse
+from api.models.schemas import ImageAnalysisEnvelope
+from api.responses import api_response
+from api.middleware.rate_limit import tenant_id
+from src.core.concurrency import Overloaded
+from src.core.deadline import ClientDisconnected, DeadlineExceeded, run_in_thread
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["Analysis"])
@@ -16,20 +20,31 @@ router = APIRouter(tags=["Analysis"])
 
 @router.post(
     "/analyze/image",
-    response_model=APIResponse,
+    response_model=ImageAnalysisEnvelope,
     summary="Analyze an image with Gemini Vision",
     description="Upload an image file and provide a prompt. Returns a detailed AI analysis."
 )
 async def analyze_image(
+    request: Request,
     file: UploadFile = File(..., description="Image file (jpg, png, gif, webp, bmp)"),
     prompt: str = Form(default="Describe this image in detail.", description="Analysis prompt"),
     session_id: str = Form(default=None, description="Optional session ID")
 ):
     """Analyze an uploaded image using Gemini Vision."""
     from src.core.gemini_client import gemini_client
+    from src.core.scheduler import analysis_scheduler
+    from src.core.degrade import degrade_controller
     from src.utils.file_processor import file_processor
     from config.settings import settings
 
+    policy = degrade_controller.policy()
+    if not policy.analysis_enabled:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Image analysis is paused while the service is under heavy load.",
+            headers={"Retry-After": str(degrade_controller.retry_after())},
+        )
+
     start = time.perf_counter()
     session_id = session_id or str(uuid.uuid4())
 
@@ -63,11 +78,14 @@ async def analyze_image(
             "Be descriptive about objects, colors, composition, context, and any text visible."
         )
 
-        analysis = gemini_client.analyze_image(image, prompt, system_instruction)
+        async with analysis_scheduler.slot(tenant_id(request.scope)):
+            analysis = await run_in_thread(
+                gemini_client.analyze_image, image, prompt, system_instruction,
+                max_tokens=policy.max_tokens,
+            )
         latency = (time.perf_counter() - start) * 1000
 
-        return APIResponse(
-            success=True,
+        return api_response(
             data={
                 "analysis": analysis,
                 "session_id": session_id,
@@ -78,6 +96,8 @@ async def analyze_image(
             }
         )
 
+    except (Overloaded, DeadlineExceeded, ClientDisconnected):
+        raise
     except Exception as e:
         logger.error(f"Image analysis error: {e}", exc_info=True)
         raise HTTPException(
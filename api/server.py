@@ -0,0 +1,222 @@
+"""
+Production server: a preloaded app served by pre-forked uvicorn workers.
+
+    python run_api.py --mode production --workers 8
+
+The master process imports the app once (settings, routers, the static asset
+build) along with the Gemini SDK every worker calls, binds the listening socket with
+SERVER_BACKLOG, freezes its heap out of the garbage collector's reach and
+forks the workers, so the preloaded memory is shared copy-on-write instead
+of being paid once per worker. Each worker serves the inherited socket with
+uvloop and httptools when they are installed, closes idle keep-alive
+connections after SERVER_KEEPALIVE_SECONDS, answers 503 beyond
+SERVER_LIMIT_CONCURRENCY concurrent connections, and logs a startup-time
+report once it is ready.
+
+On SIGTERM (or SIGINT) the master closes its copy of the socket and passes
+SIGTERM on: each worker stops accepting, finishes its in-flight requests
+within GRACEFUL_TIMEOUT_SECONDS, then runs the app's shutdown, which flushes
+the session store's persistence. A worker that exits on its own is forked
+again; one that fails during startup stops the server.
+
+Workers share nothing at run time. Unlike ``--mode affinity`` requests are
+not routed by session, so use a shared SESSION_BACKEND (redis) when running
+more than one worker.
+"""
+import gc
+import os
+import sys
+import time
+import signal
+import socket
+import logging
+from typing import Dict, Optional
+
+import uvicorn
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Exit status of a worker whose startup failed (the master gives up)
+WORKER_BOOT_ERROR = 3
+# A worker dying sooner than this after its fork is restarted only after this long
+RESTART_BACKOFF = 1.0
+
+
+def _installed(module: str) -> bool:
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+def event_loop() -> str:
+    return "uvloop" if _installed("uvloop") else "asyncio"
+
+
+def http_protocol() -> str:
+    return "httptools" if _installed("httptools") else "h11"
+
+
+def bind(host: str, port: int, backlog: int) -> socket.socket:
+    """The listening socket every worker accepts on."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    try:
+        with open("/proc/sys/net/core/somaxconn") as f:
+            somaxconn = int(f.read())
+        if backlog > somaxconn:
+            logger.warning(f"SERVER_BACKLOG={backlog} is capped by net.core.somaxconn={somaxconn}")
+    except (OSError, ValueError):
+        pass
+    return sock
+
+
+class WorkerServer(uvicorn.Server):
+    """uvicorn.Server that reports how long the worker took to become ready."""
+
+    def __init__(self, config: uvicorn.Config, index: int, forked_at: float, preload_ms: float):
+        super().__init__(config)
+        self.index = index
+        self.forked_at = forked_at
+        self.preload_ms = preload_ms
+
+    async def startup(self, sockets=None):
+        lifespan_start = time.perf_counter()
+        await super().startup(sockets)
+        if self.should_exit:
+            return
+        now = time.perf_counter()
+        config = self.config
+        logger.info(
+            f"✦ Worker {self.index} ready | pid={os.getpid()} "
+            f"startup={(now - self.forked_at) * 1000:.0f}ms "
+            f"(app startup {(now - lifespan_start) * 1000:.0f}ms, "
+            f"preload {self.preload_ms:.0f}ms shared) "
+            f"loop={config.loop} http={config.http} "
+            f"limit_concurrency={config.limit_concurrency} keepalive={config.timeout_keep_alive}s"
+        )
+
+
+def _run_worker(app, index: int, sock: socket.socket, preload_ms: float) -> int:
+    forked_at = time.perf_counter()
+    gc.enable()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, signal.SIG_DFL)   # uvicorn installs its own
+    os.environ["CONRUX_WORKER_ID"] = str(index)
+
+    config = uvicorn.Config(
+        app,
+        loop=event_loop(),
+        http=http_protocol(),
+        lifespan="on",
+        backlog=settings.server_backlog,
+        timeout_keep_alive=settings.server_keepalive_seconds,
+        limit_concurrency=settings.server_limit_concurrency or None,
+        timeout_graceful_shutdown=settings.graceful_timeout_seconds,
+        log_level=settings.log_level.lower(),
+    )
+    server = WorkerServer(config, index, forked_at, preload_ms)
+    try:
+        server.run(sockets=[sock])
+    except SystemExit:   # uvicorn exits this way when the app's startup fails
+        pass
+    return 0 if server.started else WORKER_BOOT_ERROR
+
+
+def serve(workers: int, host: str, port: int):
+    """Preload the app, fork ``workers`` workers and supervise them until SIGTERM."""
+    start = time.perf_counter()
+    gc.disable()   # no collections while preloading: fewer freed holes in pages shared later
+    from api.main import app
+    from src.core.gemini_client import gemini_client
+    if settings.gemini_api_key:
+        gemini_client.genai   # loaded lazily elsewhere; every worker needs it, so share one copy
+    preload_ms = (time.perf_counter() - start) * 1000
+
+    sock = bind(host, port, settings.server_backlog)
+    if workers > 1 and settings.session_backend.lower() != "redis":
+        logger.warning(
+            f"{workers} workers with SESSION_BACKEND={settings.session_backend}: each worker "
+            "keeps its own sessions (use redis, or --mode affinity)"
+        )
+    logger.info(
+        f"✦ Serving on {host}:{port} | workers={workers} preload={preload_ms:.0f}ms "
+        f"loop={event_loop()} http={http_protocol()} backlog={settings.server_backlog}"
+    )
+    gc.freeze()    # preloaded objects are never collected, so children never write to their pages
+
+    children: Dict[int, int] = {}      # pid → worker index
+    forked: Dict[int, float] = {}      # worker index → fork time
+    stopping = False
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = _run_worker(app, index, sock, preload_ms)
+            finally:
+                os._exit(code)   # never return into the master's loop
+        children[pid] = index
+        forked[index] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        if stopping:
+            return
+        stopping = True
+        logger.info(f"✦ {signal.Signals(signum).name}: draining {len(children)} workers")
+        sock.close()   # the workers hold the only remaining copies
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for index in range(workers):
+        spawn(index)
+
+    exit_code = 0
+    kill_at: Optional[float] = None
+    while children:
+        if stopping and kill_at is None:
+            kill_at = time.monotonic() + settings.graceful_timeout_seconds + 5
+        if kill_at is not None and time.monotonic() > kill_at:
+            for pid, index in children.items():
+                logger.warning(f"Worker {index} did not drain in time — killing")
+                os.kill(pid, signal.SIGKILL)
+            kill_at = float("inf")
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(0.1)
+            continue
+        index = children.pop(pid, None)
+        if index is None:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        if stopping:
+            logger.info(f"Worker {index} exited (status {code})")
+        elif code == WORKER_BOOT_ERROR:
+            logger.error(f"Worker {index} failed to start — shutting down")
+            exit_code = 1
+            stop(signal.SIGTERM, None)
+        else:
+            logger.warning(f"Worker {index} (pid {pid}) exited with status {code} — restarting")
+            if time.monotonic() - forked[index] < RESTART_BACKOFF:
+                time.sleep(RESTART_BACKOFF)
+            spawn(index)
+
+    logger.info("✦ All workers drained.")
+    sys.exit(exit_code)
@@ -0,0 +1,108 @@
+"""
+Cold-start import profile of the API app.
+
+    python run_api.py --profile-startup                  # report
+    python run_api.py --profile-startup --budget-ms 800  # report, exit 1 over budget
+
+Imports ``api.main`` in fresh interpreters under ``python -X importtime`` and
+reports the best run: total import time, the slowest modules (cumulative,
+i.e. including what they import) and whether any library that is meant to
+load lazily — on the first document, image or Gemini call — was imported
+anyway. With a budget the check fails when the import time exceeds it or a
+lazy library is imported eagerly, so it can gate CI against cold-start
+regressions.
+"""
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+ROOT = Path(__file__).parent.parent
+
+TARGET = "api.main"
+# Imported on first use only; an eager import of any of them is a regression
+LAZY_MODULES = ("pandas", "PyPDF2", "docx", "PIL", "google.generativeai", "grpc", "numpy")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+class ImportRecord(NamedTuple):
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int          # 0 = imported directly by the profiled statement
+
+
+class StartupProfile(NamedTuple):
+    records: List[ImportRecord]
+    total_ms: float     # cumulative import time of TARGET
+    eager: List[str]    # LAZY_MODULES that were imported anyway
+
+
+def parse_importtime(output: str) -> List[ImportRecord]:
+    """Records from ``-X importtime`` output (stderr), in the order Python printed them."""
+    records = []
+    for line in output.splitlines():
+        m = _LINE.match(line)
+        if m:
+            self_us, cumulative_us, indent, name = m.groups()
+            records.append(ImportRecord(name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return records
+
+
+def profile_once(target: str = TARGET) -> StartupProfile:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")])))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{proc.stderr[-2000:]}")
+    records = parse_importtime(proc.stderr)
+    total = next((r.cumulative_us for r in records if r.name == target), 0)
+    imported = {r.name for r in records}
+    eager = [m for m in LAZY_MODULES if m in imported]
+    return StartupProfile(records, total / 1000, eager)
+
+
+def profile(target: str = TARGET, runs: int = 3) -> StartupProfile:
+    """The fastest of ``runs`` cold imports (the least disturbed by other load)."""
+    return min((profile_once(target) for _ in range(max(1, runs))), key=lambda p: p.total_ms)
+
+
+def report(result: StartupProfile, top: int = 15) -> str:
+    # Cumulative times nest (a module's includes its children's); the indent shows the nesting
+    below = [r for r in result.records if r.depth >= 1]
+    lines = [f"Cold import of {TARGET}: {result.total_ms:.0f}ms", "", "  cumulative    self  module"]
+    for r in sorted(below, key=lambda r: r.cumulative_us, reverse=True)[:top]:
+        lines.append(f"  {r.cumulative_us / 1000:8.1f}ms {r.self_us / 1000:6.1f}ms  {'  ' * (r.depth - 1)}{r.name}")
+    lines.append("")
+    if result.eager:
+        lines.append(f"Imported eagerly (should load on first use): {', '.join(result.eager)}")
+    else:
+        lines.append(f"Lazy libraries not imported: {', '.join(LAZY_MODULES)}")
+    return "\n".join(lines)
+
+
+def check(result: StartupProfile, budget_ms: float) -> List[str]:
+    """Budget violations (empty when the profile passes)."""
+    problems = []
+    if result.total_ms > budget_ms:
+        problems.append(f"import time {result.total_ms:.0f}ms exceeds the {budget_ms:.0f}ms budget")
+    problems.extend(f"{m} is imported at startup" for m in result.eager)
+    return problems
+
+
+def main(budget_ms: Optional[float] = None, runs: int = 3) -> int:
+    result = profile(runs=runs)
+    print(report(result))
+    if budget_ms is None:
+        return 0
+    problems = check(result, budget_ms)
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if not problems:
+        print(f"OK: within the {budget_ms:.0f}ms budget")
+    return 1 if problems else 0
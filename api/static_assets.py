@@ -0,0 +1,136 @@
+"""
+Fingerprinted, precompressed static frontend.
+
+Built once when the app is created: every file under frontend/ is read into
+memory, content-hashed, and compressed ahead of time (gzip, plus brotli when
+installed), so requests cost no compression CPU. Assets are published at
+fingerprinted URLs (``/static/css/main.<hash>.css``) served with
+``Cache-Control: immutable`` — a repeat visit transfers nothing for them —
+and index.html is rewritten to reference those URLs. index.html and the
+plain asset URLs are served ``no-cache`` with an ETag, so browsers
+revalidate them with a 304.
+"""
+import gzip
+import re
+import hashlib
+import logging
+import mimetypes
+from pathlib import Path
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from fastapi import Request, Response
+
+from api.middleware.compression import brotli, compressible, negotiate
+
+logger = logging.getLogger(__name__)
+
+HASH_LENGTH = 12
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+# Build-time compression runs once, so it uses the strongest settings
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+_STATIC_REF = re.compile(r'(?P<attr>(?:href|src)=")(?P<url>/static/[^"?#]+)"')
+
+
+class Asset(NamedTuple):
+    body: bytes
+    media_type: str
+    etag: str
+    cache_control: str
+    variants: Dict[str, bytes]   # content-coding → precompressed body (only if smaller)
+
+
+def _variants(body: bytes, media_type: str) -> Dict[str, bytes]:
+    if not compressible(media_type):
+        return {}
+    variants = {"gzip": gzip.compress(body, GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return {coding: data for coding, data in variants.items() if len(data) < len(body)}
+
+
+def _digest(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+
+
+def _asset(body: bytes, media_type: str, cache_control: str) -> Asset:
+    return Asset(body, media_type, f'W/"{_digest(body)}"', cache_control, _variants(body, media_type))
+
+
+def _fingerprinted(url: str, digest: str) -> str:
+    stem, dot, ext = url.rpartition(".")
+    if not dot or "/" in ext:
+        return f"{url}.{digest}"
+    return f"{stem}.{digest}.{ext}"
+
+
+class StaticAssets:
+    """In-memory frontend assets keyed by URL path."""
+
+    def __init__(self, directory: Path, prefix: str = "/static", index: str = "index.html"):
+        self._assets: Dict[str, Asset] = {}
+        self.urls: Dict[str, str] = {}   # plain URL → fingerprinted URL
+        self._build(Path(directory), prefix.rstrip("/"), index)
+
+    def _build(self, directory: Path, prefix: str, index: str):
+        for path in sorted(p for p in directory.rglob("*") if p.is_file()):
+            rel = path.relative_to(directory).as_posix()
+            if rel == index:
+                continue
+            body = path.read_bytes()
+            media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            url = f"{prefix}/{rel}"
+            fingerprinted = _fingerprinted(url, _digest(body))
+            self._assets[fingerprinted] = _asset(body, media_type, IMMUTABLE)
+            self._assets[url] = self._assets[fingerprinted]._replace(cache_control=REVALIDATE)
+            self.urls[url] = fingerprinted
+
+        index_path = directory / index
+        if index_path.exists():
+            html = _STATIC_REF.sub(
+                lambda m: f'{m["attr"]}{self.urls.get(m["url"], m["url"])}"',
+                index_path.read_text(encoding="utf-8"),
+            )
+            self._assets["/"] = _asset(html.encode(), "text/html", REVALIDATE)
+
+        unique = {id(a.body): a for a in self._assets.values()}.values()   # plain URLs share bodies
+        stored = sum(len(a.body) + sum(map(len, a.variants.values())) for a in unique)
+        logger.info(
+            f"Static assets built | files={len(self.urls)} "
+            f"encodings={sorted({c for a in self._assets.values() for c in a.variants})} "
+            f"memory={stored / 1024:.0f}KB"
+        )
+
+    def response(self, url: str, request: Request) -> Optional[Response]:
+        """The response for ``url`` (a 304 if the client's copy is current), or None if unknown."""
+        asset = self._assets.get(url)
+        if asset is None:
+            return None
+        headers = {"ETag": asset.etag, "Cache-Control": asset.cache_control}
+        if asset.variants:
+            headers["Vary"] = "Accept-Encoding"
+        if _matches(request.headers.get("if-none-match"), asset.etag):
+            return Response(status_code=304, headers=headers)
+
+        body = asset.body
+        coding = None
+        accept = request.headers.get("accept-encoding")
+        if asset.variants and accept:
+            coding = negotiate(accept, brotli_available="br" in asset.variants)
+        if coding in asset.variants:
+            body = asset.variants[coding]
+            headers["Content-Encoding"] = coding
+        return Response(body, media_type=asset.media_type, headers=headers)
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    tags: Iterable[str] = (t.strip() for t in if_none_match.split(","))
+    return any((t[2:] if t.startswith("W/") else t) == opaque for t in tags)
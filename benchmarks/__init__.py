@@ -0,0 +1 @@
+"""Benchmarks — run from the repository root, e.g. ``python -m benchmarks.session_memory``."""
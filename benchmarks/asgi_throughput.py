@@ -0,0 +1,96 @@
+"""
+Requests per second through the full middleware stack, without a network.
+
+    python -m benchmarks.asgi_throughput
+    python -m benchmarks.asgi_throughput --requests 20000 --concurrency 100 --log-level INFO
+
+Drives ``api.main:app`` in process with hand-built ASGI scopes, so the
+numbers measure the app (middleware, routing, response building) rather
+than a server or socket. Three trivial requests: a public path, an
+authenticated request the router answers with 404, and a request rejected
+with 401 for a missing key. Each is run ``--runs`` times and the best run is
+reported. Only ``api.main.app`` is used, so the script also runs against
+older trees for a before/after.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+API_KEY = "benchmark-key"
+
+CASES = (
+    ("public  /health/live", "/api/v1/health/live", True),
+    ("authed  /chat/history (404)", "/api/v1/chat/history/no-such-session", True),
+    ("401     missing key", "/api/v1/chat/history/no-such-session", False),
+)
+
+
+def make_scope(path: str, with_key: bool) -> dict:
+    headers = [(b"host", b"bench")]
+    if with_key:
+        headers.append((b"x-api-key", API_KEY.encode()))
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": b"", "headers": headers, "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+
+async def request(app, scope: dict) -> int:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    status = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(dict(scope), receive, send)
+    return status[0]
+
+
+async def throughput(app, scope: dict, requests: int, concurrency: int) -> float:
+    async def client(n: int):
+        for _ in range(n):
+            await request(app, scope)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(requests // concurrency) for _ in range(concurrency)))
+    return requests // concurrency * concurrency / (time.perf_counter() - started)
+
+
+async def run(args) -> None:
+    from api.main import app
+
+    logging.getLogger("api.access").setLevel(args.log_level)
+    async with app.router.lifespan_context(app):
+        print(f"{args.requests} requests x {args.concurrency} concurrent, best of {args.runs}, "
+              f"LOG_LEVEL={args.log_level}")
+        for label, path, with_key in CASES:
+            scope = make_scope(path, with_key)
+            status = await request(app, scope)
+            best = max([await throughput(app, scope, args.requests, args.concurrency) for _ in range(args.runs)])
+            print(f"  {label:<30} {status:>3}  {best:>9,.0f} req/s")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+
+    # Read by config.settings on import, so set before the app is loaded
+    os.environ["CHATBOT_API_KEY"] = API_KEY
+    os.environ["LOG_LEVEL"] = args.log_level
+    asyncio.run(run(args))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
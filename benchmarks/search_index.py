@@ -0,0 +1,112 @@
+"""
+Full-text search index: resident memory and query latency.
+
+    python -m benchmarks.search_index
+    python -m benchmarks.search_index --sessions 20000 --messages 40 --queries 200
+
+Generates a synthetic corpus (Zipf-distributed vocabulary, plus a rare
+"invoice 4417" planted in a few messages), then:
+
+- builds a standalone SearchIndex from it under tracemalloc and reports
+  traced bytes per indexed message next to the index's own estimate
+  (``stats()["bytes"]``);
+- loads the same corpus into a SessionStore with the index on and times
+  ``search()`` for rare, common, multi-word, prefix and phrase queries.
+"""
+import argparse
+import gc
+import random
+import statistics
+import time
+import tracemalloc
+from typing import List, Tuple
+
+from src.core.search import SearchIndex
+from src.core.session_store import SessionStore
+from src.core.sharding import DEFAULT_SHARDS
+
+RARE_MARKER = "please find invoice 4417 attached"
+
+QUERIES = (
+    ("rare term", "4417"),
+    ("rare phrase", '"invoice 4417"'),
+    ("common term", "w1"),
+    ("two common terms", "w1 w2"),
+    ("prefix", "w12*"),
+    ("common phrase", '"w1 w2"'),
+)
+
+Corpus = List[Tuple[str, List[str]]]   # (session_id, messages oldest first)
+
+
+def make_corpus(sessions: int, messages: int, vocabulary: int, words: int, seed: int = 7) -> Corpus:
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(1, vocabulary + 1)]
+    weights = [1 / i for i in range(1, vocabulary + 1)]
+    corpus = []
+    for s in range(sessions):
+        texts = [" ".join(rng.choices(vocab, weights, k=words)) for _ in range(messages)]
+        if s % 1000 == 0:
+            texts[rng.randrange(messages)] += f" {RARE_MARKER}"
+        corpus.append((f"s{s}", texts))
+    return corpus
+
+
+def index_memory(corpus: Corpus, num_shards: int) -> Tuple[int, dict]:
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    index = SearchIndex(num_shards)
+    for session_id, texts in corpus:
+        for i, text in enumerate(texts):
+            index.add(session_id, f"{session_id}-{i}", "user", float(i), text)
+    gc.collect()
+    traced = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return traced, index.stats()
+
+
+def query_latency(corpus: Corpus, queries: int, limit: int) -> List[Tuple[str, str, int, float, float]]:
+    store = SessionStore()
+    store.configure(max_messages=max(len(texts) for _, texts in corpus), search_index=True)
+    for session_id, texts in corpus:
+        for i, text in enumerate(texts):
+            store.add_message(session_id, "user" if i % 2 == 0 else "assistant", text)
+    rows = []
+    for label, q in QUERIES:
+        times = []
+        for _ in range(queries):
+            started = time.perf_counter()
+            _, total = store.search(q, limit)
+            times.append((time.perf_counter() - started) * 1000)
+        times.sort()
+        rows.append((label, q, total, statistics.median(times), times[int(len(times) * 0.95)]))
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10_000)
+    parser.add_argument("--messages", type=int, default=40)
+    parser.add_argument("--words", type=int, default=20, help="words per message")
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS)
+    parser.add_argument("--queries", type=int, default=100, help="timed runs per query")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    corpus = make_corpus(args.sessions, args.messages, args.vocabulary, args.words)
+    n = args.sessions * args.messages
+    traced, stats = index_memory(corpus, args.shards)
+    print(f"{args.sessions} sessions x {args.messages} messages x {args.words} words ({n} messages)")
+    print(f"  index traced:    {traced / 2**20:8.1f} MiB  {traced / n:6.1f} B/message")
+    print(f"  index estimate:  {stats['bytes'] / 2**20:8.1f} MiB  ({stats['postings']} postings, {stats['terms']} terms)")
+    print()
+    print(f"  {'query':<18} {'q':<16} {'matches':>8} {'p50':>9} {'p95':>9}")
+    for label, q, total, p50, p95 in query_latency(corpus, args.queries, args.limit):
+        print(f"  {label:<18} {q:<16} {total:>8} {p50:>7.3f}ms {p95:>7.3f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,138 @@
+"""
+Lock contention of the session store: one global lock vs. lock striping.
+
+    python -m benchmarks.session_contention
+    python -m benchmarks.session_contention --threads 1 4 16 --seconds 3
+
+Runs the chat hot path — ``add_message`` then ``get_gemini_history`` on a
+random session — from N threads against a SessionStore with one shard (the
+single-lock layout the stores used to have) and with the default striping,
+while one more thread calls ``list_sessions`` at a fixed rate, like a
+health poller, so both layouts carry the same background work. Every shard lock is wrapped to count acquisitions that
+had to wait and how long they waited.
+
+Under the GIL, Python work cannot run in parallel, so ops/s only shows the
+share of time lost to lock convoys; the contention columns are the direct
+measure of what striping removes.
+"""
+import argparse
+import random
+import threading
+import time
+from typing import Dict, List
+
+from src.core.session_store import SessionStore
+from src.core.sharding import DEFAULT_SHARDS
+
+
+class CountingLock:
+    """A threading.Lock that records how often and how long acquirers waited."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.contended = 0
+        self.wait_s = 0.0
+
+    def __enter__(self):
+        if not self._lock.acquire(blocking=False):
+            started = time.perf_counter()
+            self._lock.acquire()
+            self.contended += 1
+            self.wait_s += time.perf_counter() - started
+        self.acquired += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+
+def build_store(num_shards: int, sessions: int, messages: int) -> SessionStore:
+    store = SessionStore(num_shards)
+    store.configure(max_messages=messages)
+    for shard in store._sessions.shards():
+        shard.lock = CountingLock()
+    for s in range(sessions):
+        for m in range(messages):
+            store.add_message(f"s{s}", "user" if m % 2 == 0 else "assistant", f"message {m} of session {s}")
+    for shard in store._sessions.shards():
+        shard.lock.acquired = shard.lock.contended = 0
+        shard.lock.wait_s = 0.0
+    return store
+
+
+def run(
+    num_shards: int, threads: int, seconds: float, sessions: int, messages: int, window: int, list_every: float
+) -> Dict[str, float]:
+    store = build_store(num_shards, sessions, messages)
+    stop = threading.Event()
+    ops: List[int] = [0] * threads
+    listed = [0]
+    latencies: List[List[float]] = [[] for _ in range(threads)]
+
+    def chat(i: int):
+        rng = random.Random(i)
+        mine = latencies[i]
+        while not stop.is_set():
+            session_id = f"s{rng.randrange(sessions)}"
+            started = time.perf_counter()
+            store.add_message(session_id, "user", "one more question")
+            store.get_gemini_history(session_id, window)
+            mine.append(time.perf_counter() - started)
+            ops[i] += 1
+
+    def lister():
+        while not stop.wait(list_every):
+            store.list_sessions()
+            listed[0] += 1
+
+    workers = [threading.Thread(target=chat, args=(i,)) for i in range(threads)]
+    workers.append(threading.Thread(target=lister))
+    for t in workers:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in workers:
+        t.join()
+
+    locks = [shard.lock for shard in store._sessions.shards()]
+    acquired = sum(lock.acquired for lock in locks)
+    contended = sum(lock.contended for lock in locks)
+    ordered = sorted(lat for per_thread in latencies for lat in per_thread)
+    return {
+        "ops_s": sum(ops) / seconds,
+        "lists_s": listed[0] / seconds,
+        "contended_pct": 100 * contended / max(1, acquired),
+        "wait_ms_per_op": 1000 * sum(lock.wait_s for lock in locks) / max(1, sum(ops)),
+        "p99_ms": 1000 * ordered[int(len(ordered) * 0.99)] if ordered else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=40)
+    parser.add_argument("--window", type=int, default=20)
+    parser.add_argument("--list-every-ms", type=float, default=50.0, help="list_sessions() period")
+    args = parser.parse_args(argv)
+
+    print(f"{args.sessions} sessions x {args.messages} messages, list_sessions() every {args.list_every_ms:g}ms")
+    print(f"{'threads':>7} {'shards':>6} {'ops/s':>9} {'lists/s':>8} {'contended':>9} {'wait/op':>9} {'p99':>8}")
+    for threads in args.threads:
+        for shards in (1, args.shards):
+            r = run(
+                shards, threads, args.seconds, args.sessions, args.messages, args.window,
+                args.list_every_ms / 1000,
+            )
+            print(
+                f"{threads:>7} {shards:>6} {r['ops_s']:>9.0f} {r['lists_s']:>8.1f} {r['contended_pct']:>8.1f}% "
+                f"{r['wait_ms_per_op']:>7.3f}ms {r['p99_ms']:>6.2f}ms"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,84 @@
+"""
+Resident memory of stored conversation history, in bytes per message.
+
+    python -m benchmarks.session_memory                            # 100k sessions x 40 messages
+    python -m benchmarks.session_memory --sessions 5000 --window 20
+
+Fills one SessionBuffer per session with short alternating user/assistant
+messages and reports the traced allocations per message: first for storage
+alone, then after every session has served one request — its last
+``--window`` messages built into Gemini history, as the context stage does —
+to show whether serving requests leaves anything behind. Only
+``SessionBuffer(max_messages)``, ``add_message`` and ``get_gemini_history``
+are used, so the script also runs against older trees for a before/after.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from src.core.session_store import SessionBuffer
+
+SAMPLE_TEXTS = (
+    "Can you summarise the invoice from last week?",
+    "Sure — the invoice totals 1,240 EUR across three line items.",
+    "What was the largest line item?",
+    "Consulting hours: 18 hours at 50 EUR, so 900 EUR.",
+)
+
+
+def traced_bytes() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def run(sessions: int, messages: int, window: int) -> dict:
+    tracemalloc.start()
+    base = traced_bytes()
+    buffers = []
+    started = time.perf_counter()
+    for s in range(sessions):
+        buffer = SessionBuffer(max_messages=messages)
+        for m in range(messages):
+            # Distinct strings, as real messages are: nothing is shared between sessions
+            text = f"{SAMPLE_TEXTS[m % len(SAMPLE_TEXTS)]} #{s}.{m}"
+            buffer.add_message("user" if m % 2 == 0 else "assistant", text)
+        buffers.append(buffer)
+    fill_s = time.perf_counter() - started
+    stored = traced_bytes() - base
+
+    started = time.perf_counter()
+    for buffer in buffers:
+        buffer.get_gemini_history(window)
+    serve_s = time.perf_counter() - started
+    served = traced_bytes() - base
+    tracemalloc.stop()
+
+    total = sessions * messages
+    return {
+        "messages": total,
+        "stored_per_msg": stored / total,
+        "served_per_msg": served / total,
+        "fill_us_per_msg": fill_s / total * 1e6,
+        "history_us_per_call": serve_s / sessions * 1e6,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--messages", type=int, default=40)
+    parser.add_argument("--window", type=int, default=20, help="messages per Gemini history request")
+    args = parser.parse_args(argv)
+
+    r = run(args.sessions, args.messages, args.window)
+    print(f"{args.sessions} sessions x {args.messages} messages ({r['messages']} messages, traced)")
+    print(f"  stored:                 {r['stored_per_msg']:7.1f} B/message")
+    print(f"  after one request each: {r['served_per_msg']:7.1f} B/message  (window {args.window})")
+    print(f"  (tracing slows these)   {r['fill_us_per_msg']:7.2f} us/add_message, "
+          f"{r['history_us_per_call']:.2f} us/get_gemini_history")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -17,6 +17,8 @@ class Settings(BaseSettings):
     # ── API Keys ────────────────────────────────────────────────────────
     gemini_api_key: Optional[str] = Field(default=None, env="GEMINI_API_KEY")
     chatbot_api_key: Optional[str] = Field(default=None, env="CHATBOT_API_KEY")
+    # Comma-separated hex SHA-256 digests of additional accepted keys
+    chatbot_api_key_hashes: Optional[str] = Field(default=None, env="CHATBOT_API_KEY_HASHES")
 
     # ── App Identity ─────────────────────────────────────────────────────
     app_name: str = Field(default="Conrux AI", env="APP_NAME")
@@ -28,10 +30,17 @@ class Settings(BaseSettings):
     api_port: int = Field(default=8000, env="API_PORT")
     api_prefix: str = Field(default="/api/v1", env="API_PREFIX")
     debug: bool = Field(default=False, env="DEBUG")
+    workers: int = Field(default=0, env="WORKERS")                                    # 0 = CPU count
+    graceful_timeout_seconds: int = Field(default=30, env="GRACEFUL_TIMEOUT_SECONDS")
+    server_backlog: int = Field(default=2048, env="SERVER_BACKLOG")                   # production mode
+    server_keepalive_seconds: int = Field(default=15, env="SERVER_KEEPALIVE_SECONDS")
+    server_limit_concurrency: int = Field(default=512, env="SERVER_LIMIT_CONCURRENCY")  # per worker, 0 = none
+    max_request_body_mb: int = Field(default=64, env="MAX_REQUEST_BODY_MB")           # affinity mode
     allowed_origins: List[str] = Field(
         default=["http://localhost:8501", "http://127.0.0.1:8501", "*"],
         env="ALLOWED_ORIGINS"
     )
+    static_cache_enabled: bool = Field(default=True, env="STATIC_CACHE_ENABLED")  # false = serve frontend/ from disk
 
     # ── Gemini Model ──────────────────────────────────────────────────────
     text_model: str = Field(default="models/gemini-2.5-flash-lite", env="TEXT_MODEL")
@@ -45,14 +54,79 @@ class Settings(BaseSettings):
     max_context_messages: int = Field(default=20, env="MAX_CONTEXT_MESSAGES")
     max_input_length: int = Field(default=10000, env="MAX_INPUT_LENGTH")
     stream_enabled: bool = Field(default=True, env="STREAM_ENABLED")
+    summary_enabled: bool = Field(default=False, env="SUMMARY_ENABLED")
+    summary_trigger_tokens: int = Field(default=2000, env="SUMMARY_TRIGGER_TOKENS")
+    summary_keep_recent: int = Field(default=6, env="SUMMARY_KEEP_RECENT")
+    summary_max_tokens: int = Field(default=400, env="SUMMARY_MAX_TOKENS")
+    # Relevance retrieval takes precedence over the rolling summary when both are on
+    retrieval_enabled: bool = Field(default=False, env="RETRIEVAL_ENABLED")
+    retrieval_top_k: int = Field(default=4, env="RETRIEVAL_TOP_K")
+    retrieval_recent_messages: int = Field(default=6, env="RETRIEVAL_RECENT_MESSAGES")
+    retrieval_max_messages: int = Field(default=1000, env="RETRIEVAL_MAX_MESSAGES")
+    search_enabled: bool = Field(default=False, env="SEARCH_ENABLED")
 
     # ── Session / Memory ─────────────────────────────────────────────────
     session_ttl_seconds: int = Field(default=3600, env="SESSION_TTL_SECONDS")
     max_sessions: int = Field(default=1000, env="MAX_SESSIONS")
+    max_memory_mb: int = Field(default=256, env="MAX_MEMORY_MB")
+    max_session_kb: int = Field(default=512, env="MAX_SESSION_KB")
+    session_shards: int = Field(default=16, env="SESSION_SHARDS")
+    session_backend: str = Field(default="memory", env="SESSION_BACKEND")  # memory | sqlite | redis
+    sqlite_path: str = Field(default="data/sessions.db", env="SQLITE_PATH")
+    sqlite_flush_interval_ms: int = Field(default=50, env="SQLITE_FLUSH_INTERVAL_MS")
+    sqlite_flush_batch_size: int = Field(default=256, env="SQLITE_FLUSH_BATCH_SIZE")
+    redis_url: str = Field(default="redis://localhost:6379/0", env="REDIS_URL")
+    redis_key_prefix: str = Field(default="conrux", env="REDIS_KEY_PREFIX")
+    redis_max_connections: int = Field(default=32, env="REDIS_MAX_CONNECTIONS")
+    redis_near_cache_ms: int = Field(default=250, env="REDIS_NEAR_CACHE_MS")
+    session_warm_after_seconds: int = Field(default=300, env="SESSION_WARM_AFTER_SECONDS")    # 0 = no tiering
+    session_cold_after_seconds: int = Field(default=1200, env="SESSION_COLD_AFTER_SECONDS")   # 0 = never spill
+    session_spill_dir: str = Field(default="data/spill", env="SESSION_SPILL_DIR")
+    session_sweep_interval_seconds: int = Field(default=30, env="SESSION_SWEEP_INTERVAL_SECONDS")
+    admin_enabled: bool = Field(default=False, env="ADMIN_ENABLED")   # /admin export & import routes
+    export_gzip_level: int = Field(default=6, env="EXPORT_GZIP_LEVEL")
 
     # ── Rate Limiting ─────────────────────────────────────────────────────
+    rate_limit_enabled: bool = Field(default=True, env="RATE_LIMIT_ENABLED")
     rate_limit_chat: str = Field(default="30/minute", env="RATE_LIMIT_CHAT")
     rate_limit_analysis: str = Field(default="10/minute", env="RATE_LIMIT_ANALYSIS")
+    rate_limit_key: str = Field(default="auto", env="RATE_LIMIT_KEY")            # auto | ip | session
+    rate_limit_backend: str = Field(default="memory", env="RATE_LIMIT_BACKEND")  # memory | redis
+
+    # ── Concurrency Limiting (adaptive, per worker) ───────────────────────
+    concurrency_limit_enabled: bool = Field(default=True, env="CONCURRENCY_LIMIT_ENABLED")
+    concurrency_initial_limit: int = Field(default=16, env="CONCURRENCY_INITIAL_LIMIT")  # analysis starts at half
+    concurrency_min_limit: int = Field(default=2, env="CONCURRENCY_MIN_LIMIT")
+    concurrency_max_limit: int = Field(default=64, env="CONCURRENCY_MAX_LIMIT")
+
+    # ── Response Compression ──────────────────────────────────────────────
+    compression_enabled: bool = Field(default=True, env="COMPRESSION_ENABLED")
+    compression_min_size: int = Field(default=1024, env="COMPRESSION_MIN_SIZE")          # bytes
+    compression_gzip_level: int = Field(default=6, env="COMPRESSION_GZIP_LEVEL")         # 1–9
+    compression_brotli_quality: int = Field(default=4, env="COMPRESSION_BROTLI_QUALITY") # 0–11, needs brotli
+
+    # ── Fair Queuing (per tenant: API key id, else client IP) ─────────────
+    scheduler_enabled: bool = Field(default=True, env="SCHEDULER_ENABLED")
+    scheduler_weights: Optional[str] = Field(default=None, env="SCHEDULER_WEIGHTS")  # tenant=weight,...
+    scheduler_default_weight: float = Field(default=1.0, env="SCHEDULER_DEFAULT_WEIGHT")
+    scheduler_max_queue: int = Field(default=256, env="SCHEDULER_MAX_QUEUE")
+    scheduler_max_queue_per_tenant: int = Field(default=64, env="SCHEDULER_MAX_QUEUE_PER_TENANT")
+    scheduler_max_wait_seconds: float = Field(default=10.0, env="SCHEDULER_MAX_WAIT_SECONDS")
+
+    # ── Deadlines (0 = none; X-Request-Timeout can only shorten them) ─────
+    deadline_chat_seconds: float = Field(default=60, env="DEADLINE_CHAT_SECONDS")
+    deadline_analysis_seconds: float = Field(default=120, env="DEADLINE_ANALYSIS_SECONDS")
+
+    # ── Graceful Degradation ──────────────────────────────────────────────
+    degrade_enabled: bool = Field(default=True, env="DEGRADE_ENABLED")
+    degrade_p95_ms: float = Field(default=10_000, env="DEGRADE_P95_MS")
+    degrade_error_rate: float = Field(default=0.2, env="DEGRADE_ERROR_RATE")
+    degrade_queue_depth: int = Field(default=32, env="DEGRADE_QUEUE_DEPTH")
+    degrade_step_up_seconds: float = Field(default=5, env="DEGRADE_STEP_UP_SECONDS")
+    degrade_step_down_seconds: float = Field(default=30, env="DEGRADE_STEP_DOWN_SECONDS")
+    degrade_context_messages: int = Field(default=4, env="DEGRADE_CONTEXT_MESSAGES")      # level 1+
+    degrade_max_tokens: int = Field(default=512, env="DEGRADE_MAX_TOKENS")                # level 2+
+    degrade_fast_model: Optional[str] = Field(default="models/gemini-2.0-flash-lite", env="DEGRADE_FAST_MODEL")  # level 3+
 
     # ── File Processing ───────────────────────────────────────────────────
     max_file_size_mb: int = Field(default=20, env="MAX_FILE_SIZE_MB")
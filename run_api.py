@@ -2,7 +2,14 @@
 Conrux AI Expert Chatbot — Quick Launch Script
 Run this file directly OR use:
     uvicorn api.main:app --reload --port 8000
+
+Modes:
+    python run_api.py                                # dev: single process, auto-reload
+    python run_api.py --mode affinity --workers 8    # N workers behind a session-affinity dispatcher
+    python run_api.py --mode production --workers 8  # N preloaded, pre-forked workers on one socket
+    python run_api.py --profile-startup [--budget-ms 800]  # cold-start import report / CI gate
 """
+import argparse
 import subprocess
 import sys
 import os
@@ -14,7 +21,68 @@ os.chdir(ROOT)  # ensure cwd is the project root
 # Add project root to PYTHONPATH
 sys.path.insert(0, str(ROOT))
 
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the Conrux AI API server.")
+    parser.add_argument(
+        "--mode", choices=["dev", "affinity", "production"], default="dev",
+        help="dev: single auto-reloading process; "
+             "affinity: worker processes behind a session-affinity dispatcher; "
+             "production: preloaded workers forked onto one socket, graceful drain",
+    )
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for affinity/production mode (default: WORKERS or CPU count)")
+    parser.add_argument("--host", default=None, help="Bind host (default: API_HOST)")
+    parser.add_argument("--port", type=int, default=None, help="Bind port (default: API_PORT)")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Report the app's cold-start import time and exit")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="With --profile-startup: exit 1 if the import time exceeds this, "
+                             "or if a lazily-loaded library is imported at startup")
+    return parser.parse_args()
+
+
+def worker_count(args) -> int:
+    from config.settings import settings
+    return args.workers or settings.workers or os.cpu_count() or 1
+
+
+def run_affinity(args):
+    import logging
+    import uvicorn
+    from config.settings import settings
+    from api.affinity import AffinityDispatcher
+
+    logging.basicConfig(
+        level=getattr(logging, settings.log_level),
+        format="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
+    )
+
+    uvicorn.run(
+        AffinityDispatcher(worker_count(args)),
+        host=args.host or settings.api_host,
+        port=args.port or settings.api_port,
+        log_level=settings.log_level.lower(),
+        timeout_graceful_shutdown=settings.graceful_timeout_seconds,
+    )
+
+
+def run_production(args):
+    from config.settings import settings
+    from api.server import serve
+
+    serve(
+        worker_count(args),
+        host=args.host or settings.api_host,
+        port=args.port or settings.api_port,
+    )
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.profile_startup:
+        from api.startup_profile import main
+        sys.exit(main(args.budget_ms))
     print("""
 ╔══════════════════════════════════════════════════════╗
 ║         CONRUX AI — Expert Chatbot v3.0.0            ║
@@ -28,13 +96,18 @@ if __name__ == "__main__":
 
     try:
         import uvicorn
-        uvicorn.run(
-            "api.main:app",
-            host="0.0.0.0",
-            port=8000,
-            reload=True,
-            log_level="info",
-        )
+        if args.mode == "affinity":
+            run_affinity(args)
+        elif args.mode == "production":
+            run_production(args)
+        else:
+            uvicorn.run(
+                "api.main:app",
+                host=args.host or "0.0.0.0",
+                port=args.port or 8000,
+                reload=True,
+                log_level="info",
+            )
     except ImportError:
         print("uvicorn not found. Install requirements first:")
         print("  pip install -r requirements.txt")
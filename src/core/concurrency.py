@@ -0,0 +1,221 @@
+"""
+Adaptive concurrency limiting for upstream (Gemini) work.
+
+Each limiter admits at most ``limit`` requests at once and sheds the rest
+immediately (``Overloaded`` → 503 + Retry-After) instead of letting them
+queue for threadpool slots until everything times out. The limit follows
+the gradient of observed latency against the no-load baseline:
+
+    gradient = clamp(tolerance * min_rtt / short_rtt, 0.5, 1.0)
+    target   = limit * gradient + sqrt(limit)        (sqrt = probing headroom)
+    limit    = limit * (1 - smoothing) + target * smoothing
+
+The limit is adjusted once per round trip (a window of about one average
+latency) from that window's mean latency. While latency stays near the
+baseline the limit grows by about sqrt(limit) per window; once latency rises (Gemini slows down, or our own queueing
+adds delay) the gradient drops below 1 and the limit shrinks until
+latency recovers. ``min_rtt`` is the lowest latency seen, decaying upwards
+by 1/BASELINE_WINDOW per window so a lasting upstream slowdown eventually
+becomes the new baseline. The limit only grows while at least half of it
+is in use, and an upstream failure cuts it by 10% (AIMD backoff).
+"""
+import math
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional
+
+from src.core.deadline import ClientDisconnected, DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+# Windows over which the baseline can rise by a factor of e without new lows
+BASELINE_WINDOW = 500
+SHORT_ALPHA = 0.2
+# Decisions over which the reported shed rate is computed
+SHED_WINDOW = 1000
+
+
+class Overloaded(Exception):
+    """Raised when a limiter sheds a request; ``retry_after`` is in seconds."""
+
+    def __init__(self, name: str, limit: int, retry_after: int):
+        super().__init__(f"{name} is at its concurrency limit ({limit}); retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    """Gradient-based concurrency limiter. Thread-safe; acquire/release are O(1)."""
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 16,
+        min_limit: int = 2,
+        max_limit: int = 128,
+        smoothing: float = 0.2,
+        tolerance: float = 2.0,
+    ):
+        self.name = name
+        self._limit = float(initial_limit)
+        self._min = min_limit
+        self._max = max_limit
+        self._smoothing = smoothing
+        self._tolerance = tolerance
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._short_rtt = 0.0
+        self._min_rtt = 0.0
+        self._window_start = time.monotonic()
+        self._window_sum = 0.0
+        self._window_n = 0
+        self._window_peak = 0       # highest in-flight count seen this window
+        self._admitted = 0
+        self._shed = 0
+        self._failures = 0
+        self._recent: Deque[bool] = deque(maxlen=SHED_WINDOW)   # True = shed
+        self._recent_shed = 0
+        self._listeners: List[Callable[[Optional[float], bool], None]] = []
+        self.enabled = True
+
+    def configure(self, enabled: bool, initial_limit: int, min_limit: int, max_limit: int):
+        with self._lock:
+            self.enabled = enabled
+            self._min, self._max = min_limit, max_limit
+            self._limit = float(min(max(initial_limit, min_limit), max_limit))
+
+    def add_listener(self, listener: Callable[[Optional[float], bool], None]):
+        """Call ``listener(latency, ok)`` after every release (e.g. the degrade controller)."""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def available(self) -> int:
+        """Free slots right now (may be negative just after the limit shrinks)."""
+        return int(self._limit) - self._in_flight
+
+    def _record(self, shed: bool):
+        if len(self._recent) == self._recent.maxlen and self._recent[0]:
+            self._recent_shed -= 1
+        self._recent.append(shed)
+        self._recent_shed += shed
+
+    def record_shed(self):
+        """Count a request shed by a caller (e.g. a full queue) in the shed rate."""
+        with self._lock:
+            self._shed += 1
+            self._record(True)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._in_flight >= int(self._limit):
+                self._shed += 1
+                self._record(True)
+                return False
+            self._in_flight += 1
+            self._window_peak = max(self._window_peak, self._in_flight)
+            self._admitted += 1
+            self._record(False)
+            return True
+
+    def release(self, latency: Optional[float], ok: bool = True):
+        """
+        Return a slot, feeding the request's latency (seconds) into the limit.
+        ``latency=None`` returns the slot without a sample.
+        """
+        with self._lock:
+            self._in_flight -= 1
+            if latency is None:
+                return
+            if not ok:
+                self._failures += 1
+                self._limit = max(self._min, self._limit * 0.9)
+                return
+            if self._min_rtt == 0.0:
+                self._short_rtt = self._min_rtt = latency
+            self._min_rtt = min(latency, self._min_rtt)
+            self._window_sum += latency
+            self._window_n += 1
+            now = time.monotonic()
+            # Adjust once per round trip, on that window's average latency
+            if now - self._window_start >= self._short_rtt:
+                self._update(self._window_sum / self._window_n)
+                self._window_start = now
+                self._window_sum, self._window_n = 0.0, 0
+                self._window_peak = self._in_flight
+
+    def _update(self, rtt: float):
+        self._short_rtt += SHORT_ALPHA * (rtt - self._short_rtt)
+        self._min_rtt *= 1 + 1 / BASELINE_WINDOW
+        gradient = max(0.5, min(1.0, self._tolerance * self._min_rtt / self._short_rtt))
+        target = self._limit * gradient + math.sqrt(self._limit)
+        if self._window_peak < self._limit / 2:
+            # App-limited: no evidence the higher limit would be safe
+            target = min(target, self._limit)
+        limit = self._limit * (1 - self._smoothing) + target * self._smoothing
+        self._limit = max(self._min, min(self._max, limit))
+
+    def retry_after(self) -> int:
+        """A hint for shed clients: about one short-term latency, at least 1s."""
+        return max(1, math.ceil(self._short_rtt))
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """
+        Hold a slot for the duration of the block, or raise ``Overloaded`` at
+        once. Exceptions raised inside the block count as upstream failures,
+        except ``ValueError`` (the caller's input was rejected), an expired
+        deadline and cancellation (the client went away), which leave no
+        sample — otherwise clients could shrink the limit with short timeouts.
+        """
+        if not self.enabled:
+            yield
+            return
+        if not self.try_acquire():
+            raise Overloaded(self.name, self.limit, self.retry_after())
+        async with self.hold():
+            yield
+
+    @asynccontextmanager
+    async def hold(self) -> AsyncIterator[None]:
+        """Time the block and release a slot already taken with ``try_acquire``."""
+        start = time.perf_counter()
+        latency, ok = None, True
+        try:
+            yield
+            latency = time.perf_counter() - start
+        except (ValueError, DeadlineExceeded, ClientDisconnected, asyncio.CancelledError):
+            raise
+        except Exception:
+            latency, ok = time.perf_counter() - start, False
+            raise
+        finally:
+            self.release(latency, ok)
+            for listener in self._listeners:
+                listener(latency, ok)
+
+    def stats(self) -> Dict[str, Any]:
+        decisions = len(self._recent)
+        return {
+            "enabled": self.enabled,
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "admitted": self._admitted,
+            "shed": self._shed,
+            "shed_rate": round(self._recent_shed / decisions, 4) if decisions else 0.0,
+            "failures": self._failures,
+            "latency_short_ms": round(self._short_rtt * 1000, 1),
+            "latency_baseline_ms": round(self._min_rtt * 1000, 1),
+        }
+
+
+# Singletons — one per class of upstream work, since their latencies differ
+chat_limiter = AdaptiveLimiter("chat")
+analysis_limiter = AdaptiveLimiter("analysis", initial_limit=8)
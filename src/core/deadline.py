@@ -0,0 +1,128 @@
+"""
+Per-request deadlines and client-disconnect cancellation.
+
+DeadlineMiddleware gives every AI request a ``Deadline`` (X-Request-Timeout
+or the route's default) and publishes it in the ``current_deadline`` context
+variable, which ``asyncio.to_thread`` carries into the pipeline's worker
+thread. When the deadline passes or the client disconnects, the middleware
+cancels the request task and marks the deadline done; the work then stops
+at its next checkpoint:
+
+  - a request still queued for a concurrency slot leaves the queue
+  - the pipeline checks before each stage (so nothing is persisted)
+  - GeminiClient checks before each attempt, sleeps between retries on the
+    deadline, and bounds each call with ``request_options`` timeout
+
+A call already on the wire cannot be interrupted, but is bounded by the
+remaining time. Upstream calls that never happen because of this are
+counted in ``deadline_stats.upstream_calls_saved``.
+"""
+import time
+import asyncio
+import threading
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before its work finished."""
+
+
+class ClientDisconnected(Exception):
+    """The client went away; nobody is waiting for the result."""
+
+
+class Deadline:
+    """An absolute expiry time plus a done flag, usable from the loop and from threads."""
+
+    __slots__ = ("timeout", "expires_at", "upstream_started", "saved", "_done", "_reason")
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+        self.upstream_started = False   # an upstream call went out for this request
+        self.saved = 0                  # upstream calls skipped because of this deadline
+        self._done = threading.Event()
+        self._reason: Optional[str] = None
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    @property
+    def client_gone(self) -> bool:
+        return self._reason == "disconnected"
+
+    def cancel(self, reason: str):
+        """Mark the work abandoned (``"expired"`` or ``"disconnected"``)."""
+        if self._reason is None:
+            self._reason = reason
+        self._done.set()
+
+    def check(self):
+        """Raise if the work should stop: the client is gone or the deadline passed."""
+        if self.client_gone:
+            raise ClientDisconnected("client disconnected")
+        if self._done.is_set() or self.expired:
+            raise DeadlineExceeded(f"deadline of {self.timeout:g}s exceeded")
+
+    def note_saved(self):
+        self.saved += 1
+        deadline_stats.upstream_calls_saved += 1
+
+    def sleep(self, seconds: float):
+        """Sleep up to ``seconds``, waking early if the work is abandoned or expires."""
+        self._done.wait(min(seconds, self.remaining()))
+
+
+class DeadlineStats:
+    __slots__ = ("requests", "expired", "disconnected", "upstream_calls_saved")
+
+    def __init__(self):
+        self.requests = 0
+        self.expired = 0
+        self.disconnected = 0
+        self.upstream_calls_saved = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+deadline_stats = DeadlineStats()
+
+
+def check_deadline():
+    """Checkpoint for synchronous work: raises if the current request is abandoned."""
+    deadline = current_deadline.get()
+    if deadline is not None:
+        deadline.check()
+
+
+async def run_in_thread(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    ``asyncio.to_thread`` for work done while holding a concurrency slot.
+
+    A thread cannot be interrupted, so if the caller is cancelled this waits
+    for the thread to reach its next checkpoint before re-raising — the
+    caller's slot stays held exactly as long as the work actually runs.
+    """
+    future = asyncio.ensure_future(asyncio.to_thread(fn, *args, **kwargs))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        while not future.done():
+            try:
+                await asyncio.shield(future)
+            except asyncio.CancelledError:
+                continue
+            except Exception:
+                break
+        if not future.cancelled():
+            future.exception()   # retrieved: the caller is gone, the error is moot
+        raise
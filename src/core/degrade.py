@@ -0,0 +1,213 @@
+"""
+Graceful degradation under overload.
+
+The controller watches upstream p95 latency and error rate (samples from the
+concurrency limiters) and the fair-queue depth. While any of them is over
+its threshold it steps up one level every ``step_up_after`` seconds; once all
+of them are back under half their thresholds it steps down one level every
+``step_down_after`` seconds. In between it holds. Levels are cumulative:
+
+    0  full quality
+    1  shorter context window         (DEGRADE_CONTEXT_MESSAGES)
+    2  shorter responses              (DEGRADE_MAX_TOKENS)
+    3  fastest model                  (DEGRADE_FAST_MODEL)
+    4  image / document analysis off  (503 + Retry-After)
+
+Samples are cleared on every level change, so each level is judged on the
+traffic it served. The state is evaluated lazily, at most once per
+EVAL_INTERVAL, when a request reads the level.
+"""
+import time
+import math
+import logging
+from collections import deque
+from enum import IntEnum
+from typing import Any, Callable, Deque, Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EVAL_INTERVAL = 1.0
+# Latency/error samples considered: the most recent SAMPLE_WINDOW, no older than SAMPLE_MAX_AGE s
+SAMPLE_WINDOW = 256
+SAMPLE_MAX_AGE = 30.0
+# Fewer samples than this say nothing about latency or errors
+MIN_SAMPLES = 10
+# All signals must fall below this fraction of their thresholds to step down
+RECOVER_FRACTION = 0.5
+
+
+class Level(IntEnum):
+    FULL = 0
+    SHORT_CONTEXT = 1
+    SHORT_OUTPUT = 2
+    FAST_MODEL = 3
+    NO_ANALYSIS = 4
+
+
+class Policy(NamedTuple):
+    """What a request may use at one degradation level (None = the configured value)."""
+    level: int
+    context_messages: Optional[int]
+    max_tokens: Optional[int]
+    model: Optional[str]
+    analysis_enabled: bool
+
+
+FULL_POLICY = Policy(Level.FULL, None, None, None, True)
+
+
+def _model_name(model: str) -> str:
+    """``models/gemini-x`` and ``gemini-x`` name the same model."""
+    return model[len("models/"):] if model.startswith("models/") else model
+
+
+class DegradeController:
+    """Hysteresis controller over the degradation levels. One per worker."""
+
+    def __init__(self):
+        self.enabled = True
+        self._p95_limit = 10.0
+        self._error_limit = 0.2
+        self._depth_limit = 32
+        self._step_up_after = 5.0
+        self._step_down_after = 30.0
+        self._context_messages = 4
+        self._max_tokens = 512
+        self._fast_model = "models/gemini-2.0-flash-lite"
+        self._queue_depth: Callable[[], int] = lambda: 0
+
+        self._samples: Deque[Tuple[float, float, bool]] = deque(maxlen=SAMPLE_WINDOW)
+        self._level = Level.FULL
+        self._changed_at = time.monotonic()
+        self._over_since: Optional[float] = None
+        self._calm_since: Optional[float] = None
+        self._checked = 0.0
+        self._signals: Dict[str, Any] = {}
+        self._transitions = 0
+
+    def configure(
+        self,
+        enabled: bool = True,
+        p95_ms: float = 10_000,
+        error_rate: float = 0.2,
+        queue_depth: int = 32,
+        step_up_after: float = 5.0,
+        step_down_after: float = 30.0,
+        context_messages: int = 4,
+        max_tokens: int = 512,
+        fast_model: Optional[str] = None,
+        text_model: Optional[str] = None,
+        queue_depth_fn: Optional[Callable[[], int]] = None,
+    ):
+        self.enabled = enabled
+        self._p95_limit = p95_ms / 1000
+        self._error_limit = error_rate
+        self._depth_limit = queue_depth
+        self._step_up_after = step_up_after
+        self._step_down_after = step_down_after
+        self._context_messages = context_messages
+        self._max_tokens = max_tokens
+        if fast_model and text_model and _model_name(fast_model) == _model_name(text_model):
+            # Switching to the model already in use would make level 3 a no-op
+            logger.warning(
+                f"DEGRADE_FAST_MODEL is the TEXT_MODEL ({_model_name(text_model)}) — "
+                "level 3 keeps the model; set a faster one to make it count"
+            )
+            fast_model = None
+        self._fast_model = fast_model
+        if queue_depth_fn is not None:
+            self._queue_depth = queue_depth_fn
+        if not enabled:
+            self._set_level(Level.FULL, time.monotonic())
+
+    def record(self, latency: Optional[float], ok: bool = True):
+        """Limiter listener: one finished upstream call (``latency`` in seconds)."""
+        if latency is not None:
+            self._samples.append((time.monotonic(), latency, ok))
+
+    # ── Level ────────────────────────────────────────────────────────────
+
+    @property
+    def level(self) -> int:
+        if not self.enabled:
+            return Level.FULL
+        now = time.monotonic()
+        if now - self._checked >= EVAL_INTERVAL:
+            self._checked = now
+            self._evaluate(now)
+        return self._level
+
+    def policy(self) -> Policy:
+        level = self.level
+        if level == Level.FULL:
+            return FULL_POLICY
+        return Policy(
+            level=level,
+            context_messages=self._context_messages,
+            max_tokens=self._max_tokens if level >= Level.SHORT_OUTPUT else None,
+            model=(self._fast_model or None) if level >= Level.FAST_MODEL else None,
+            analysis_enabled=level < Level.NO_ANALYSIS,
+        )
+
+    def retry_after(self) -> int:
+        """A hint for clients refused at the current level: one step-down dwell."""
+        return max(1, math.ceil(self._step_down_after))
+
+    def _evaluate(self, now: float):
+        samples = self._samples
+        while samples and samples[0][0] < now - SAMPLE_MAX_AGE:
+            samples.popleft()
+        p95 = errors = 0.0
+        if len(samples) >= MIN_SAMPLES:
+            latencies = sorted(s[1] for s in samples)
+            p95 = latencies[min(len(latencies) - 1, math.ceil(len(latencies) * 0.95) - 1)]
+            errors = sum(1 for s in samples if not s[2]) / len(samples)
+        depth = self._queue_depth()
+        self._signals = {"p95_ms": round(p95 * 1000, 1), "error_rate": round(errors, 3), "queue_depth": depth}
+
+        over = p95 > self._p95_limit or errors > self._error_limit or depth > self._depth_limit
+        calm = (
+            p95 <= self._p95_limit * RECOVER_FRACTION
+            and errors <= self._error_limit * RECOVER_FRACTION
+            and depth <= self._depth_limit * RECOVER_FRACTION
+        )
+        if over:
+            self._calm_since = None
+            self._over_since = self._over_since or now
+            if now - self._over_since >= self._step_up_after and self._level < Level.NO_ANALYSIS:
+                self._set_level(Level(self._level + 1), now)
+        elif calm:
+            self._over_since = None
+            self._calm_since = self._calm_since or now
+            if now - self._calm_since >= self._step_down_after and self._level > Level.FULL:
+                self._set_level(Level(self._level - 1), now)
+        else:
+            self._over_since = self._calm_since = None
+
+    def _set_level(self, level: Level, now: float):
+        if level == self._level:
+            return
+        log = logger.warning if level > self._level else logger.info
+        log(f"Degradation level {int(self._level)} → {int(level)} ({level.name}) | {self._signals}")
+        self._level = level
+        self._changed_at = now
+        self._transitions += 1
+        self._samples.clear()
+        # The next step either way needs a full dwell at this level
+        self._over_since = self._calm_since = now
+
+    def stats(self) -> Dict[str, Any]:
+        level = self.level
+        return {
+            "enabled": self.enabled,
+            "level": int(level),
+            "mode": Level(level).name.lower(),
+            "seconds_at_level": round(time.monotonic() - self._changed_at, 1),
+            "transitions": self._transitions,
+            "fast_model": self._fast_model,
+            "signals": self._signals,
+        }
+
+
+# Singleton
+degrade_controller = DegradeController()
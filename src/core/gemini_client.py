@@ -3,12 +3,16 @@ Gemini Client — uses the battle-tested legacy google.generativeai SDK.
 Fully supports gemini-1.5-flash on the free tier.
 FutureWarning is suppressed intentionally; migration to google.genai requires
 Gemini billing enabled, which is incompatible with free-tier API keys.
+
+The SDK (and the grpc/protobuf stack under it, ~0.9 s of imports) is loaded
+on the first call, not when this module is imported; the API key is checked
+at app startup by ``gemini_client.configure()``.
 """
 import logging
-import io
+import threading
+import time
 import warnings
-from typing import Dict, List, Any, Optional
-from PIL import Image
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 import sys
@@ -16,14 +20,56 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from config.settings import settings
+from src.core.deadline import current_deadline
+
+if TYPE_CHECKING:
+    from PIL import Image
 
 logger = logging.getLogger(__name__)
 
 # Suppress FutureWarning from google.generativeai (intentional — new SDK blocks free tier)
 warnings.filterwarnings("ignore", category=FutureWarning, module="google")
 
-import google.generativeai as genai
-genai.configure(api_key=settings.gemini_api_key)
+
+# ── Retry policy, bounded by the calling request's deadline ────────────────
+
+def _before_attempt(retry_state):
+    """Skip the attempt (and any later ones) once the caller is gone or out of time."""
+    deadline = current_deadline.get()
+    if deadline is None:
+        return
+    try:
+        deadline.check()
+    except Exception:
+        deadline.note_saved()
+        raise
+    deadline.upstream_started = True
+
+
+def _sleep(seconds: float):
+    """Back off between attempts, waking early if the caller is gone or out of time."""
+    deadline = current_deadline.get()
+    if deadline is None:
+        time.sleep(seconds)
+    else:
+        deadline.sleep(seconds)
+
+
+def _request_options() -> Optional[Dict[str, Any]]:
+    """Per-call timeout: whatever the calling request has left."""
+    deadline = current_deadline.get()
+    if deadline is None:
+        return None
+    return {"timeout": max(0.1, deadline.remaining())}
+
+
+_retry = retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(min=2, max=10),
+    before=_before_attempt,
+    sleep=_sleep,
+    reraise=True,
+)
 
 
 class GeminiClient:
@@ -33,27 +79,54 @@ class GeminiClient:
     """
 
     def __init__(self):
-        if not settings.gemini_api_key:
+        self._api_key = settings.gemini_api_key
+        self._genai = None
+        self._lock = threading.Lock()
+
+    def configure(self, api_key: Optional[str] = None):
+        """Check the API key (called at app startup); the SDK is still loaded on first use."""
+        if api_key is not None:
+            self._api_key = api_key
+            if self._genai is not None:
+                self._genai.configure(api_key=api_key)
+        if not self._api_key:
             raise ValueError("GEMINI_API_KEY is required.")
         logger.info(f"GeminiClient ready | model: {settings.text_model} | sdk: google.generativeai")
 
-    def _gen_config(self, temperature: Optional[float] = None):
-        return genai.types.GenerationConfig(
+    @property
+    def genai(self):
+        """The google.generativeai module, imported and configured on first access."""
+        if self._genai is None:
+            with self._lock:
+                if self._genai is None:
+                    if not self._api_key:
+                        raise ValueError("GEMINI_API_KEY is required.")
+                    start = time.perf_counter()
+                    import google.generativeai as genai
+                    genai.configure(api_key=self._api_key)
+                    self._genai = genai
+                    logger.info(f"Gemini SDK loaded in {(time.perf_counter() - start) * 1000:.0f}ms")
+        return self._genai
+
+    def _gen_config(self, temperature: Optional[float] = None, max_tokens: Optional[int] = None):
+        return self.genai.types.GenerationConfig(
             temperature=temperature if temperature is not None else settings.temperature,
-            max_output_tokens=settings.max_tokens,
+            max_output_tokens=max_tokens or settings.max_tokens,
             top_p=settings.top_p,
             top_k=settings.top_k,
         )
 
     # ══════════════  TEXT — SINGLE TURN  ══════════════
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=2, max=10), reraise=True)
+    @_retry
     def generate_text_response(
         self,
         prompt: str,
         context: Optional[str] = None,
         system_instruction: Optional[str] = None,
         temperature: Optional[float] = None,
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
     ) -> str:
         parts = []
         if context:
@@ -61,59 +134,73 @@ class GeminiClient:
         parts.append(prompt)
         full_prompt = "\n\n".join(parts)
 
-        model = genai.GenerativeModel(
-            settings.text_model,
+        generative_model = self.genai.GenerativeModel(
+            model or settings.text_model,
             system_instruction=system_instruction,
         )
-        resp = model.generate_content(full_prompt, generation_config=self._gen_config(temperature))
+        resp = generative_model.generate_content(
+            full_prompt,
+            generation_config=self._gen_config(temperature, max_tokens),
+            request_options=_request_options(),
+        )
         return self._extract(resp)
 
     # ══════════════  TEXT — MULTI TURN  ══════════════
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=2, max=10), reraise=True)
+    @_retry
     def generate_with_history(
         self,
         prompt: str,
         history: List[Dict[str, str]],
         system_instruction: Optional[str] = None,
         temperature: Optional[float] = None,
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
     ) -> str:
-        model = genai.GenerativeModel(
-            settings.text_model,
+        generative_model = self.genai.GenerativeModel(
+            model or settings.text_model,
             system_instruction=system_instruction,
         )
-        chat = model.start_chat(history=history or [])
-        resp = chat.send_message(prompt, generation_config=self._gen_config(temperature))
+        chat = generative_model.start_chat(history=history or [])
+        resp = chat.send_message(
+            prompt,
+            generation_config=self._gen_config(temperature, max_tokens),
+            request_options=_request_options(),
+        )
         return self._extract(resp)
 
     # ══════════════  IMAGE ANALYSIS  ══════════════
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=2, max=10), reraise=True)
+    @_retry
     def analyze_image(
         self,
-        image: Image.Image,
+        image: "Image.Image",
         prompt: str,
         system_instruction: Optional[str] = None,
+        max_tokens: Optional[int] = None,
     ) -> str:
-        model = genai.GenerativeModel(
+        model = self.genai.GenerativeModel(
             settings.vision_model,
             system_instruction=system_instruction,
         )
         resp = model.generate_content(
             [prompt, image],
-            generation_config=self._gen_config(),
+            generation_config=self._gen_config(max_tokens=max_tokens),
+            request_options=_request_options(),
         )
         return self._extract(resp)
 
     # ══════════════  DOCUMENT ANALYSIS  ══════════════
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=2, max=10), reraise=True)
+    @_retry
     def process_document(
         self,
         content: str,
         query: str,
         file_type: str,
         system_instruction: Optional[str] = None,
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
     ) -> str:
         # Cap content to stay within token limits
         prompt = (
@@ -122,11 +209,15 @@ class GeminiClient:
             f"User Query: {query}\n\n"
             "Provide a comprehensive, accurate response based only on the document."
         )
-        model = genai.GenerativeModel(
-            settings.text_model,
+        generative_model = self.genai.GenerativeModel(
+            model or settings.text_model,
             system_instruction=system_instruction,
         )
-        resp = model.generate_content(prompt, generation_config=self._gen_config())
+        resp = generative_model.generate_content(
+            prompt,
+            generation_config=self._gen_config(max_tokens=max_tokens),
+            request_options=_request_options(),
+        )
         return self._extract(resp)
 
     # ══════════════  UTILITIES  ══════════════
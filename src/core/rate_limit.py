@@ -0,0 +1,228 @@
+"""
+GCRA rate limiting — one float per key, no per-request timestamp lists.
+
+The generic cell rate algorithm tracks a single "theoretical arrival time"
+(TAT) per key. A rate of ``count`` per ``period`` emits one cell every
+``period / count`` seconds and tolerates bursts of up to ``count`` requests:
+
+    tat     = max(stored_tat, now)
+    new_tat = tat + interval
+    allowed = new_tat - period <= now      (then stored_tat = new_tat)
+
+A key whose TAT is in the past is indistinguishable from a new key, so stale
+entries are simply dropped. Keys are kept in order of their last update: the
+periodic sweep pops expired keys from the front, and past ``max_keys`` the
+least recently updated key is forgotten — both O(1) per key.
+
+The in-process store limits each worker on its own. With a shared Redis
+store the TAT lives in Redis and every worker enforces one global limit;
+each check is an optimistic WATCH/MULTI compare-and-set (no server-side
+scripting needed), using the workers' own clocks.
+"""
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Stale-entry sweep runs after this many new keys
+SWEEP_EVERY = 1024
+# Optimistic-transaction retries per check before rejecting as contended
+SHARED_RETRIES = 5
+
+
+class Rate(NamedTuple):
+    count: int
+    period: float
+
+    @property
+    def interval(self) -> float:
+        return self.period / self.count
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float      # seconds until the next request would be allowed (0 if allowed)
+    reset_after: float      # seconds until the full burst is available again
+
+
+def parse_rate(text: str) -> Rate:
+    """Parse ``"30/minute"``, ``"10 per second"`` or ``"100/5 minutes"``."""
+    count, sep, unit = text.strip().lower().replace(" per ", "/").partition("/")
+    if not sep:
+        raise ValueError(f"Invalid rate {text!r}: expected '<count>/<period>'")
+    unit = unit.strip()
+    multiplier, _, unit = unit.rpartition(" ")
+    unit = unit.rstrip("s")
+    if unit not in _PERIODS:
+        raise ValueError(f"Invalid rate {text!r}: unknown period {unit!r}")
+    rate = Rate(int(count), float(multiplier or 1) * _PERIODS[unit])
+    if rate.count < 1 or rate.period <= 0:
+        raise ValueError(f"Invalid rate {text!r}: count and period must be positive")
+    return rate
+
+
+def gcra(stored_tat: float, now: float, rate: Rate) -> Tuple[Optional[float], Decision]:
+    """One GCRA step: the TAT to store (None if the request is rejected) and the decision."""
+    interval = rate.interval
+    tat = max(stored_tat, now)
+    new_tat = tat + interval
+    allow_at = new_tat - rate.period
+    if now < allow_at:
+        return None, Decision(False, rate.count, 0, allow_at - now, tat - now)
+    remaining = int((rate.period - (new_tat - now)) / interval + 1e-9)
+    return new_tat, Decision(True, rate.count, remaining, 0.0, new_tat - now)
+
+
+class RateLimiter:
+    """
+    Thread-safe GCRA limiter keyed by arbitrary strings.
+
+    ``check`` runs entirely in process; ``acheck`` uses the shared store when
+    one is configured and falls back to ``check`` otherwise. A shared-store
+    error fails open (the request is allowed and the error logged), so a
+    Redis outage never takes the API down; a key still contended after
+    SHARED_RETRIES attempts is rejected, since only a hot client causes that.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self._lock = threading.Lock()
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+        self._max_keys = max_keys
+        self._new_keys = 0
+        self._redis: Any = None
+        self._prefix = "conrux"
+        self._allowed = 0
+        self._limited = 0
+        self._shared_errors = 0
+
+    def configure(
+        self,
+        redis_url: Optional[str] = None,
+        key_prefix: Optional[str] = None,
+        max_keys: Optional[int] = None,
+        client: Any = None,
+    ):
+        if key_prefix is not None:
+            self._prefix = key_prefix
+        if max_keys is not None:
+            self._max_keys = max_keys
+        if client is None and redis_url:
+            try:
+                import redis.asyncio as aioredis
+            except ImportError as e:
+                raise ImportError(
+                    "RATE_LIMIT_BACKEND=redis requires the 'redis' package: pip install redis"
+                ) from e
+            client = aioredis.Redis.from_url(redis_url)
+        if client is not None:
+            self._redis = client
+
+    @property
+    def shared(self) -> bool:
+        return self._redis is not None
+
+    def _count(self, decision: Decision) -> Decision:
+        if decision.allowed:
+            self._allowed += 1
+        else:
+            self._limited += 1
+        return decision
+
+    # ── In-process ───────────────────────────────────────────────────────
+
+    def check(self, key: str, rate: Rate, now: Optional[float] = None) -> Decision:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            stored = self._tats.get(key)
+            new_tat, decision = gcra(stored or 0.0, now, rate)
+            if new_tat is not None:
+                tats = self._tats
+                tats[key] = new_tat
+                if stored is None:
+                    if len(tats) > self._max_keys:
+                        # Least recently updated first; forgetting a key only forgives its client
+                        tats.popitem(last=False)
+                    self._new_keys += 1
+                    if self._new_keys >= SWEEP_EVERY:
+                        self._sweep(now)
+                else:
+                    tats.move_to_end(key)
+        return self._count(decision)
+
+    def _sweep(self, now: float):
+        """
+        Drop expired keys (equivalent to absent) from the least recently updated
+        end, stopping at the first live one: the work is proportional to what
+        is dropped, not to the table size.
+        """
+        self._new_keys = 0
+        tats = self._tats
+        while tats:
+            key, tat = next(iter(tats.items()))
+            if tat > now:
+                break
+            del tats[key]
+
+    # ── Shared (Redis) ───────────────────────────────────────────────────
+
+    async def acheck(self, key: str, rate: Rate) -> Decision:
+        if self._redis is None:
+            return self.check(key, rate)
+        try:
+            return self._count(await self._shared_check(f"{self._prefix}:rl:{key}", rate))
+        except Exception as e:
+            self._shared_errors += 1
+            logger.warning(f"Shared rate limiter unavailable, allowing request: {e}")
+            return Decision(True, rate.count, rate.count, 0.0, 0.0)
+
+    async def _shared_check(self, rkey: str, rate: Rate) -> Decision:
+        from redis.exceptions import WatchError
+
+        decision = None
+        async with self._redis.pipeline(transaction=True) as pipe:
+            for _ in range(SHARED_RETRIES):
+                try:
+                    await pipe.watch(rkey)
+                    raw = await pipe.get(rkey)
+                    now = time.time()
+                    new_tat, decision = gcra(float(raw) if raw else 0.0, now, rate)
+                    if new_tat is None:
+                        await pipe.unwatch()
+                        return decision
+                    pipe.multi()
+                    # The key expires when its TAT passes — exactly when it stops mattering
+                    pipe.set(rkey, repr(new_tat), px=max(1, math.ceil((new_tat - now) * 1000)))
+                    await pipe.execute()
+                    return decision
+                except WatchError:
+                    continue
+        # Still contended after every retry: the key is hot, so treat it as over limit
+        logger.debug(f"Rate limit key {rkey} contended; rejecting")
+        return Decision(False, rate.count, 0, rate.interval, decision.reset_after)
+
+    # ── Introspection ────────────────────────────────────────────────────
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis" if self.shared else "memory",
+            "keys": len(self._tats),
+            "allowed": self._allowed,
+            "limited": self._limited,
+            "shared_errors": self._shared_errors,
+        }
+
+    async def aclose(self):
+        if self._redis is not None:
+            await self._redis.aclose()
+
+
+# Singleton
+rate_limiter = RateLimiter()
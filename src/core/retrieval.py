@@ -0,0 +1,156 @@
+"""
+Per-session BM25 index over conversation messages — offline relevance retrieval.
+
+Each session's buffer owns a TurnIndex. Messages are indexed as they are
+appended (O(message length)): every term's posting list is a pair of
+``array.array`` columns (doc number, term frequency) that NumPy scores
+zero-copy via ``np.frombuffer`` (NumPy is imported by the first search, so
+it costs nothing while RETRIEVAL_ENABLED is off). Messages trimmed from the front of the
+buffer are dropped logically by advancing ``base``; the index is rebuilt
+once more than half of it is dead, so trimming is amortized O(1).
+"""
+import re
+import math
+from array import array
+from typing import Dict, List, Tuple
+
+_TOKEN_RE = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from had has have he her his how i if in "
+    "into is it its me my no not of on or our she so that the their them then there these "
+    "they this to was we were what when where which who why will with would you your".split()
+)
+
+# BM25 parameters (standard defaults)
+K1 = 1.2
+B = 0.75
+
+# Approximate bytes per posting (doc number + term frequency + list growth slack)
+POSTING_BYTES = 8
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        t for t in _TOKEN_RE.findall(text.lower())
+        if len(t) > 1 and t not in _STOPWORDS
+    ]
+
+
+class TurnIndex:
+    """
+    Inverted BM25 index over one session's messages, in arrival order.
+    ``docs[i]`` is the message with doc number ``i``; numbers below ``base``
+    belong to messages already trimmed from the buffer.
+    """
+
+    __slots__ = ("_postings", "_doc_len", "docs", "base", "_total_len", "nbytes")
+
+    def __init__(self):
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._doc_len = array("I")
+        self.docs: List = []
+        self.base = 0
+        self._total_len = 0     # token count of live docs
+        self.nbytes = 0         # posting bytes of live docs
+
+    def __len__(self) -> int:
+        return len(self.docs) - self.base
+
+    def add(self, message) -> int:
+        """Index one message; returns the bytes it adds."""
+        doc = len(self.docs)
+        tokens = tokenize(message.content)
+        freqs: Dict[str, int] = {}
+        for t in tokens:
+            freqs[t] = freqs.get(t, 0) + 1
+        postings = self._postings
+        for term, tf in freqs.items():
+            entry = postings.get(term)
+            if entry is None:
+                entry = postings[term] = (array("I"), array("H"))
+            entry[0].append(doc)
+            entry[1].append(min(tf, 0xFFFF))
+        self.docs.append(message)
+        self._doc_len.append(len(tokens))
+        self._total_len += len(tokens)
+        added = len(freqs) * POSTING_BYTES
+        self.nbytes += added
+        return added
+
+    def drop_oldest(self) -> int:
+        """Forget the oldest live message; returns the bytes released."""
+        doc = self.base
+        self.base += 1
+        self._total_len -= self._doc_len[doc]
+        released = len(set(tokenize(self.docs[doc].content))) * POSTING_BYTES
+        self.docs[doc] = None
+        self.nbytes -= released
+        if self.base > len(self.docs) // 2 and self.base > 64:
+            self._rebuild()
+        return released
+
+    def _rebuild(self):
+        live = self.docs[self.base:]
+        self.__init__()
+        for message in live:
+            self.add(message)
+
+    def clear(self):
+        self.__init__()
+
+    def search(self, query: str, k: int, exclude_last: int = 0) -> List[int]:
+        """
+        Doc numbers of the ``k`` best BM25 matches for ``query``, skipping the
+        last ``exclude_last`` messages (sent anyway as the recent window).
+        Returned best first.
+        """
+        base = self.base
+        end = len(self.docs) - exclude_last
+        n = end - base
+        if n <= 0 or k <= 0:
+            return []
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        import numpy as np
+        doc_len = np.frombuffer(self._doc_len, dtype=np.uint32)
+        avgdl = max(self._total_len / len(self), 1.0)
+        scores = np.zeros(n, dtype=np.float32)
+        for term in terms:
+            entry = self._postings.get(term)
+            if entry is None:
+                continue
+            docs = np.frombuffer(entry[0], dtype=np.uint32)
+            lo, hi = np.searchsorted(docs, (base, end))
+            if lo == hi:
+                continue
+            docs = docs[lo:hi]
+            tf = np.frombuffer(entry[1], dtype=np.uint16)[lo:hi].astype(np.float32)
+            idf = math.log(1 + (n - (hi - lo) + 0.5) / ((hi - lo) + 0.5))
+            norm = K1 * (1 - B + B * doc_len[docs] / avgdl)
+            scores[docs - base] += idf * tf * (K1 + 1) / (tf + norm)
+        hits = int(np.count_nonzero(scores))
+        if hits == 0:
+            return []
+        k = min(k, hits)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [int(i) + base for i in top]
+
+    def relevant_turns(self, query: str, k: int, recent: int) -> Tuple[List, List]:
+        """
+        The ``k`` most relevant older turns (each matched message together with
+        its user/assistant partner), oldest first, and the last ``recent``
+        messages.
+        """
+        docs = self.docs
+        end = len(docs)
+        recent_start = max(self.base, end - recent)
+        picked = set()
+        for doc in self.search(query, k, exclude_last=end - recent_start):
+            picked.add(doc)
+            partner = doc + 1 if docs[doc].role == "user" else doc - 1
+            if self.base <= partner < recent_start and docs[partner].role != docs[doc].role:
+                picked.add(partner)
+        return [docs[d] for d in sorted(picked)], docs[recent_start:end]
+
@@ -0,0 +1,264 @@
+"""
+Weighted fair queuing of upstream work across tenants (deficit round-robin).
+
+When its limiter (src/core/concurrency.py) is full, a request waits in its
+tenant's queue instead of being shed at once. Each time a slot frees, the
+scheduler serves tenants round-robin: a tenant joining the back of the line
+is credited its weight, and at the front it is served while that credit
+covers the cost of its oldest request. Every backlogged tenant therefore
+gets upstream capacity in proportion to its weight, whatever its arrival
+rate — a tenant submitting a batch only ever competes with itself — while a
+tenant alone in the queue gets all of it.
+
+Arrivals never overtake queued requests. A request is shed with
+``Overloaded`` when the queue (or its tenant's share of it) is full, or when
+it has waited longer than ``max_wait``.
+"""
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from src.core.concurrency import AdaptiveLimiter, Overloaded, analysis_limiter, chat_limiter
+
+logger = logging.getLogger(__name__)
+
+# Weights below this are raised to it, so every tenant is eventually served
+MIN_WEIGHT = 0.01
+# Per-tenant statistics kept for at most this many (most recently active) tenants
+MAX_TRACKED_TENANTS = 1024
+# Tenants listed in stats()
+TOP_TENANTS = 20
+
+
+def parse_weights(text: Optional[str]) -> Dict[str, float]:
+    """Parse ``"<tenant>=<weight>,..."``; a tenant is an API key id or a client IP."""
+    weights: Dict[str, float] = {}
+    for item in (text or "").split(","):
+        if not item.strip():
+            continue
+        tenant, sep, weight = item.rpartition("=")
+        try:
+            value = float(weight)
+        except ValueError:
+            value = -1.0
+        if not sep or not tenant.strip() or value <= 0:
+            raise ValueError(f"Invalid scheduler weight {item.strip()!r}: expected '<tenant>=<positive number>'")
+        weights[tenant.strip()] = value
+    return weights
+
+
+class _Waiter:
+    __slots__ = ("future", "cost", "enqueued")
+
+    def __init__(self, future: asyncio.Future, cost: float):
+        self.future = future
+        self.cost = cost
+        self.enqueued = time.perf_counter()
+
+
+class _Flow:
+    __slots__ = ("waiters", "weight", "deficit")
+
+    def __init__(self, weight: float):
+        self.waiters: Deque[_Waiter] = deque()
+        self.weight = weight
+        self.deficit = weight    # credit for its first turn
+
+
+class _TenantStats:
+    __slots__ = ("served", "shed", "wait_sum", "wait_max")
+
+    def __init__(self):
+        self.served = 0
+        self.shed = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+
+
+class FairScheduler:
+    """
+    Deficit round-robin queue in front of one ``AdaptiveLimiter``.
+
+    Runs on the event loop only (not thread-safe). With the scheduler
+    disabled, requests go straight to the limiter and are shed at once when
+    it is full.
+    """
+
+    def __init__(
+        self,
+        limiter: AdaptiveLimiter,
+        max_queue: int = 256,
+        max_tenant_queue: int = 64,
+        max_wait: float = 10.0,
+    ):
+        self._limiter = limiter
+        self._max_queue = max_queue
+        self._max_tenant_queue = max_tenant_queue
+        self._max_wait = max_wait
+        self._weights: Dict[str, float] = {}
+        self._default_weight = 1.0
+        self._flows: "OrderedDict[str, _Flow]" = OrderedDict()   # backlogged tenants, in turn order
+        self._queued = 0
+        self._tenants: "OrderedDict[str, _TenantStats]" = OrderedDict()
+        self.enabled = True
+
+    def configure(
+        self,
+        enabled: bool = True,
+        weights: Optional[Dict[str, float]] = None,
+        default_weight: float = 1.0,
+        max_queue: int = 256,
+        max_tenant_queue: int = 64,
+        max_wait: float = 10.0,
+    ):
+        self.enabled = enabled
+        self._weights = dict(weights or {})
+        self._default_weight = default_weight
+        self._max_queue = max_queue
+        self._max_tenant_queue = max_tenant_queue
+        self._max_wait = max_wait
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def weight(self, tenant: str) -> float:
+        return max(MIN_WEIGHT, self._weights.get(tenant, self._default_weight))
+
+    def _stats(self, tenant: str) -> _TenantStats:
+        stats = self._tenants.get(tenant)
+        if stats is None:
+            stats = self._tenants[tenant] = _TenantStats()
+            if len(self._tenants) > MAX_TRACKED_TENANTS:
+                self._tenants.popitem(last=False)
+        else:
+            self._tenants.move_to_end(tenant)
+        return stats
+
+    # ── Admission ────────────────────────────────────────────────────────
+
+    @asynccontextmanager
+    async def slot(self, tenant: str, cost: float = 1.0) -> AsyncIterator[None]:
+        """
+        Hold one of the limiter's slots for the block, waiting for the
+        tenant's turn if it is full. ``cost`` is the request's size in
+        turns (1 for a typical request).
+        """
+        limiter = self._limiter
+        if not self.enabled or not limiter.enabled:
+            async with limiter.slot():
+                yield
+            return
+
+        stats = self._stats(tenant)
+        if not self._queued and limiter.available > 0:
+            limiter.try_acquire()
+            stats.served += 1
+        else:
+            await self._wait(tenant, cost, stats)
+        try:
+            async with limiter.hold():
+                yield
+        finally:
+            self._dispatch()
+
+    async def _wait(self, tenant: str, cost: float, stats: _TenantStats):
+        flow = self._flows.get(tenant)
+        if self._queued >= self._max_queue or (flow and len(flow.waiters) >= self._max_tenant_queue):
+            self._shed(tenant, stats, "queue full")
+        if flow is None:
+            flow = self._flows[tenant] = _Flow(self.weight(tenant))
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), cost)
+        flow.waiters.append(waiter)
+        self._queued += 1
+        self._dispatch()   # the limit may have grown since the last release
+
+        try:
+            await asyncio.wait_for(waiter.future, self._max_wait)
+        except asyncio.TimeoutError:
+            self._abandon(tenant, flow, waiter)
+            self._shed(tenant, stats, f"waited {self._max_wait:g}s")
+        except asyncio.CancelledError:
+            self._abandon(tenant, flow, waiter)
+            raise
+
+    def _abandon(self, tenant: str, flow: _Flow, waiter: _Waiter):
+        """Withdraw a waiter that timed out or was cancelled."""
+        if waiter in flow.waiters:
+            flow.waiters.remove(waiter)
+            self._queued -= 1
+            if not flow.waiters and self._flows.get(tenant) is flow:
+                del self._flows[tenant]
+        elif waiter.future.done() and not waiter.future.cancelled():
+            # Granted a slot in the same instant — hand it on
+            self._limiter.release(None)
+            self._dispatch()
+
+    def _shed(self, tenant: str, stats: _TenantStats, reason: str):
+        stats.shed += 1
+        limiter = self._limiter
+        limiter.record_shed()
+        logger.warning(f"Shed {limiter.name} request from {tenant} ({reason})")
+        raise Overloaded(limiter.name, limiter.limit, limiter.retry_after())
+
+    def _dispatch(self):
+        """Hand free slots to waiting tenants in deficit round-robin order."""
+        limiter = self._limiter
+        flows = self._flows
+        while flows and limiter.available > 0:
+            tenant, flow = next(iter(flows.items()))
+            waiter = flow.waiters[0]
+            if flow.deficit < waiter.cost:
+                # Turn over: credit the next one and go to the back of the line
+                flow.deficit += flow.weight
+                flows.move_to_end(tenant)
+                continue
+            flow.waiters.popleft()
+            self._queued -= 1
+            if not flow.waiters:
+                del flows[tenant]   # an idle tenant keeps no credit
+            if waiter.future.done():
+                continue            # timed out or cancelled while queued
+            flow.deficit -= waiter.cost
+            limiter.try_acquire()
+            waiter.future.set_result(None)
+            wait = time.perf_counter() - waiter.enqueued
+            stats = self._stats(tenant)
+            stats.served += 1
+            stats.wait_sum += wait
+            stats.wait_max = max(stats.wait_max, wait)
+
+    # ── Introspection ────────────────────────────────────────────────────
+
+    def stats(self) -> Dict[str, Any]:
+        def queued(tenant: str) -> int:
+            flow = self._flows.get(tenant)
+            return len(flow.waiters) if flow else 0
+
+        busiest = sorted(
+            self._tenants.items(), key=lambda kv: (queued(kv[0]), kv[1].served), reverse=True
+        )[:TOP_TENANTS]
+        return {
+            "enabled": self.enabled,
+            "queued": self._queued,
+            "max_queue": self._max_queue,
+            "tenants": {
+                tenant: {
+                    "weight": self.weight(tenant),
+                    "queued": queued(tenant),
+                    "served": s.served,
+                    "shed": s.shed,
+                    "queue_wait_avg_ms": round(s.wait_sum / s.served * 1000, 1) if s.served else 0.0,
+                    "queue_wait_max_ms": round(s.wait_max * 1000, 1),
+                }
+                for tenant, s in busiest
+            },
+        }
+
+
+# Singletons — one per limiter, so interactive /chat never queues behind analysis work
+chat_scheduler = FairScheduler(chat_limiter)
+analysis_scheduler = FairScheduler(analysis_limiter)
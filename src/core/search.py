@@ -0,0 +1,253 @@
+"""
+Cross-session full-text index — token → posting list of messages.
+
+Postings are ``array('Q')`` columns of doc numbers in arrival order (8 bytes
+each); a doc number maps to (session_id, message_id, role, timestamp) in the
+doc table. The index holds no message text, so demoted sessions stay small:
+phrase queries are confirmed against the stored message by the caller.
+
+Removal is lazy: evicting a session or trimming its oldest messages only
+drops doc-table entries, and a shard's posting lists are compacted once its
+dead postings outnumber live ones. Prefix queries (``invo*``) expand through
+a table of vocabulary terms keyed by their first characters.
+"""
+import re
+import heapq
+import threading
+from array import array
+from collections import deque
+from itertools import count
+from operator import itemgetter
+from typing import Deque, Dict, Iterable, Iterator, List, NamedTuple, Set, Tuple
+
+from src.core.retrieval import tokenize
+from src.core.sharding import DEFAULT_SHARDS
+
+_QUERY_RE = re.compile(r'"([^"]+)"|(\S+)')
+_WORD_RE = re.compile(r"\w+")
+
+PREFIX_KEY_LEN = 3
+MIN_PREFIX_LEN = 2
+
+# A shard compacts once it has this many dead postings and they outnumber the live ones
+COMPACT_MIN_DEAD = 4096
+
+# Approximate resident bytes: one posting entry; one doc-table entry; one
+# vocabulary term (its string, posting-array header, dict and prefix-table slots)
+POSTING_BYTES = 8
+DOC_BYTES = 200
+TERM_BYTES = 280
+
+
+class SearchDoc(NamedTuple):
+    session_id: str
+    message_id: str
+    role: str
+    timestamp: float
+    n_terms: int
+
+
+class Query(NamedTuple):
+    terms: List[str]                 # every term must match
+    prefixes: List[str]              # every prefix must match some term
+    phrases: List[List[str]]         # word sequences to confirm against the text
+
+
+def parse_query(text: str) -> Query:
+    """``"exact phrase"``, ``prefix*`` and plain words, all ANDed together."""
+    terms, prefixes, phrases = [], [], []
+    for phrase, word in _QUERY_RE.findall(text):
+        if phrase:
+            terms.extend(tokenize(phrase))
+            words = _WORD_RE.findall(phrase.lower())
+            if len(words) > 1:
+                phrases.append(words)
+        elif word.endswith("*"):
+            stem = "".join(_WORD_RE.findall(word.lower()))
+            if len(stem) >= MIN_PREFIX_LEN:
+                prefixes.append(stem)
+        else:
+            terms.extend(tokenize(word))
+    return Query(terms, prefixes, phrases)
+
+
+def phrase_in(content: str, phrase: List[str]) -> bool:
+    words = _WORD_RE.findall(content.lower())
+    n = len(phrase)
+    first = phrase[0]
+    return any(
+        words[i] == first and words[i:i + n] == phrase
+        for i in range(len(words) - n + 1)
+    )
+
+
+class _IndexShard:
+    """The postings and doc table of one stripe of sessions, behind its own lock."""
+
+    def __init__(self, doc_seq: Iterator[int]):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, array] = {}
+        self._prefix_table: Dict[str, Set[str]] = {}
+        self._docs: Dict[int, SearchDoc] = {}
+        self._session_docs: Dict[str, Deque[int]] = {}
+        self._doc_seq = doc_seq
+        self._postings_total = 0
+        self._postings_live = 0
+
+    def add(self, session_id: str, message_id: str, role: str, timestamp: float, terms: Tuple[str, ...]):
+        with self._lock:
+            doc = next(self._doc_seq)
+            self._docs[doc] = SearchDoc(session_id, message_id, role, timestamp, len(terms))
+            self._session_docs.setdefault(session_id, deque()).append(doc)
+            for term in terms:
+                posting = self._postings.get(term)
+                if posting is None:
+                    posting = self._postings[term] = array("Q")
+                    self._prefix_table.setdefault(term[:PREFIX_KEY_LEN], set()).add(term)
+                posting.append(doc)
+            self._postings_total += len(terms)
+            self._postings_live += len(terms)
+
+    def _drop(self, doc: int):
+        entry = self._docs.pop(doc, None)
+        if entry is not None:
+            self._postings_live -= entry.n_terms
+
+    def trim_session(self, session_id: str, keep: int):
+        with self._lock:
+            docs = self._session_docs.get(session_id)
+            if not docs:
+                return
+            while len(docs) > keep:
+                self._drop(docs.popleft())
+            if not docs:
+                del self._session_docs[session_id]
+            self._maybe_compact()
+
+    def drop_session(self, session_id: str):
+        with self._lock:
+            for doc in self._session_docs.pop(session_id, ()):
+                self._drop(doc)
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        """Rewrite posting lists without dead docs once they are the majority."""
+        dead = self._postings_total - self._postings_live
+        if dead < COMPACT_MIN_DEAD or dead < self._postings_live:
+            return
+        docs = self._docs
+        for term in list(self._postings):
+            live = array("Q", (d for d in self._postings[term] if d in docs))
+            if live:
+                self._postings[term] = live
+            else:
+                del self._postings[term]
+                bucket = self._prefix_table.get(term[:PREFIX_KEY_LEN])
+                if bucket is not None:
+                    bucket.discard(term)
+                    if not bucket:
+                        del self._prefix_table[term[:PREFIX_KEY_LEN]]
+        self._postings_total = self._postings_live
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        if len(prefix) >= PREFIX_KEY_LEN:
+            bucket = self._prefix_table.get(prefix[:PREFIX_KEY_LEN], ())
+            return [t for t in bucket if t.startswith(prefix)]
+        return [
+            t for key, bucket in self._prefix_table.items() if key.startswith(prefix)
+            for t in bucket if t.startswith(prefix)
+        ]
+
+    def candidates(self, query: Query, max_docs: int) -> Tuple[int, List[Tuple[int, SearchDoc]]]:
+        """The shard's matching live docs: their count and the newest ``max_docs`` (doc, entry) pairs."""
+        with self._lock:
+            groups: List[Iterable[int]] = []
+            for term in query.terms:
+                posting = self._postings.get(term)
+                if posting is None:
+                    return 0, []
+                groups.append(posting)
+            for prefix in query.prefixes:
+                union = set()
+                for term in self._expand_prefix(prefix):
+                    union.update(self._postings[term])
+                if not union:
+                    return 0, []
+                groups.append(union)
+            if not groups:
+                return 0, []
+            groups.sort(key=len)
+            matched = set(groups[0])
+            for group in groups[1:]:
+                matched.intersection_update(group)
+                if not matched:
+                    return 0, []
+            docs = self._docs
+            live = [d for d in matched if d in docs]   # skip postings of dropped docs
+            return len(live), [(d, docs[d]) for d in heapq.nlargest(max_docs, live)]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "documents": len(self._docs),
+                "sessions": len(self._session_docs),
+                "terms": len(self._postings),
+                "postings": self._postings_total,
+                "dead_postings": self._postings_total - self._postings_live,
+            }
+
+
+class SearchIndex:
+    """
+    Inverted index over every cached session's messages. Thread-safe.
+
+    Sharded by session id like the session store: each shard has its own
+    lock, posting lists and compaction, so indexing a message (and the
+    occasional compaction it triggers) only ever waits on writes to sessions
+    of the same shard. Doc numbers come from one sequence shared by all
+    shards, so merging per-shard results newest first stays exact. Queries
+    visit the shards one lock at a time.
+    """
+
+    def __init__(self, num_shards: int = DEFAULT_SHARDS):
+        doc_seq = count()   # next() on itertools.count is atomic under the GIL
+        self._shards = [_IndexShard(doc_seq) for _ in range(max(1, num_shards))]
+
+    def _shard(self, session_id: str) -> _IndexShard:
+        return self._shards[hash(session_id) % len(self._shards)]
+
+    def add(self, session_id: str, message_id: str, role: str, timestamp: float, content: str):
+        terms = tuple(dict.fromkeys(tokenize(content)))   # tokenized outside any lock
+        self._shard(session_id).add(session_id, message_id, role, timestamp, terms)
+
+    def trim_session(self, session_id: str, keep: int):
+        """Forget a session's oldest messages until ``keep`` remain (mirrors its ring buffer)."""
+        self._shard(session_id).trim_session(session_id, keep)
+
+    def drop_session(self, session_id: str):
+        self._shard(session_id).drop_session(session_id)
+
+    def candidates(self, query: Query, max_docs: int) -> Tuple[int, List[SearchDoc]]:
+        """
+        Live docs matching every term and prefix (phrases unchecked): the total
+        count and the newest ``max_docs`` of them, newest first.
+        """
+        total = 0
+        newest: List[Tuple[int, SearchDoc]] = []
+        for shard in self._shards:
+            n, docs = shard.candidates(query, max_docs)
+            total += n
+            newest.extend(docs)
+        return total, [doc for _, doc in heapq.nlargest(max_docs, newest, key=itemgetter(0))]
+
+    def stats(self) -> Dict[str, int]:
+        totals = {"documents": 0, "sessions": 0, "terms": 0, "postings": 0, "dead_postings": 0}
+        for shard in self._shards:
+            for key, value in shard.stats().items():
+                totals[key] += value
+        totals["shards"] = len(self._shards)
+        # Terms repeat across shards, so "terms" counts each shard's vocabulary
+        totals["bytes"] = (
+            totals["postings"] * POSTING_BYTES + totals["documents"] * DOC_BYTES + totals["terms"] * TERM_BYTES
+        )
+        return totals
@@ -0,0 +1,41 @@
+"""
+JSON encoding for API responses and cached payloads.
+
+Uses orjson when it is installed — several times faster than the stdlib
+encoder on large non-ASCII bodies such as a long conversation history — and
+otherwise the stdlib encoder. Both produce the same compact UTF-8 output.
+"""
+import json
+from datetime import date, datetime
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (tuple, set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj: Any) -> bytes:
+        """Serialize ``obj`` to compact UTF-8 JSON."""
+        return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+else:
+    def dumps(obj: Any) -> bytes:
+        """Serialize ``obj`` to compact UTF-8 JSON."""
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+BACKEND = "orjson" if orjson is not None else "json"
@@ -0,0 +1,1301 @@
+"""
+Unified session store — session metadata and conversation messages in one record.
+
+Every session lives in a single SessionRecord behind one shard lock, with one
+expiry index and one eviction path. Records carry an approximate byte size so
+the store can enforce session-count and memory budgets by evicting the least
+recently used sessions. An optional StorageBackend makes sessions durable;
+the in-memory records then act as a read-through cache in front of it.
+Idle records are demoted to compressed (warm) and then disk-spilled (cold)
+tiers by a background sweep and promoted back transparently on access.
+``memory_manager`` and ``session_manager`` are thin facades over the
+``session_store`` singleton.
+"""
+import os
+import sys
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from collections import deque
+from itertools import count, islice
+from typing import (
+    Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Any, Sequence, Tuple,
+)
+from datetime import datetime
+
+from src.core.retrieval import TurnIndex
+from src.core.search import SearchDoc, SearchIndex, parse_query, phrase_in
+from src.core.serialization import dumps
+from src.core.sharding import ShardedMap, Shard, DEFAULT_SHARDS
+from src.core.storage.base import StorageBackend, StoredMessage, StoredSession
+from src.core.tiering import (
+    HOT, WARM, COLD, CODEC, SegmentSpill, LatencyWindow,
+    pack_messages, unpack_messages,
+)
+
+logger = logging.getLogger(__name__)
+
+# Approximate fixed costs, in bytes, on top of the message text itself:
+# the message object, its float timestamp and deque slot (plus the lazily
+# built id); the record, buffer and index entry.
+MESSAGE_OVERHEAD_BYTES = 160
+RECORD_OVERHEAD_BYTES = 1024
+
+
+def _seq_base() -> int:
+    """A random start for this process's message sequence (48 random bits, 16 bits of headroom)."""
+    return int.from_bytes(os.urandom(6), "big") << 16
+
+
+# Process-wide message sequence — next() on itertools.count is atomic under the GIL.
+# Each process starts it at a random point, so two workers never mint the same id
+_message_seq = count(_seq_base())
+# Session content revisions — process-local, they only key the page cache
+_revision_seq = count()
+# Mixed into ETags of unshared sessions, so no two processes ever hand out
+# the same tag for different histories
+_process_nonce = uuid.uuid4().hex
+
+
+def _reseed_after_fork():
+    """Forked workers inherit the parent's sequence and nonce: give each its own."""
+    global _message_seq, _process_nonce
+    _message_seq = count(_seq_base())
+    _process_nonce = uuid.uuid4().hex
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reseed_after_fork)
+
+# Serialized history pages cached per session (each is dropped on the next write)
+MAX_CACHED_PAGES = 4
+
+# Candidates examined per requested hit when a search has phrases to confirm
+PHRASE_LOOKAHEAD = 10
+
+
+def find_message(messages: Tuple["ConversationMessage", ...], message_id: str) -> Optional[int]:
+    """Index of ``message_id`` in a history snapshot: binary search on the time-ordered ids."""
+    i = bisect_left(messages, message_id, key=lambda m: m.message_id)
+    if i < len(messages) and messages[i].message_id == message_id:
+        return i
+    # Ids restored from elsewhere may not be ordered — fall back to a scan
+    return next((i for i, m in enumerate(messages) if m.message_id == message_id), None)
+
+
+def message_size(content: str) -> int:
+    """Approximate resident size of one stored message."""
+    return MESSAGE_OVERHEAD_BYTES + sys.getsizeof(content)
+
+
+class ConversationMessage:
+    """
+    A single conversation message.
+
+    Kept deliberately small: the role string is interned, the timestamp is a
+    float, and the message id is only built on first use.
+    The id is derived from the timestamp and a process-wide sequence number, so
+    two readers materializing it concurrently always agree. Like a ULID, it
+    leads with the millisecond timestamp: ids sort in creation order, which
+    lets history cursors seek by binary search.
+    Messages are treated as immutable once stored.
+    """
+
+    __slots__ = ("role", "content", "timestamp", "_message_id")
+
+    def __init__(
+        self,
+        role: str,
+        content: str,
+        message_id: str = None,
+        timestamp: Optional[float] = None,
+    ):
+        self.role = sys.intern(role)
+        self.content = content
+        self.timestamp = timestamp or time.time()
+        self._message_id = message_id or next(_message_seq)
+
+    @property
+    def message_id(self) -> str:
+        message_id = self._message_id
+        if isinstance(message_id, int):
+            millis = int(self.timestamp * 1000)
+            message_id = self._message_id = str(uuid.UUID(int=(millis << 80) | message_id))
+        return message_id
+
+    def model_dump(self) -> Dict[str, Any]:
+        # timestamp stays a datetime, as in pydantic's python mode; the JSON
+        # encoder (src.core.serialization) formats it natively
+        return {
+            "role": self.role,
+            "content": self.content,
+            "timestamp": datetime.utcfromtimestamp(self.timestamp),
+            "message_id": self.message_id,
+        }
+
+    def to_gemini_format(self) -> Dict[str, Any]:
+        """
+        Convert to Gemini's expected history format.
+        Built per call, not memoized: a cached payload would pin a dict and list
+        per message for a few microseconds saved per request.
+        """
+        # Gemini uses 'model' for assistant, 'user' for user
+        gemini_role = "model" if self.role == "assistant" else "user"
+        return {"role": gemini_role, "parts": [self.content]}
+
+    def to_stored(self) -> StoredMessage:
+        return StoredMessage(self.message_id, self.role, self.content, self.timestamp)
+
+
+class SessionBuffer:
+    """
+    Ring buffer of messages for a single session, bounded by count and bytes.
+    Readers receive immutable tuple snapshots, never the live buffer.
+    An optional TurnIndex mirrors the buffer for relevance retrieval; its
+    postings count toward ``nbytes``.
+
+    Forked buffers share history copy-on-write: the oldest messages may live
+    in ``_prefix``, an immutable tuple shared with the session it was forked
+    from, visible as ``_prefix[_start:_end]``; new messages go to the buffer's
+    own deque. Every buffer charges the full size of the messages it can
+    see: any one of the sessions sharing a prefix may outlive the others, so
+    none of them can count on another paying for it.
+    """
+
+    __slots__ = (
+        "max_messages", "max_bytes", "_messages", "nbytes", "index",
+        "_prefix", "_start", "_end",
+    )
+
+    def __init__(
+        self, max_messages: int = 50, max_bytes: Optional[int] = None, indexed: bool = False
+    ):
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self._messages: Deque[ConversationMessage] = deque()
+        self.nbytes = 0
+        self.index: Optional[TurnIndex] = TurnIndex() if indexed else None
+        self._prefix: Tuple[ConversationMessage, ...] = ()
+        self._start = self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start + len(self._messages)
+
+    def add_message(self, role: str, content: str) -> ConversationMessage:
+        msg = ConversationMessage(role, content)
+        self._messages.append(msg)
+        self.nbytes += message_size(content)
+        if self.index is not None:
+            self.nbytes += self.index.add(msg)
+        self._trim()
+        return msg
+
+    def restore(self, messages: Iterable[ConversationMessage]):
+        """Append already-built messages (e.g. loaded from a backend), oldest first."""
+        index = self.index
+        for msg in messages:
+            self._messages.append(msg)
+            self.nbytes += message_size(msg.content)
+            if index is not None:
+                self.nbytes += index.add(msg)
+        self._trim()
+
+    def _trim(self):
+        """Rolling window — drop the oldest messages beyond the count/byte caps."""
+        messages = self._messages
+        while len(self) > self.max_messages or (
+            # Always keep the newest message, even if it alone exceeds the cap
+            self.max_bytes is not None and self.nbytes > self.max_bytes and len(self) > 1
+        ):
+            if self._start < self._end:
+                self.nbytes -= message_size(self._prefix[self._start].content)
+                self._start += 1
+                if self._start == self._end:
+                    self._prefix = ()
+                    self._start = self._end = 0
+            else:
+                self.nbytes -= message_size(messages.popleft().content)
+            if self.index is not None:
+                self.nbytes -= self.index.drop_oldest()
+
+    def snapshot(self, last_n: Optional[int] = None) -> Tuple[ConversationMessage, ...]:
+        """Immutable view of the last ``last_n`` messages (all if None)."""
+        messages = self._messages
+        if last_n and last_n <= len(messages):
+            return tuple(islice(messages, len(messages) - last_n, None))
+        if self._start == self._end:
+            return tuple(messages)
+        start = self._start
+        if last_n and last_n < len(self):
+            start = self._end - (last_n - len(messages))
+        return self._prefix[start:self._end] + tuple(messages)
+
+    def get_history(self) -> Tuple[ConversationMessage, ...]:
+        return self.snapshot()
+
+    def newest(self) -> Optional[ConversationMessage]:
+        if self._messages:
+            return self._messages[-1]
+        if self._start < self._end:
+            return self._prefix[self._end - 1]
+        return None
+
+    def get_gemini_history(self, last_n: Optional[int] = None) -> List[Dict]:
+        """Return history in Gemini chat format."""
+        return [m.to_gemini_format() for m in self.snapshot(last_n)]
+
+    def relevant(
+        self, query: str, k: int, recent: int
+    ) -> Tuple[Tuple[ConversationMessage, ...], Tuple[ConversationMessage, ...]]:
+        """The ``k`` turns most relevant to ``query`` (oldest first) and the last ``recent`` messages."""
+        if self.index is None:
+            return (), self.snapshot(recent)
+        older, latest = self.index.relevant_turns(query, k, recent)
+        return tuple(older), tuple(latest)
+
+    def _freeze(self):
+        """Move the own deque into a new immutable prefix (O(window) pointer copy)."""
+        if not self._messages:
+            return
+        self._prefix = self._prefix[self._start:self._end] + tuple(self._messages)
+        self._start, self._end = 0, len(self._prefix)
+        self._messages.clear()
+
+    def fork(self, message_id: str) -> Optional["SessionBuffer"]:
+        """
+        A new buffer sharing this buffer's messages up to and including
+        ``message_id``; None if that message is not in the buffer. Repeated
+        forks of an unchanged buffer copy nothing.
+        """
+        self._freeze()
+        prefix = self._prefix
+        for i in range(self._end - 1, self._start - 1, -1):
+            if prefix[i].message_id == message_id:
+                break
+        else:
+            return None
+        child = SessionBuffer(self.max_messages, self.max_bytes, indexed=False)
+        child._prefix = prefix
+        child._start = self._start
+        child._end = i + 1
+        child.nbytes = sum(message_size(m.content) for m in prefix[child._start:child._end])
+        if self.index is not None:
+            child.index = TurnIndex()
+            for msg in prefix[child._start:child._end]:
+                child.nbytes += child.index.add(msg)
+        return child
+
+    def clear(self):
+        self._messages.clear()
+        self.nbytes = 0
+        self._prefix = ()
+        self._start = self._end = 0
+        if self.index is not None:
+            self.index.clear()
+
+
+class SessionRecord:
+    """
+    Metadata and message buffer for one session.
+
+    Idle records may be demoted: their messages then live in ``packed``, a
+    compressed blob (warm) or a SpillRef into a disk segment (cold), and the
+    buffer stays empty until the record is promoted again.
+
+    With summarization on, ``summary`` condenses every message up to and
+    including ``summary_through`` (a message id); only later messages are
+    sent verbatim.
+    """
+
+    __slots__ = (
+        "session_id", "created_at", "last_active", "message_count", "ttl", "buffer",
+        "version", "synced_at", "tier", "packed", "summary", "summary_through",
+        "summary_source_tokens", "parent_id", "fork_point", "revision", "pages",
+    )
+
+    def __init__(
+        self,
+        session_id: str,
+        ttl: int = 3600,
+        max_messages: int = 50,
+        max_bytes: Optional[int] = None,
+        indexed: bool = False,
+    ):
+        self.session_id = session_id
+        self.created_at = time.time()
+        self.last_active = self.created_at
+        self.message_count = 0
+        self.ttl = ttl
+        self.buffer = SessionBuffer(max_messages, max_bytes, indexed)
+        # Shared-backend bookkeeping: backend version last seen, and when
+        self.version: Optional[int] = None
+        self.synced_at = self.created_at
+        self.tier = HOT
+        self.packed: Any = None   # bytes when warm, SpillRef when cold
+        self.summary: Optional[str] = None
+        self.summary_through: Optional[str] = None
+        self.summary_source_tokens = 0
+        # Set on branches: the session and message this one was forked from
+        self.parent_id: Optional[str] = None
+        self.fork_point: Optional[str] = None
+        # Bumped on every history change; keys the page cache
+        self.revision = next(_revision_seq)
+        self.pages: Optional[Dict[Tuple[Optional[str], Optional[int]], bytes]] = None
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate resident size of the record and its messages."""
+        size = RECORD_OVERHEAD_BYTES + sys.getsizeof(self.session_id) + self.buffer.nbytes
+        if self.tier == WARM:
+            size += len(self.packed)
+        if self.summary is not None:
+            size += sys.getsizeof(self.summary)
+        if self.pages:
+            size += sum(len(body) for body in self.pages.values())
+        return size
+
+    def clear_summary(self):
+        self.summary = self.summary_through = None
+        self.summary_source_tokens = 0
+
+    def unsummarized(self, last_n: Optional[int] = None) -> Tuple[ConversationMessage, ...]:
+        """Messages newer than the summary (all messages if there is none), capped at ``last_n``."""
+        messages = self.buffer.snapshot()
+        if self.summary_through is not None:
+            for i in range(len(messages) - 1, -1, -1):
+                if messages[i].message_id == self.summary_through:
+                    messages = messages[i + 1:]
+                    break
+            # Not found: the summarized messages already left the buffer
+        if last_n and last_n < len(messages):
+            messages = messages[-last_n:]
+        return messages
+
+    def touch(self):
+        self.last_active = time.time()
+        self.message_count += 1
+
+    def reset(self):
+        self.message_count = 0
+        self.touch()
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        return ((now or time.time()) - self.last_active) > self.ttl
+
+    def etag(self) -> str:
+        """
+        Weak ETag of the history. With a shared backend it is derived from the
+        backend version, which every worker sees alike; otherwise from this
+        process's revision plus a per-process nonce. Both are mixed with the
+        session id and the newest message, so a recreated session or another
+        process never reuses a tag for different content. Hot records only.
+        """
+        newest = self.buffer.newest()
+        if self.version is not None:
+            state = f"v{self.version}"
+        else:
+            state = f"{_process_nonce}:{self.revision}"
+        source = f"{self.session_id}\0{state}\0{len(self.buffer)}\0{newest.message_id if newest else ''}"
+        return f'W/"{hashlib.blake2b(source.encode(), digest_size=8).hexdigest()}"'
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "created_at": datetime.utcfromtimestamp(self.created_at).isoformat(),
+            "last_active": datetime.utcfromtimestamp(self.last_active).isoformat(),
+            "message_count": self.message_count,
+            "size_bytes": self.nbytes,
+            "tier": self.tier,
+            "parent_id": self.parent_id,
+            "fork_point": self.fork_point,
+            "ttl_remaining": max(0, int(self.ttl - (time.time() - self.last_active))),
+        }
+
+
+class SessionExists(Exception):
+    """A new session was asked to take an id that is already in use."""
+
+
+class HistoryPage(NamedTuple):
+    etag: str
+    body: Optional[bytes]   # None when the client's If-None-Match already matches
+
+
+class SessionStore:
+    """
+    Thread-safe, lock-striped store of SessionRecords.
+
+    Each shard's OrderedDict doubles as its expiry and LRU index: records are
+    moved to the end whenever they become active, so expired and least recently
+    used records are always at the front and eviction only inspects those.
+
+    Global limits (session count, total bytes) are split evenly across shards;
+    since sessions hash uniformly this approximates a global LRU without ever
+    holding more than one shard lock.
+
+    With a shared backend the cached records form a near-cache: a record is
+    trusted for ``near_cache_ms`` after it was last synced, then revalidated
+    with a cheap version check and reloaded only if another worker wrote it.
+
+    Tiering: ``maintain()`` (run periodically by ``start_maintenance``) packs
+    records idle for ``warm_after`` seconds into a compressed blob and spills
+    those idle for ``cold_after`` seconds to a disk segment. Any access goes
+    through ``_locked``, which promotes the record back to hot first.
+    """
+
+    def __init__(self, num_shards: int = DEFAULT_SHARDS):
+        self._sessions = ShardedMap(num_shards)
+        self._backend: Optional[StorageBackend] = None
+        self._ttl = 3600
+        self._max_messages = 50
+        self._max_sessions: Optional[int] = None
+        self._max_bytes: Optional[int] = None
+        self._max_session_bytes: Optional[int] = None
+        self._near_cache_ttl = 0.0
+        self._indexed = False
+        self._evicted_expired = 0
+        self._evicted_lru = 0
+        self._warm_after = 0.0
+        self._cold_after = 0.0
+        self._spill: Optional[SegmentSpill] = None
+        self._demoted = {WARM: 0, COLD: 0}
+        self._promotions = LatencyWindow()
+        self._janitor: Optional[threading.Thread] = None
+        self._janitor_stop = threading.Event()
+        # parent session_id → ids of sessions forked from it
+        self._branches: Dict[str, List[str]] = {}
+        self._branches_lock = threading.Lock()
+        self._search: Optional[SearchIndex] = None
+
+    def configure(
+        self,
+        ttl: Optional[int] = None,
+        max_messages: Optional[int] = None,
+        num_shards: Optional[int] = None,
+        max_sessions: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        max_session_bytes: Optional[int] = None,
+        backend: Optional[StorageBackend] = None,
+        near_cache_ms: Optional[int] = None,
+        warm_after: Optional[int] = None,
+        cold_after: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+        retrieval_index: Optional[bool] = None,
+        search_index: Optional[bool] = None,
+    ):
+        if retrieval_index is not None:
+            self._indexed = retrieval_index
+        if warm_after is not None:
+            self._warm_after = warm_after
+        if cold_after is not None:
+            self._cold_after = cold_after
+        if spill_dir is not None and self._cold_after and self._spill is None:
+            self._spill = SegmentSpill(spill_dir)
+        if backend is not None:
+            self._backend = backend
+        if near_cache_ms is not None:
+            self._near_cache_ttl = near_cache_ms / 1000
+        if ttl is not None:
+            self._ttl = ttl
+        if max_messages is not None:
+            self._max_messages = max_messages
+        if max_sessions is not None:
+            self._max_sessions = max_sessions
+        if max_bytes is not None:
+            self._max_bytes = max_bytes
+        if max_session_bytes is not None:
+            self._max_session_bytes = max_session_bytes
+        if num_shards and num_shards != self._sessions.num_shards:
+            self._sessions = self._sessions.resized(num_shards, weigh=lambda r: r.nbytes)
+        if search_index is not None:
+            # One index shard per store shard: compaction only stalls writers already serialized
+            self._search = SearchIndex(self._sessions.num_shards) if search_index else None
+
+    # ── Internal helpers (call with the shard lock held) ─────────────────
+
+    def _new_record(self, session_id: str) -> SessionRecord:
+        return SessionRecord(
+            session_id, self._ttl, self._max_messages, self._max_session_bytes, self._indexed
+        )
+
+    def _get_or_create(self, shard: Shard, session_id: str) -> SessionRecord:
+        record = shard.items.get(session_id)
+        if record is None:
+            record = shard.items[session_id] = self._new_record(session_id)
+            shard.nbytes += record.nbytes
+            self._persist_meta(record)
+        return record
+
+    def _note_version(self, record: SessionRecord, version: Optional[int]):
+        """Track the backend version after our own write."""
+        if version is None:
+            return
+        if record.version is not None and version != record.version + 1:
+            # Another worker wrote in between — force a reload on next access
+            record.synced_at = 0.0
+        else:
+            record.synced_at = time.time()
+        record.version = version
+
+    def _persist_meta(self, record: SessionRecord):
+        if self._backend is not None:
+            self._note_version(record, self._backend.save_session(
+                record.session_id, record.created_at, record.last_active, record.message_count
+            ))
+
+    def _persist_messages(self, record: SessionRecord, messages: Iterable[ConversationMessage]):
+        if self._backend is not None:
+            self._note_version(record, self._backend.append_messages(
+                record.session_id, [m.to_stored() for m in messages]
+            ))
+
+    def _persist_turn(self, record: SessionRecord, messages: Iterable[ConversationMessage]):
+        if self._backend is not None:
+            self._note_version(record, self._backend.append_turn(
+                record.session_id,
+                [m.to_stored() for m in messages],
+                record.created_at,
+                record.last_active,
+                record.message_count,
+            ))
+
+    def _persist_clear(self, record: SessionRecord):
+        if self._backend is not None:
+            self._note_version(record, self._backend.clear_session(record.session_id))
+
+    def _remove(self, shard: Shard, session_id: str) -> Optional[SessionRecord]:
+        record = shard.items.pop(session_id, None)
+        if record is not None:
+            shard.nbytes -= record.nbytes
+            if record.tier == COLD:
+                self._spill.release(record.packed)
+            if self._search is not None:
+                self._search.drop_session(session_id)
+            if record.parent_id is not None:
+                with self._branches_lock:
+                    siblings = self._branches.get(record.parent_id)
+                    if siblings and session_id in siblings:
+                        siblings.remove(session_id)
+                        if not siblings:
+                            del self._branches[record.parent_id]
+        return record
+
+    def _shard_budget(self, limit: Optional[int]) -> Optional[int]:
+        if not limit:
+            return None
+        return max(1, -(-limit // self._sessions.num_shards))
+
+    def _enforce_limits(self, shard: Shard, keep: Optional[str] = None):
+        """Evict least recently used records until the shard is within budget."""
+        max_sessions = self._shard_budget(self._max_sessions)
+        max_bytes = self._shard_budget(self._max_bytes)
+        items = shard.items
+        while items and (
+            (max_sessions is not None and len(items) > max_sessions)
+            or (max_bytes is not None and shard.nbytes > max_bytes)
+        ):
+            sid = next(iter(items))
+            if sid == keep:
+                break
+            self._remove(shard, sid)
+            self._evicted_lru += 1
+            logger.debug(f"Evicting LRU session: {sid}")
+
+    def _changed(self, shard: Shard, record: SessionRecord):
+        """Record a history change: new revision, cached pages dropped."""
+        record.revision = next(_revision_seq)
+        if record.pages:
+            before = record.nbytes
+            record.pages = None
+            shard.nbytes += record.nbytes - before
+
+    def _index(self, record: SessionRecord, messages: Iterable[ConversationMessage]):
+        """Add messages to the search index, then drop any the ring buffer trimmed."""
+        search = self._search
+        if search is None:
+            return
+        for m in messages:
+            search.add(record.session_id, m.message_id, m.role, m.timestamp, m.content)
+        search.trim_session(record.session_id, len(record.buffer))
+
+    def _mark_active(self, shard: Shard, record: SessionRecord):
+        record.last_active = time.time()
+        shard.items.move_to_end(record.session_id)
+
+    def _evict_expired(self, shard: Shard) -> int:
+        """Pop expired records from the front of the shard's expiry order."""
+        items = shard.items
+        now = time.time()
+        evicted = 0
+        while items:
+            sid, record = next(iter(items.items()))
+            if not record.is_expired(now):
+                break
+            self._remove(shard, sid)
+            # Shared backends expire sessions themselves; other workers may still use them
+            if self._backend is not None and not self._backend.shared:
+                self._backend.delete_session(sid)
+            evicted += 1
+            logger.debug(f"Evicting expired session: {sid}")
+        self._evicted_expired += evicted
+        return evicted
+
+    # ── Tiering (call with the shard lock held) ──────────────────────────
+
+    def _demote(self, shard: Shard, record: SessionRecord, idle: float):
+        """Move an idle record down to the tier its idle time calls for."""
+        before = record.nbytes
+        record.pages = None
+        if record.tier == HOT:
+            record.packed = pack_messages([
+                (m.message_id, m.role, m.content, m.timestamp)
+                for m in record.buffer.snapshot()
+            ])
+            record.buffer.clear()
+            record.tier = WARM
+            self._demoted[WARM] += 1
+        if record.tier == WARM and self._spill is not None and idle >= self._cold_after:
+            record.packed = self._spill.write(record.packed)
+            record.tier = COLD
+            self._demoted[COLD] += 1
+        shard.nbytes += record.nbytes - before
+
+    def _promote(self, shard: Shard, record: SessionRecord):
+        """Bring a warm or cold record back to hot, timing the round trip."""
+        start = time.perf_counter()
+        before = record.nbytes
+        # Decode first: if the blob cannot be read the record stays warm/cold and the error propagates
+        blob = self._spill.read(record.packed) if record.tier == COLD else record.packed
+        messages = [
+            ConversationMessage(role, content, message_id, timestamp)
+            for message_id, role, content, timestamp in unpack_messages(blob)
+        ]
+        if record.tier == COLD:
+            self._spill.release(record.packed)
+        record.packed = None
+        record.tier = HOT
+        record.buffer.restore(messages)
+        shard.nbytes += record.nbytes - before
+        self._promotions.add((time.perf_counter() - start) * 1000)
+
+    def _stored_form(self, record: SessionRecord) -> Any:
+        """
+        The record's messages as they are held, without promoting it: a
+        snapshot tuple when hot, the packed blob when warm or cold (decode it
+        with ``unpack_messages`` outside the lock).
+        """
+        if record.tier == HOT:
+            return record.buffer.snapshot()
+        if record.tier == WARM:
+            return record.packed
+        return self._spill.read(record.packed)
+
+    def _demote_idle(self, shard: Shard) -> int:
+        """Demote idle records from the front of the shard's activity order."""
+        now = time.time()
+        demoted = 0
+        for record in shard.items.values():
+            idle = now - record.last_active
+            if idle < self._warm_after:
+                break
+            if record.tier == COLD or (record.tier == WARM and (
+                self._spill is None or idle < self._cold_after
+            )):
+                continue
+            self._demote(shard, record, idle)
+            demoted += 1
+        return demoted
+
+    # ── Read-through loading ─────────────────────────────────────────────
+
+    def _restore(self, stored: StoredSession) -> Optional[SessionRecord]:
+        record = self._new_record(stored.session_id)
+        record.created_at = stored.created_at
+        record.last_active = stored.last_active
+        record.message_count = stored.message_count
+        record.version = stored.version
+        if record.is_expired():
+            return None
+        record.buffer.restore(
+            ConversationMessage(m.role, m.content, m.message_id, m.timestamp)
+            for m in stored.messages
+        )
+        return record
+
+    def _is_fresh(self, record: Optional[SessionRecord]) -> bool:
+        if record is None:
+            return False
+        if not self._backend.shared:
+            return True
+        return time.time() - record.synced_at < self._near_cache_ttl
+
+    @contextmanager
+    def _locked(self, session_id: str) -> Iterator[Shard]:
+        """
+        Hold the session's shard lock, loading the session from the backend
+        first if it is not cached (or, for shared backends, if another worker
+        changed it). Backend I/O happens outside the lock.
+        """
+        shard = self._sessions.shard_for(session_id)
+        backend = self._backend
+        loaded = cached = None
+        reload = False
+        if backend is not None:
+            with shard.lock:
+                cached = shard.items.get(session_id)
+                fresh = self._is_fresh(cached)
+            if not fresh:
+                if cached is not None and cached.version is not None \
+                        and backend.session_version(session_id) == cached.version:
+                    cached.synced_at = time.time()
+                else:
+                    stored = backend.load_session(session_id, self._max_messages)
+                    loaded = self._restore(stored) if stored is not None else None
+                    reload = True
+        with shard.lock:
+            if reload:
+                current = shard.items.get(session_id)
+                if current is None or current is cached:
+                    if current is not None:
+                        self._remove(shard, session_id)
+                    if loaded is not None:
+                        shard.items[session_id] = loaded
+                        shard.nbytes += loaded.nbytes
+                        self._index(loaded, loaded.buffer.snapshot())
+            record = shard.items.get(session_id)
+            if record is not None and record.tier != HOT:
+                self._promote(shard, record)
+            yield shard
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────
+
+    def create(self, session_id: Optional[str] = None) -> SessionRecord:
+        """Create (or replace) a session record."""
+        session_id = session_id or str(uuid.uuid4())
+        shard = self._sessions.shard_for(session_id)
+        with shard.lock:
+            self._evict_expired(shard)
+            if self._remove(shard, session_id) is not None and self._backend is not None:
+                self._backend.clear_session(session_id)
+            record = self._get_or_create(shard, session_id)
+            self._enforce_limits(shard, keep=session_id)
+        return record
+
+    def get(self, session_id: str) -> Optional[SessionRecord]:
+        with self._locked(session_id) as shard:
+            return shard.items.get(session_id)
+
+    def touch(self, session_id: str):
+        """Update last_active and increment the turn counter, creating the session if missing."""
+        with self._locked(session_id) as shard:
+            record = self._get_or_create(shard, session_id)
+            record.touch()
+            shard.items.move_to_end(session_id)
+            self._persist_meta(record)
+            self._enforce_limits(shard, keep=session_id)
+
+    def reset(self, session_id: str):
+        """Clear a session's messages and reset its counters."""
+        with self._locked(session_id) as shard:
+            record = shard.items.get(session_id)
+            if record is not None:
+                before = record.nbytes
+                record.buffer.clear()
+                record.clear_summary()
+                record.reset()
+                shard.nbytes += record.nbytes - before
+                self._changed(shard, record)
+                if self._search is not None:
+                    self._search.drop_session(session_id)
+                shard.items.move_to_end(session_id)
+                self._persist_clear(record)
+                self._persist_meta(record)
+
+    def clear(self, session_id: str):
+        """Clear a session's messages, keeping its metadata."""
+        with self._locked(session_id) as shard:
+            record = shard.items.get(session_id)
+            if record is not None:
+                before = record.nbytes
+                record.buffer.clear()
+                record.clear_summary()
+                shard.nbytes += record.nbytes - before
+                self._changed(shard, record)
+                if self._search is not None:
+                    self._search.drop_session(session_id)
+                self._persist_clear(record)
+
+    def delete(self, session_id: str):
+        shard = self._sessions.shard_for(session_id)
+        with shard.lock:
+            self._remove(shard, session_id)
+            if self._backend is not None:
+                self._backend.delete_session(session_id)
+
+    # ── Branches ──────────────────────────────────────────────────────────
+
+    def fork(
+        self, session_id: str, message_id: str, new_session_id: Optional[str] = None
+    ) -> Optional[SessionRecord]:
+        """
+        Create a branch of ``session_id`` whose history ends at ``message_id``.
+        The branch shares the parent's messages instead of copying them.
+        Returns None if the session does not exist; raises KeyError if the
+        message is not in its retained history and SessionExists if
+        ``new_session_id`` is already taken (a branch never replaces a session).
+        """
+        if new_session_id is None:
+            new_session_id = str(uuid.uuid4())
+        elif self._backend is not None and self._backend.session_version(new_session_id) is not None:
+            raise SessionExists(new_session_id)
+        with self._locked(session_id) as shard:
+            parent = shard.items.get(session_id)
+            if parent is None:
+                return None
+            before = parent.nbytes
+            buffer = parent.buffer.fork(message_id)
+            shard.nbytes += parent.nbytes - before
+            if buffer is None:
+                raise KeyError(message_id)
+            self._mark_active(shard, parent)
+
+        record = self._new_record(new_session_id)
+        record.buffer = buffer
+        record.message_count = len(buffer) // 2
+        record.parent_id = session_id
+        record.fork_point = message_id
+        shard = self._sessions.shard_for(new_session_id)
+        with shard.lock:
+            if new_session_id in shard.items:
+                raise SessionExists(new_session_id)
+            shard.items[new_session_id] = record
+            shard.nbytes += record.nbytes
+            self._index(record, buffer.snapshot())
+            self._persist_meta(record)
+            self._persist_messages(record, buffer.snapshot())
+            self._enforce_limits(shard, keep=new_session_id)
+        with self._branches_lock:
+            self._branches.setdefault(session_id, []).append(new_session_id)
+        return record
+
+    def list_branches(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """The session's parent (if it is a branch) and the branches forked from it."""
+        record = self.get(session_id)
+        if record is None:
+            return None
+        with self._branches_lock:
+            child_ids = list(self._branches.get(session_id, ()))
+        branches = []
+        for child_id in child_ids:
+            shard = self._sessions.shard_for(child_id)
+            with shard.lock:
+                child = shard.items.get(child_id)
+                if child is not None and child.parent_id == session_id:
+                    branches.append(child.to_dict())
+        return {
+            "session_id": session_id,
+            "parent_id": record.parent_id,
+            "fork_point": record.fork_point,
+            "branches": branches,
+        }
+
+    # ── Messages ──────────────────────────────────────────────────────────
+
+    def add_message(self, session_id: str, role: str, content: str) -> ConversationMessage:
+        with self._locked(session_id) as shard:
+            self._evict_expired(shard)
+            record = self._get_or_create(shard, session_id)
+            self._mark_active(shard, record)
+            before = record.buffer.nbytes
+            msg = record.buffer.add_message(role, content)
+            shard.nbytes += record.buffer.nbytes - before
+            self._changed(shard, record)
+            self._index(record, (msg,))
+            self._persist_messages(record, (msg,))
+            self._enforce_limits(shard, keep=session_id)
+            return msg
+
+    def add_turn(
+        self, session_id: str, user_content: str, assistant_content: str
+    ) -> Tuple[ConversationMessage, ConversationMessage]:
+        """Persist a user/assistant exchange and count the turn in one lookup."""
+        with self._locked(session_id) as shard:
+            self._evict_expired(shard)
+            record = self._get_or_create(shard, session_id)
+            before = record.buffer.nbytes
+            user_msg = record.buffer.add_message("user", user_content)
+            assistant_msg = record.buffer.add_message("assistant", assistant_content)
+            shard.nbytes += record.buffer.nbytes - before
+            self._changed(shard, record)
+            self._index(record, (user_msg, assistant_msg))
+            record.touch()
+            shard.items.move_to_end(session_id)
+            self._persist_turn(record, (user_msg, assistant_msg))
+            self._enforce_limits(shard, keep=session_id)
+            return user_msg, assistant_msg
+
+    def get_history(self, session_id: str) -> Optional[Tuple[ConversationMessage, ...]]:
+        """Get an immutable snapshot of the conversation history. Returns None if session not found."""
+        with self._locked(session_id) as shard:
+            record = shard.items.get(session_id)
+            if record is None:
+                return None
+            self._mark_active(shard, record)
+            return record.buffer.snapshot()
+
+    def history_page(
+        self,
+        session_id: str,
+        before: Optional[str] = None,
+        limit: Optional[int] = None,
+        known_etags: Iterable[str] = (),
+    ) -> Optional[HistoryPage]:
+        """
+        One page of history as serialized API JSON: the ``limit`` messages just
+        older than ``before`` (the newest ones if no cursor), or all of them.
+
+        A client whose ETag (see ``SessionRecord.etag``) is in ``known_etags``
+        gets no body. Pages are cached on the record until the
+        history changes. Returns None if the session does not exist; raises
+        KeyError if the ``before`` message is not in the retained history.
+        """
+        with self._locked(session_id) as shard:
+            record = shard.items.get(session_id)
+            if record is None:
+                return None
+            revision = record.revision
+            etag = record.etag()
+            if etag in known_etags:
+                return HistoryPage(etag, None)
+            key = (before, limit)
+            if record.pages and key in record.pages:
+                return HistoryPage(etag, record.pages[key])
+            messages = record.buffer.snapshot()
+
+        # Seek and serialize outside the lock — messages is an immutable snapshot
+        end = len(messages)
+        if before is not None:
+            end = find_message(messages, before)
+            if end is None:
+                raise KeyError(before)
+        start = max(0, end - limit) if limit else 0
+        page = messages[start:end]
+        body = dumps({
+            "success": True,
+            "data": {
+                "session_id": session_id,
+                "messages": [m.model_dump() for m in page],
+                "message_count": len(page),
+                "total_messages": len(messages),
+                "has_more": start > 0,
+                "next_before": page[0].message_id if start > 0 and page else None,
+            },
+            "error": None,
+            "metadata": {"etag": etag},
+        })
+
+        shard = self._sessions.shard_for(session_id)
+        with shard.lock:
+            record = shard.items.get(session_id)
+            if record is not None and record.revision == revision:
+                before_bytes = record.nbytes
+                pages = record.pages
+                if pages is None:
+                    pages = record.pages = {}
+                elif len(pages) >= MAX_CACHED_PAGES:
+                    pages.pop(next(iter(pages)))
+                pages[key] = body
+                shard.nbytes += record.nbytes - before_bytes
+        return HistoryPage(etag, body)
+
+    def get_gemini_history(self, session_id: str, last_n: Optional[int] = None) -> List[Dict]:
+        """Get history in Gemini API format."""
+        with self._locked(session_id) as shard:
+            record = shard.items.get(session_id)
+            if record is None:
+                return []
+            msgs = record.buffer.snapshot(last_n)
+        # Build the payload outside the lock — msgs is an immutable snapshot
+        return [m.to_gemini_format() for m in msgs]
+
+    def get_relevant_history(
+        self, session_id: str, query: str, k: int, recent: int
+    ) -> Tuple[List[Dict], int]:
+        """
+        Gemini-format history: the ``k`` older turns most relevant to ``query``
+        followed by the last ``recent`` messages. Also returns how many older
+        messages were retrieved.
+        """
+        with self._locked(session_id) as shard:
+            record = shard.items.get(session_id)
+            if record is None:
+                return [], 0
+            older, latest = record.buffer.relevant(query, k, recent)
+        return [m.to_gemini_format() for m in older + latest], len(older)
+
+    # ── Rolling summary ───────────────────────────────────────────────────
+
+    def get_context(
+        self, session_id: str, last_n: Optional[int] = None
+    ) -> Tuple[Optional[str], Tuple[ConversationMessage, ...], int]:
+        """
+        The session's summary, the messages it does not cover yet (at most
+        ``last_n``), and the estimated tokens the summary stands in for.
+        """
+        with self._locked(session_id) as shard:
+            record = shard.items.get(session_id)
+            if record is None:
+                return None, (), 0
+            return record.summary, record.unsummarized(last_n), record.summary_source_tokens
+
+    def set_summary(
+        self, session_id: str, summary: str, through_message_id: str, source_tokens: int
+    ) -> bool:
+        """Store a summary covering messages up to ``through_message_id``; False if it no longer applies."""
+        with self._locked(session_id) as shard:
+            record = shard.items.get(session_id)
+            # A reset or clear while the summary was computed makes it stale
+            if record is None or not any(
+                m.message_id == through_message_id for m in record.buffer.snapshot()
+            ):
+                return False
+            before = record.nbytes
+            record.summary = summary
+            record.summary_through = through_message_id
+            record.summary_source_tokens = source_tokens
+            shard.nbytes += record.nbytes - before
+            return True
+
+    # ── Full-text search ──────────────────────────────────────────────────
+
+    def _message_content(self, session_id: str, message_id: str) -> Optional[str]:
+        """
+        A cached message's text, read in place: warm and cold records are
+        decoded without being promoted and nothing is loaded from the backend,
+        so searching never changes tiering or the LRU order.
+        """
+        shard = self._sessions.shard_for(session_id)
+        with shard.lock:
+            record = shard.items.get(session_id)
+            if record is None:
+                return None
+            source = self._stored_form(record)
+        if isinstance(source, bytes):
+            for mid, _, content, _ in unpack_messages(source):
+                if mid == message_id:
+                    return content
+            return None
+        i = find_message(source, message_id)
+        return source[i].content if i is not None else None
+
+    def search(self, text: str, limit: int = 20) -> Tuple[List[SearchDoc], int]:
+        """
+        Messages across all cached sessions matching ``text`` (words, ``prefix*``
+        and ``"exact phrases"``, ANDed), newest first. Also returns the number of
+        candidates before phrase confirmation. Raises RuntimeError if the index
+        is disabled.
+        """
+        if self._search is None:
+            raise RuntimeError("Search index is disabled (SEARCH_ENABLED=false).")
+        query = parse_query(text)
+        # Phrases are confirmed per candidate, so look a little further ahead for them
+        total, candidates = self._search.candidates(
+            query, limit * PHRASE_LOOKAHEAD if query.phrases else limit
+        )
+        hits: List[SearchDoc] = []
+        for doc in candidates:
+            if query.phrases:
+                content = self._message_content(doc.session_id, doc.message_id)
+                if content is None or not all(phrase_in(content, p) for p in query.phrases):
+                    continue
+            hits.append(doc)
+            if len(hits) >= limit:
+                break
+        return hits, total
+
+    # ── Bulk export / import ─────────────────────────────────────────────
+
+    def export_sessions(self, batch_size: int = 256) -> Iterator[StoredSession]:
+        """
+        Yield every session with its messages.
+
+        With a backend the export is read from it, ``batch_size`` sessions at
+        a time: it holds sessions evicted from the cache and the history older
+        than each cached window. Expired sessions are skipped.
+
+        Without one the cache is all there is: records are walked oldest
+        activity first per shard, holding one shard lock at a time for at most
+        ``batch_size`` records, so memory stays bounded by one batch and
+        writers are never blocked for a whole shard. Warm and cold records are
+        unpacked without promoting them.
+        """
+        if self._backend is not None:
+            cutoff = time.time() - self._ttl
+            for stored in self._backend.iter_sessions(batch_size):
+                if stored.last_active >= cutoff:
+                    yield stored
+            return
+        for shard in self._sessions.shards():
+            with shard.lock:
+                keys = list(shard.items)
+            for start in range(0, len(keys), batch_size):
+                batch = []
+                with shard.lock:
+                    for sid in islice(keys, start, start + batch_size):
+                        record = shard.items.get(sid)
+                        if record is None:
+                            continue
+                        batch.append((
+                            sid, record.created_at, record.last_active,
+                            record.message_count, record.version, self._stored_form(record),
+                        ))
+                for sid, created_at, last_active, message_count, version, source in batch:
+                    if isinstance(source, bytes):
+                        messages = [StoredMessage(*m) for m in unpack_messages(source)]
+                    else:
+                        messages = [m.to_stored() for m in source]
+                    yield StoredSession(
+                        sid, created_at, last_active, message_count, messages, version
+                    )
+
+    def import_sessions(self, sessions: Sequence[StoredSession]) -> Tuple[int, int]:
+        """
+        Bulk-load a batch of sessions, replacing any with the same id.
+
+        The full histories go to the backend (one clear + append_turn per
+        session, outside any lock, then a flush so a write-behind queue cannot
+        grow across batches); the cache keeps each session's usual window.
+        Records are grouped by shard so every shard lock is taken at most once
+        per batch. Expired sessions are skipped. Returns (imported, skipped).
+        """
+        by_shard: Dict[int, List[SessionRecord]] = {}
+        skipped = 0
+        for stored in sessions:
+            record = self._restore(stored)
+            if record is None:
+                skipped += 1
+                continue
+            if self._backend is not None:
+                self._note_version(record, self._backend.clear_session(stored.session_id))
+                self._note_version(record, self._backend.append_turn(
+                    stored.session_id, stored.messages,
+                    stored.created_at, stored.last_active, stored.message_count,
+                ))
+            by_shard.setdefault(id(self._sessions.shard_for(stored.session_id)), []).append(record)
+        if self._backend is not None:
+            self._backend.flush()
+
+        imported = 0
+        for shard in self._sessions.shards():
+            records = by_shard.get(id(shard))
+            if not records:
+                continue
+            with shard.lock:
+                for record in records:
+                    self._remove(shard, record.session_id)
+                    shard.items[record.session_id] = record
+                    shard.nbytes += record.nbytes
+                    self._index(record, record.buffer.snapshot())
+                self._enforce_limits(shard)
+            imported += len(records)
+        return imported, skipped
+
+    # ── Introspection / maintenance ──────────────────────────────────────
+
+    def count(self) -> int:
+        return len(self._sessions)
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held by all sessions."""
+        return self._sessions.total_bytes()
+
+    def tier_stats(self) -> Dict[str, Any]:
+        """Session count and resident bytes per tier, plus promotion latency."""
+        tiers = {tier: {"sessions": 0, "bytes": 0} for tier in (HOT, WARM, COLD)}
+        for shard in self._sessions.shards():
+            with shard.lock:
+                for record in shard.items.values():
+                    tiers[record.tier]["sessions"] += 1
+                    tiers[record.tier]["bytes"] += record.nbytes
+        tiers[COLD]["disk_bytes"] = self._spill.disk_bytes() if self._spill is not None else 0
+        return {
+            **tiers,
+            "codec": CODEC,
+            "warm_after_s": self._warm_after,
+            "cold_after_s": self._cold_after if self._spill is not None else None,
+            "demoted": dict(self._demoted),
+            "promotions": self._promotions.summary(),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Current usage against the configured limits."""
+        return {
+            "sessions": self.count(),
+            "max_sessions": self._max_sessions,
+            "bytes": self.memory_usage(),
+            "max_bytes": self._max_bytes,
+            "max_session_bytes": self._max_session_bytes,
+            "shards": self._sessions.num_shards,
+            "backend": self._backend.name if self._backend is not None else "memory",
+            "evicted_expired": self._evicted_expired,
+            "evicted_lru": self._evicted_lru,
+            "tiers": self.tier_stats(),
+            "search": self._search.stats() if self._search is not None else None,
+        }
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        # One shard lock at a time; each dict is a consistent snapshot
+        return [d for _, d in self._sessions.snapshot_items(SessionRecord.to_dict)]
+
+    def evict_expired(self) -> int:
+        evicted = 0
+        for shard in self._sessions.shards():
+            with shard.lock:
+                evicted += self._evict_expired(shard)
+        if self._backend is not None:
+            # Sessions that left the cache earlier can still expire on disk
+            evicted += self._backend.purge_expired(time.time() - self._ttl)
+        return evicted
+
+    def maintain(self) -> Dict[str, int]:
+        """One sweep: drop expired records, then demote idle ones. One shard lock at a time."""
+        expired = demoted = 0
+        for shard in self._sessions.shards():
+            with shard.lock:
+                expired += self._evict_expired(shard)
+                if self._warm_after:
+                    demoted += self._demote_idle(shard)
+        return {"expired": expired, "demoted": demoted}
+
+    def start_maintenance(self, interval: float):
+        """Run ``maintain()`` every ``interval`` seconds on a daemon thread."""
+        if self._janitor is not None or interval <= 0:
+            return
+
+        def run():
+            while not self._janitor_stop.wait(interval):
+                try:
+                    self.maintain()
+                except Exception as e:
+                    logger.error(f"Session maintenance sweep failed: {e}", exc_info=True)
+
+        self._janitor = threading.Thread(target=run, name="session-janitor", daemon=True)
+        self._janitor.start()
+
+    def close(self):
+        """Stop maintenance, then flush and release the storage backend and spill files."""
+        self._janitor_stop.set()
+        if self._janitor is not None:
+            self._janitor.join(timeout=5)
+        if self._backend is not None:
+            self._backend.close()
+        if self._spill is not None:
+            self._spill.close()
+
+
+# Singleton
+session_store = SessionStore()
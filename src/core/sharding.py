@@ -0,0 +1,89 @@
+"""
+Lock-striped (sharded) dictionary used by the session stores.
+Keys are spread across N shards by hash; each shard owns its own lock and dict,
+so requests for different sessions rarely contend on the same lock.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+DEFAULT_SHARDS = 16
+
+
+class Shard:
+    """
+    One stripe of a ShardedMap: a lock and the items it guards.
+    Items are kept in an OrderedDict so owners can use it as an LRU/expiry index;
+    ``nbytes`` is owner-maintained size accounting for the shard's items.
+    """
+
+    __slots__ = ("lock", "items", "nbytes")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.items: "OrderedDict[str, Any]" = OrderedDict()
+        self.nbytes = 0
+
+
+class ShardedMap:
+    """
+    A fixed set of independently locked dict shards.
+
+    Callers pick the shard for a key with ``shard_for()`` and hold
+    ``shard.lock`` while reading or mutating ``shard.items``. Operations
+    that span shards take one shard lock at a time, never several at once.
+    """
+
+    def __init__(self, num_shards: int = DEFAULT_SHARDS):
+        if num_shards < 1:
+            raise ValueError("num_shards must be >= 1")
+        self._shards: List[Shard] = [Shard() for _ in range(num_shards)]
+
+    @property
+    def num_shards(self) -> int:
+        return len(self._shards)
+
+    def shard_for(self, key: str) -> Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def shards(self) -> List[Shard]:
+        return self._shards
+
+    def __len__(self) -> int:
+        # len() of a dict is atomic under the GIL — no lock needed
+        return sum(len(s.items) for s in self._shards)
+
+    def total_bytes(self) -> int:
+        return sum(s.nbytes for s in self._shards)
+
+    def snapshot_items(
+        self, transform: Optional[Callable[[Any], Any]] = None
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Yield (key, value) pairs, copying one shard at a time under its lock.
+
+        If ``transform`` is given it is applied to each value while the shard
+        lock is held, so every yielded value is a consistent snapshot.
+        """
+        for shard in self._shards:
+            with shard.lock:
+                if transform is None:
+                    items = list(shard.items.items())
+                else:
+                    items = [(k, transform(v)) for k, v in shard.items.items()]
+            yield from items
+
+    def resized(
+        self, num_shards: int, weigh: Optional[Callable[[Any], int]] = None
+    ) -> "ShardedMap":
+        """
+        Return a new map with ``num_shards`` shards holding the same items.
+        ``weigh`` recomputes each shard's ``nbytes`` from its values.
+        """
+        new = ShardedMap(num_shards)
+        for key, value in self.snapshot_items():
+            shard = new.shard_for(key)
+            shard.items[key] = value
+            if weigh is not None:
+                shard.nbytes += weigh(value)
+        return new
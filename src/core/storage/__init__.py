@@ -0,0 +1,32 @@
+"""
+Storage backends for the session store.
+"""
+from typing import Optional
+
+from .base import StorageBackend, StoredMessage, StoredSession
+
+__all__ = ["StorageBackend", "StoredMessage", "StoredSession", "create_backend"]
+
+
+def create_backend(settings, max_messages: int) -> Optional[StorageBackend]:
+    """Build the backend selected by ``settings.session_backend`` (None = memory only)."""
+    kind = settings.session_backend.lower()
+    if kind == "memory":
+        return None
+    if kind == "sqlite":
+        from .sqlite_backend import SQLiteBackend
+        return SQLiteBackend(
+            settings.sqlite_path,
+            flush_interval_ms=settings.sqlite_flush_interval_ms,
+            flush_batch_size=settings.sqlite_flush_batch_size,
+        )
+    if kind == "redis":
+        from .redis_backend import RedisBackend
+        return RedisBackend(
+            settings.redis_url,
+            ttl=settings.session_ttl_seconds,
+            max_messages=max_messages,
+            key_prefix=settings.redis_key_prefix,
+            max_connections=settings.redis_max_connections,
+        )
+    raise ValueError(f"Unknown SESSION_BACKEND: {settings.session_backend!r}")
@@ -0,0 +1,99 @@
+"""
+Storage backend interface for the session store.
+
+The SessionStore keeps hot sessions in memory; a backend makes them durable
+(or shared) underneath it. Backends exchange plain tuples so they never
+depend on the store's in-memory classes.
+"""
+from abc import ABC, abstractmethod
+from typing import Iterator, List, NamedTuple, Optional, Sequence
+
+
+class StoredMessage(NamedTuple):
+    message_id: str
+    role: str
+    content: str
+    timestamp: float
+
+
+class StoredSession(NamedTuple):
+    session_id: str
+    created_at: float
+    last_active: float
+    message_count: int
+    messages: List[StoredMessage]
+    version: Optional[int] = None
+
+
+class StorageBackend(ABC):
+    """
+    Persistence layer underneath the in-memory session store.
+
+    Write methods may be asynchronous (write-behind); ``load_session`` must
+    observe every write previously issued for the same session.
+
+    Backends shared between processes set ``shared`` and keep a per-session
+    version counter: write methods return the new version, and the store
+    compares ``session_version()`` against its cached copy to detect writes
+    made by other workers.
+    """
+
+    name = "base"
+    shared = False
+
+    @abstractmethod
+    def load_session(self, session_id: str, last_n: Optional[int] = None) -> Optional[StoredSession]:
+        """Return the session's metadata and its last ``last_n`` messages, or None."""
+
+    @abstractmethod
+    def save_session(
+        self, session_id: str, created_at: float, last_active: float, message_count: int
+    ) -> Optional[int]:
+        """Insert or update a session's metadata."""
+
+    @abstractmethod
+    def append_messages(self, session_id: str, messages: Sequence[StoredMessage]) -> Optional[int]:
+        """Append messages to a session, in order."""
+
+    def append_turn(
+        self,
+        session_id: str,
+        messages: Sequence[StoredMessage],
+        created_at: float,
+        last_active: float,
+        message_count: int,
+    ) -> Optional[int]:
+        """Append messages and update metadata; backends may do this in one round trip."""
+        self.append_messages(session_id, messages)
+        return self.save_session(session_id, created_at, last_active, message_count)
+
+    @abstractmethod
+    def clear_session(self, session_id: str) -> Optional[int]:
+        """Remove a session's messages, keeping its metadata."""
+
+    @abstractmethod
+    def delete_session(self, session_id: str) -> None:
+        """Remove a session and its messages."""
+
+    @abstractmethod
+    def purge_expired(self, cutoff: float) -> int:
+        """Delete sessions whose last activity is older than ``cutoff``; return the count."""
+
+    def iter_sessions(self, batch_size: int = 256) -> Iterator[StoredSession]:
+        """
+        Every stored session with all the messages the backend retains, read
+        ``batch_size`` sessions at a time. Each step finishes its own reads, so
+        the iterator may be advanced from different threads.
+        """
+        raise NotImplementedError(f"The {self.name} backend cannot enumerate its sessions")
+
+    def session_version(self, session_id: str) -> Optional[int]:
+        """Current version of a session in shared storage (None if unversioned or absent)."""
+        return None
+
+    def flush(self) -> None:
+        """Block until all issued writes are durable."""
+
+    def close(self) -> None:
+        """Flush and release resources."""
+        self.flush()
@@ -0,0 +1,177 @@
+"""
+Redis session backend — shared conversation state for multi-worker deployments.
+
+Speaks the Redis protocol through redis-py, so it also runs against any
+compatible server (KeyDB, Dragonfly, a local redis-server) or an injected
+``fakeredis`` client in tests. Each session is two keys:
+
+    {prefix}:s:{session_id}  hash — created_at, last_active, message_count, ver
+    {prefix}:m:{session_id}  list — JSON-encoded messages, oldest first
+
+Every write is one pipelined round trip (RPUSH/LTRIM/EXPIRE/HSET/HINCRBY)
+and bumps ``ver``, which the store's near-cache uses to detect turns written
+by other workers. Expiry is delegated to Redis key TTLs.
+"""
+import json
+import logging
+from typing import Any, Iterator, Optional, Sequence
+
+from src.core.storage.base import StorageBackend, StoredMessage, StoredSession
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(m: StoredMessage) -> str:
+    return json.dumps(list(m), separators=(",", ":"), ensure_ascii=False)
+
+
+def _decode(raw) -> StoredMessage:
+    return StoredMessage(*json.loads(raw))
+
+
+class RedisBackend(StorageBackend):
+    """Session storage shared by every worker through a Redis-protocol server."""
+
+    name = "redis"
+    shared = True
+
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        ttl: int = 3600,
+        max_messages: int = 50,
+        key_prefix: str = "conrux",
+        max_connections: int = 32,
+        client: Any = None,
+    ):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError(
+                    "SESSION_BACKEND=redis requires the 'redis' package: pip install redis"
+                ) from e
+            pool = redis.ConnectionPool.from_url(url, max_connections=max_connections)
+            client = redis.Redis(connection_pool=pool)
+        self._redis = client
+        self._ttl = ttl
+        self._max_messages = max_messages
+        self._prefix = key_prefix
+        logger.info(f"Redis session backend ready | prefix={key_prefix}")
+
+    def _meta_key(self, session_id: str) -> str:
+        return f"{self._prefix}:s:{session_id}"
+
+    def _messages_key(self, session_id: str) -> str:
+        return f"{self._prefix}:m:{session_id}"
+
+    def _queue_meta(self, pipe, session_id, created_at, last_active, message_count):
+        key = self._meta_key(session_id)
+        pipe.hsetnx(key, "created_at", created_at)
+        pipe.hset(key, mapping={"last_active": last_active, "message_count": message_count})
+
+    def _queue_messages(self, pipe, session_id, messages):
+        if not messages:
+            return   # RPUSH needs at least one value
+        key = self._messages_key(session_id)
+        pipe.rpush(key, *[_encode(m) for m in messages])
+        pipe.ltrim(key, -self._max_messages, -1)
+
+    def _commit(self, pipe, session_id: str) -> int:
+        """Bump the session version, refresh TTLs and send the pipeline; returns the version."""
+        meta_key = self._meta_key(session_id)
+        pipe.hincrby(meta_key, "ver", 1)
+        pipe.expire(meta_key, self._ttl)
+        pipe.expire(self._messages_key(session_id), self._ttl)
+        return int(pipe.execute()[-3])
+
+    @staticmethod
+    def _stored(session_id: str, meta, raw_messages) -> StoredSession:
+        meta = {(k.decode() if isinstance(k, bytes) else k): v for k, v in meta.items()}
+        return StoredSession(
+            session_id,
+            float(meta.get("created_at", 0)),
+            float(meta.get("last_active", 0)),
+            int(meta.get("message_count", 0)),
+            [_decode(raw) for raw in raw_messages],
+            int(meta.get("ver", 0)),
+        )
+
+    # ── StorageBackend ────────────────────────────────────────────────────
+
+    def load_session(self, session_id: str, last_n: Optional[int] = None) -> Optional[StoredSession]:
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.hgetall(self._meta_key(session_id))
+        pipe.lrange(self._messages_key(session_id), -last_n if last_n else 0, -1)
+        meta, raw_messages = pipe.execute()
+        if not meta:
+            return None
+        return self._stored(session_id, meta, raw_messages)
+
+    def iter_sessions(self, batch_size: int = 256) -> Iterator[StoredSession]:
+        # SCAN is incremental: the server is never blocked walking the whole keyspace
+        meta_prefix = self._meta_key("")
+        keys = self._redis.scan_iter(match=f"{meta_prefix}*", count=batch_size)
+        while True:
+            batch = [k.decode() if isinstance(k, bytes) else k for _, k in zip(range(batch_size), keys)]
+            if not batch:
+                return
+            ids = [k[len(meta_prefix):] for k in batch]
+            pipe = self._redis.pipeline(transaction=False)
+            for session_id in ids:
+                pipe.hgetall(self._meta_key(session_id))
+                pipe.lrange(self._messages_key(session_id), 0, -1)
+            results = pipe.execute()
+            for i, session_id in enumerate(ids):
+                meta, raw_messages = results[2 * i], results[2 * i + 1]
+                if meta:   # expired between SCAN and the read
+                    yield self._stored(session_id, meta, raw_messages)
+
+    def save_session(
+        self, session_id: str, created_at: float, last_active: float, message_count: int
+    ) -> Optional[int]:
+        pipe = self._redis.pipeline(transaction=False)
+        self._queue_meta(pipe, session_id, created_at, last_active, message_count)
+        return self._commit(pipe, session_id)
+
+    def append_messages(self, session_id: str, messages: Sequence[StoredMessage]) -> Optional[int]:
+        if not messages:
+            return self.session_version(session_id)
+        pipe = self._redis.pipeline(transaction=False)
+        self._queue_messages(pipe, session_id, messages)
+        return self._commit(pipe, session_id)
+
+    def append_turn(
+        self,
+        session_id: str,
+        messages: Sequence[StoredMessage],
+        created_at: float,
+        last_active: float,
+        message_count: int,
+    ) -> Optional[int]:
+        pipe = self._redis.pipeline(transaction=False)
+        self._queue_messages(pipe, session_id, messages)
+        self._queue_meta(pipe, session_id, created_at, last_active, message_count)
+        return self._commit(pipe, session_id)
+
+    def clear_session(self, session_id: str) -> Optional[int]:
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.delete(self._messages_key(session_id))
+        return self._commit(pipe, session_id)
+
+    def delete_session(self, session_id: str) -> None:
+        self._redis.delete(self._meta_key(session_id), self._messages_key(session_id))
+
+    def purge_expired(self, cutoff: float) -> int:
+        # Redis expires keys on its own via EXPIRE
+        return 0
+
+    def session_version(self, session_id: str) -> Optional[int]:
+        ver = self._redis.hget(self._meta_key(session_id), "ver")
+        return int(ver) if ver is not None else None
+
+    def close(self) -> None:
+        try:
+            self._redis.close()
+        except Exception:
+            pass
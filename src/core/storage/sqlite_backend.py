@@ -0,0 +1,233 @@
+"""
+SQLite session backend — WAL journal, write-behind batching, indexed tail reads.
+
+Writes are queued and flushed by a background thread every
+``flush_interval_ms`` or as soon as ``flush_batch_size`` operations are
+pending, each batch in a single transaction with ``executemany``. Reads use a
+per-thread connection; WAL lets them run concurrently with the writer.
+Statements are constant SQL strings, so sqlite3's per-connection statement
+cache keeps them prepared.
+"""
+import sqlite3
+import logging
+import threading
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.core.storage.base import StorageBackend, StoredMessage, StoredSession
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id    TEXT PRIMARY KEY,
+    created_at    REAL NOT NULL,
+    last_active   REAL NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_last_active ON sessions(last_active);
+CREATE TABLE IF NOT EXISTS messages (
+    seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    role       TEXT NOT NULL,
+    content    TEXT NOT NULL,
+    timestamp  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session_seq ON messages(session_id, seq);
+"""
+
+_UPSERT_SESSION = (
+    "INSERT INTO sessions (session_id, created_at, last_active, message_count) "
+    "VALUES (?, ?, ?, ?) ON CONFLICT(session_id) DO UPDATE SET "
+    "last_active = excluded.last_active, message_count = excluded.message_count"
+)
+_INSERT_MESSAGE = (
+    "INSERT INTO messages (session_id, message_id, role, content, timestamp) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+_DELETE_MESSAGES = "DELETE FROM messages WHERE session_id = ?"
+_DELETE_SESSION = "DELETE FROM sessions WHERE session_id = ?"
+_SELECT_SESSION = (
+    "SELECT created_at, last_active, message_count FROM sessions WHERE session_id = ?"
+)
+# Walks idx_messages_session_seq backwards — O(last_n) regardless of history length
+_SELECT_TAIL = (
+    "SELECT message_id, role, content, timestamp FROM messages "
+    "WHERE session_id = ? ORDER BY seq DESC LIMIT ?"
+)
+# Keyset pagination over the primary key — no OFFSET scans on large tables
+_SELECT_SESSION_PAGE = (
+    "SELECT session_id, created_at, last_active, message_count FROM sessions "
+    "WHERE session_id > ? ORDER BY session_id LIMIT ?"
+)
+_SELECT_ALL_MESSAGES = (
+    "SELECT message_id, role, content, timestamp FROM messages "
+    "WHERE session_id = ? ORDER BY seq"
+)
+_PURGE_MESSAGES = (
+    "DELETE FROM messages WHERE session_id IN "
+    "(SELECT session_id FROM sessions WHERE last_active < ?)"
+)
+_PURGE_SESSIONS = "DELETE FROM sessions WHERE last_active < ?"
+
+# Queued operation kind → statements run for each row of that kind
+_STATEMENTS: Dict[str, Tuple[str, ...]] = {
+    "meta": (_UPSERT_SESSION,),
+    "append": (_INSERT_MESSAGE,),
+    "clear": (_DELETE_MESSAGES,),
+    "delete": (_DELETE_MESSAGES, _DELETE_SESSION),
+}
+
+
+class SQLiteBackend(StorageBackend):
+    """Durable single-node session storage in a WAL-mode SQLite file."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, flush_interval_ms: int = 50, flush_batch_size: int = 256):
+        self._path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._flush_interval = flush_interval_ms / 1000
+        self._batch_size = flush_batch_size
+
+        self._queue: List[Tuple[str, tuple]] = []
+        self._pending: Dict[str, int] = {}          # session_id → queued op count
+        self._queue_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._local = threading.local()
+
+        self._writer = self._connect(check_same_thread=False)
+        self._writer.executescript(_SCHEMA)
+        self._writer.commit()
+
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+        logger.info(f"SQLite session backend ready | path={path}")
+
+    def _connect(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self._path, check_same_thread=check_same_thread, cached_statements=64
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # ── Write-behind queue ───────────────────────────────────────────────
+
+    def _enqueue(self, kind: str, session_id: str, rows: Sequence[tuple]):
+        with self._queue_lock:
+            for row in rows:
+                self._queue.append((kind, row))
+            self._pending[session_id] = self._pending.get(session_id, 0) + len(rows)
+            full = len(self._queue) >= self._batch_size
+        if full:
+            self._wakeup.set()
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            try:
+                self._drain()
+            except Exception as e:
+                logger.error(f"SQLite write-behind flush failed: {e}", exc_info=True)
+
+    def _drain(self):
+        with self._write_lock:
+            with self._queue_lock:
+                batch, self._queue = self._queue, []
+            if not batch:
+                return
+            try:
+                with self._writer:
+                    for kind, ops in groupby(batch, key=itemgetter(0)):
+                        rows = [op[1] for op in ops]
+                        for sql in _STATEMENTS[kind]:
+                            self._writer.executemany(sql, rows)
+            finally:
+                with self._queue_lock:
+                    for _, row in batch:
+                        sid = row[0]
+                        left = self._pending.get(sid, 0) - 1
+                        if left > 0:
+                            self._pending[sid] = left
+                        else:
+                            self._pending.pop(sid, None)
+
+    # ── StorageBackend ────────────────────────────────────────────────────
+
+    def load_session(self, session_id: str, last_n: Optional[int] = None) -> Optional[StoredSession]:
+        if session_id in self._pending:
+            # Read-your-writes: push this session's queued ops to disk first
+            self._drain()
+        conn = self._reader()
+        row = conn.execute(_SELECT_SESSION, (session_id,)).fetchone()
+        if row is None:
+            return None
+        limit = last_n if last_n else -1
+        tail = conn.execute(_SELECT_TAIL, (session_id, limit)).fetchall()
+        messages = [StoredMessage(*m) for m in reversed(tail)]
+        return StoredSession(session_id, row[0], row[1], row[2], messages)
+
+    def iter_sessions(self, batch_size: int = 256) -> Iterator[StoredSession]:
+        self._drain()
+        after = ""
+        while True:
+            # Fetched in full: a cursor must not outlive the thread that opened it
+            page = self._reader().execute(_SELECT_SESSION_PAGE, (after, batch_size)).fetchall()
+            if not page:
+                return
+            for session_id, created_at, last_active, message_count in page:
+                rows = self._reader().execute(_SELECT_ALL_MESSAGES, (session_id,)).fetchall()
+                yield StoredSession(
+                    session_id, created_at, last_active, message_count,
+                    [StoredMessage(*m) for m in rows],
+                )
+            after = page[-1][0]
+
+    def save_session(
+        self, session_id: str, created_at: float, last_active: float, message_count: int
+    ) -> None:
+        self._enqueue("meta", session_id, [(session_id, created_at, last_active, message_count)])
+
+    def append_messages(self, session_id: str, messages: Sequence[StoredMessage]) -> None:
+        self._enqueue(
+            "append",
+            session_id,
+            [(session_id, m.message_id, m.role, m.content, m.timestamp) for m in messages],
+        )
+
+    def clear_session(self, session_id: str) -> None:
+        self._enqueue("clear", session_id, [(session_id,)])
+
+    def delete_session(self, session_id: str) -> None:
+        self._enqueue("delete", session_id, [(session_id,)])
+
+    def purge_expired(self, cutoff: float) -> int:
+        self._drain()
+        with self._write_lock, self._writer:
+            self._writer.execute(_PURGE_MESSAGES, (cutoff,))
+            return self._writer.execute(_PURGE_SESSIONS, (cutoff,)).rowcount
+
+    def flush(self) -> None:
+        self._drain()
+
+    def close(self) -> None:
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self._drain()
+        self._writer.close()
+        logger.info("SQLite session backend closed.")
@@ -0,0 +1,183 @@
+"""
+Tiered storage helpers for idle sessions.
+
+    hot   — ConversationMessage objects in a ring buffer (normal state)
+    warm  — messages packed into one compressed blob held in memory
+    cold  — that blob appended to a local disk segment file
+
+Compression uses lz4 when it is installed and falls back to stdlib zlib.
+Segments are append-only files owned by one process, in a directory named
+after its pid plus a random suffix; a segment is deleted once every blob
+written to it has been promoted back or released.
+"""
+import os
+import uuid
+import shutil
+import marshal
+import logging
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, NamedTuple, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import lz4.frame as _lz4
+
+    def compress(data: bytes) -> bytes:
+        return _lz4.compress(data)
+
+    def decompress(data: bytes) -> bytes:
+        return _lz4.decompress(data)
+
+    CODEC = "lz4"
+except ImportError:
+    import zlib
+
+    def compress(data: bytes) -> bytes:
+        return zlib.compress(data, 1)
+
+    def decompress(data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+    CODEC = "zlib"
+
+
+# Tier names, in order of increasing idleness
+HOT, WARM, COLD = "hot", "warm", "cold"
+
+MessageTuple = Tuple[str, str, str, float]   # (message_id, role, content, timestamp)
+
+
+def pack_messages(messages: Sequence[MessageTuple]) -> bytes:
+    """Serialize and compress message tuples into a single blob."""
+    return compress(marshal.dumps(list(messages)))
+
+
+def unpack_messages(blob: bytes) -> List[MessageTuple]:
+    return marshal.loads(decompress(blob))
+
+
+class SpillRef(NamedTuple):
+    segment: int
+    offset: int
+    length: int
+
+
+# Spill directories opened by this process (never reaped as stale by it)
+_open_dirs: Set[str] = set()
+
+
+class SegmentSpill:
+    """Append-only disk segments holding cold-session blobs for this process."""
+
+    def __init__(self, directory: str, segment_max_bytes: int = 64 * 1024 * 1024):
+        base = Path(directory)
+        self._reap_stale(base)
+        # The suffix keeps a restarted process that gets a dead one's pid off its files
+        self._dir = base / f"pid-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._dir.mkdir(parents=True)
+        _open_dirs.add(self._dir.name)
+        self._segment_max = segment_max_bytes
+        self._lock = threading.Lock()
+        self._live: Dict[int, int] = {}        # segment → live blob count
+        self._sizes: Dict[int, int] = {}       # segment → bytes written
+        self._current = 0
+        self._file = self._open(self._current)
+
+    @staticmethod
+    def _reap_stale(base: Path):
+        """
+        Remove spill directories left behind by processes that no longer exist,
+        including an earlier process that had this one's pid.
+        """
+        if not base.exists():
+            return
+        for d in base.glob("pid-*"):
+            try:
+                pid = int(d.name[4:].split("-")[0])
+                if pid == os.getpid():
+                    if d.name not in _open_dirs:
+                        shutil.rmtree(d, ignore_errors=True)
+                    continue
+                os.kill(pid, 0)
+            except (ValueError, ProcessLookupError):
+                shutil.rmtree(d, ignore_errors=True)
+            except PermissionError:
+                pass
+
+    def _path(self, segment: int) -> Path:
+        return self._dir / f"segment-{segment:06d}.bin"
+
+    def _open(self, segment: int):
+        self._live[segment] = 0
+        self._sizes[segment] = 0
+        # Offsets are counted from 0, so the file must start empty
+        return open(self._path(segment), "wb")
+
+    def write(self, blob: bytes) -> SpillRef:
+        with self._lock:
+            if self._sizes[self._current] + len(blob) > self._segment_max:
+                self._file.close()
+                self._drop_if_empty(self._current, rotating=True)
+                self._current += 1
+                self._file = self._open(self._current)
+            offset = self._sizes[self._current]
+            self._file.write(blob)
+            self._file.flush()
+            self._sizes[self._current] += len(blob)
+            self._live[self._current] += 1
+            return SpillRef(self._current, offset, len(blob))
+
+    def read(self, ref: SpillRef) -> bytes:
+        fd = os.open(self._path(ref.segment), os.O_RDONLY)
+        try:
+            return os.pread(fd, ref.length, ref.offset)
+        finally:
+            os.close(fd)
+
+    def release(self, ref: SpillRef):
+        """Mark a blob dead; its segment is deleted once nothing in it is live."""
+        with self._lock:
+            self._live[ref.segment] -= 1
+            self._drop_if_empty(ref.segment)
+
+    def _drop_if_empty(self, segment: int, rotating: bool = False):
+        if self._live.get(segment) == 0 and (segment != self._current or rotating):
+            self._path(segment).unlink(missing_ok=True)
+            self._live.pop(segment, None)
+            self._sizes.pop(segment, None)
+
+    def disk_bytes(self) -> int:
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+        shutil.rmtree(self._dir, ignore_errors=True)
+        _open_dirs.discard(self._dir.name)
+
+
+class LatencyWindow:
+    """Rolling window of recent latencies (ms) for cheap percentile reporting."""
+
+    def __init__(self, size: int = 512):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, ms: float):
+        self._samples.append(ms)
+        self.count += 1
+
+    def summary(self) -> Dict[str, Any]:
+        samples = sorted(self._samples)
+        if not samples:
+            return {"count": self.count, "avg_ms": None, "p95_ms": None, "max_ms": None}
+        return {
+            "count": self.count,
+            "avg_ms": round(sum(samples) / len(samples), 3),
+            "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+            "max_ms": round(samples[-1], 3),
+        }
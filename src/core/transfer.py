@@ -0,0 +1,135 @@
+"""
+Session export / import as gzip-compressed NDJSON.
+
+One line per session, messages inline and in order:
+
+    {"session_id": "...", "created_at": 1718000000.0, "last_active": ...,
+     "message_count": 3, "messages": [{"message_id": "...", "role": "user",
+     "content": "...", "timestamp": ...}, ...]}
+
+Both directions stream: the encoder compresses each line as it is produced
+and yields ~64 KB gzip chunks; the decoder inflates request-body chunks
+incrementally and parses complete lines only. Memory use is bounded by one
+store batch plus one line, never by the size of the dump.
+"""
+import json
+import zlib
+from typing import AsyncIterator, Iterable, Iterator, List
+
+from src.core.storage.base import StoredMessage, StoredSession
+
+CHUNK_BYTES = 64 * 1024
+# Any single line (one session) longer than this is rejected on import
+MAX_LINE_BYTES = 64 * 1024 * 1024
+# wbits for zlib that select the gzip container
+_GZIP_WBITS = 31
+
+
+class ImportFormatError(ValueError):
+    """A line of the import stream is not a valid session record."""
+
+    def __init__(self, line_no: int, reason: str):
+        super().__init__(f"line {line_no}: {reason}")
+        self.line_no = line_no
+
+
+def encode_session(session: StoredSession) -> bytes:
+    return json.dumps({
+        "session_id": session.session_id,
+        "created_at": session.created_at,
+        "last_active": session.last_active,
+        "message_count": session.message_count,
+        "messages": [m._asdict() for m in session.messages],
+    }, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+
+
+def decode_session(line: bytes, line_no: int) -> StoredSession:
+    try:
+        data = json.loads(line)
+        messages = [
+            StoredMessage(str(m["message_id"]), str(m["role"]), str(m["content"]), float(m["timestamp"]))
+            for m in data.get("messages", ())
+        ]
+        return StoredSession(
+            str(data["session_id"]),
+            float(data["created_at"]),
+            float(data["last_active"]),
+            int(data.get("message_count", len(messages))),
+            messages,
+        )
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        raise ImportFormatError(line_no, f"{type(e).__name__}: {e}") from None
+
+
+def gzip_ndjson(sessions: Iterable[StoredSession], level: int = 6) -> Iterator[bytes]:
+    """Encode sessions as NDJSON and gzip them incrementally into ~CHUNK_BYTES chunks."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _GZIP_WBITS)
+    pending: List[bytes] = []
+    size = 0
+    for session in sessions:
+        out = compressor.compress(encode_session(session))
+        if out:
+            pending.append(out)
+            size += len(out)
+            if size >= CHUNK_BYTES:
+                yield b"".join(pending)
+                pending, size = [], 0
+    pending.append(compressor.flush())
+    yield b"".join(pending)
+
+
+async def read_gzip_ndjson(
+    chunks: AsyncIterator[bytes], batch_messages: int = 5000, batch_sessions: int = 256
+) -> AsyncIterator[List[StoredSession]]:
+    """
+    Inflate a gzip NDJSON byte stream and yield sessions in batches of at most
+    ``batch_sessions`` sessions or about ``batch_messages`` messages. Blank
+    lines are ignored; a malformed line raises ImportFormatError.
+    """
+    inflater = zlib.decompressobj(_GZIP_WBITS)
+    tail = bytearray()   # the unterminated last line so far
+    line_no = 0
+    batch: List[StoredSession] = []
+    n_messages = 0
+    received = False
+
+    def parse_lines(data: bytes) -> None:
+        # Only newly inflated data is scanned; a long line is copied once when it ends
+        nonlocal tail, line_no, n_messages
+        end = data.rfind(b"\n")
+        if end < 0:
+            tail += data
+        else:
+            lines = data[:end].split(b"\n")
+            lines[0] = bytes(tail) + lines[0]
+            tail = bytearray(data[end + 1:])
+            for line in lines:
+                line_no += 1
+                if line.strip():
+                    session = decode_session(line, line_no)
+                    batch.append(session)
+                    n_messages += len(session.messages)
+        if len(tail) > MAX_LINE_BYTES:
+            raise ImportFormatError(line_no + 1, "line too long")
+
+    try:
+        async for chunk in chunks:
+            received = received or bool(chunk)
+            while chunk:
+                # Bound the inflated output per step so a highly compressible body cannot balloon
+                parse_lines(inflater.decompress(chunk, CHUNK_BYTES * 4))
+                chunk = inflater.unconsumed_tail
+                if inflater.eof and inflater.unused_data:
+                    # Concatenated gzip members (e.g. appended dumps)
+                    chunk = inflater.unused_data + chunk
+                    inflater = zlib.decompressobj(_GZIP_WBITS)
+                if len(batch) >= batch_sessions or n_messages >= batch_messages:
+                    yield batch
+                    batch, n_messages = [], 0
+        if received and not inflater.eof:
+            raise ImportFormatError(line_no + 1, "truncated gzip stream")
+        parse_lines(inflater.flush() + b"\n")
+    except zlib.error as e:
+        raise ImportFormatError(line_no + 1, f"invalid gzip data: {e}") from None
+    if batch:
+        yield batch
@@ -1,6 +1,6 @@
 """
 Pipeline Manager — Orchestrates all pipeline stages for chat processing.
-Stages: Input → Context → AI → Output
+Stages: Input → Context → AI → Output (→ Summary, when enabled)
 """
 import time
 import logging
@@ -18,17 +18,28 @@ class PipelineManager:
         2. context_stage — load conversation history
         3. ai_stage     — call Gemini
         4. output_stage — persist to memory, format result
+        5. summary_stage — schedule a background history summary (SUMMARY_ENABLED)
     """
 
     def __init__(self):
+        self._stages = None   # built by configure(), at app startup or on first use
+
+    def configure(self, summary_enabled: Optional[bool] = None):
+        """Build the stage list (SUMMARY_ENABLED adds the summary stage)."""
+        from config.settings import settings
         from src.pipeline.stages import (
             input_stage,
             context_stage,
             ai_stage,
             output_stage,
+            summary_stage,
         )
+        if summary_enabled is None:
+            summary_enabled = settings.summary_enabled
         self._stages = [input_stage, context_stage, ai_stage, output_stage]
-        logger.info("PipelineManager initialized with 4 stages.")
+        if summary_enabled:
+            self._stages.append(summary_stage)
+        logger.info(f"PipelineManager initialized with {len(self._stages)} stages.")
 
     async def run_chat(
         self,
@@ -36,6 +47,7 @@ class PipelineManager:
         session_id: Optional[str] = None,
         system_prompt: Optional[str] = None,
         temperature: Optional[float] = None,
+        tenant: str = "anonymous",
     ) -> Dict[str, Any]:
         """
         Run the full chat pipeline.
@@ -45,14 +57,21 @@ class PipelineManager:
             session_id: Optional session ID for continuity
             system_prompt: Optional system instruction override
             temperature: Optional generation temperature
+            tenant: Who the work is accounted to for fair queuing (API key id or client IP)
 
         Returns:
             Result dict with 'response', 'session_id', 'model', etc.
 
         Raises:
             ValueError: If input validation fails
+            Overloaded: If the chat queue is full or the wait for a slot times out
+            DeadlineExceeded: If the request's deadline passes between stages
             Exception: On pipeline or AI errors
         """
+        from src.core.scheduler import chat_scheduler
+        from src.core.degrade import degrade_controller
+        from src.core.deadline import run_in_thread
+
         pipeline_start = time.perf_counter()
 
         # Initial context dict
@@ -61,19 +80,14 @@ class PipelineManager:
             "session_id": session_id,
             "system_prompt": system_prompt,
             "temperature": temperature,
+            "degradation": degrade_controller.policy(),   # one level for the whole request
             "_stages": [],
         }
 
-        # Run each stage in sequence
-        for stage in self._stages:
-            stage_name = stage.__name__.split(".")[-1]
-            try:
-                ctx = stage.run(ctx)
-            except ValueError:
-                raise  # Propagate validation errors as-is
-            except Exception as e:
-                logger.error(f"Pipeline error at [{stage_name}]: {e}", exc_info=True)
-                raise RuntimeError(f"Pipeline failed at stage '{stage_name}': {e}") from e
+        # The stages block (Gemini is called synchronously), so they run on a
+        # worker thread; the scheduler bounds how many do at once and whose turn it is
+        async with chat_scheduler.slot(tenant):
+            ctx = await run_in_thread(self._run_stages, ctx)
 
         total_ms = (time.perf_counter() - pipeline_start) * 1000
         result = ctx.get("result", {})
@@ -86,3 +100,21 @@ class PipelineManager:
         )
 
         return result
+
+    def _run_stages(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        """Run each stage in sequence, stopping between stages if the request is abandoned."""
+        from src.core.deadline import ClientDisconnected, DeadlineExceeded, check_deadline
+
+        if self._stages is None:
+            self.configure()
+        for stage in self._stages:
+            stage_name = stage.__name__.split(".")[-1]
+            try:
+                check_deadline()
+                ctx = stage.run(ctx)
+            except (ValueError, DeadlineExceeded, ClientDisconnected):
+                raise  # Propagate validation errors and cancellation as-is
+            except Exception as e:
+                logger.error(f"Pipeline error at [{stage_name}]: {e}", exc_info=True)
+                raise RuntimeError(f"Pipeline failed at stage '{stage_name}': {e}") from e
+        return ctx
@@ -18,6 +18,7 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
         - history (list)           — Gemini-format history
         - system_instruction (str)
         - temperature (float, opt)
+        - degradation (Policy, opt) — may lower max_tokens or switch to the fast model
 
     Writes to context:
         - ai_response (str)        — raw model text
@@ -31,6 +32,9 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
     history = context.get("history", [])
     system_instruction = context.get("system_instruction")
     temperature = context.get("temperature")
+    policy = context.get("degradation")
+    model = (policy and policy.model) or settings.text_model
+    max_tokens = policy.max_tokens if policy else None
 
     start = time.perf_counter()
 
@@ -40,12 +44,16 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
             history=history,
             system_instruction=system_instruction,
             temperature=temperature,
+            model=model,
+            max_tokens=max_tokens,
         )
     else:
         response_text = gemini_client.generate_text_response(
             prompt=message,
             system_instruction=system_instruction,
             temperature=temperature,
+            model=model,
+            max_tokens=max_tokens,
         )
 
     elapsed_ms = (time.perf_counter() - start) * 1000
@@ -57,7 +65,7 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
 
     context.update({
         "ai_response": response_text,
-        "model_used": settings.text_model,
+        "model_used": model,
         "ai_latency_ms": round(elapsed_ms, 2),
         "_stages": context.get("_stages", []) + ["ai"],
     })
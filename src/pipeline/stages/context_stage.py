@@ -1,9 +1,12 @@
 """
 Stage 2 — Context Stage.
 Loads conversation history from memory and builds the context window for the AI.
+With RETRIEVAL_ENABLED, older turns are chosen by relevance to the new message;
+with SUMMARY_ENABLED, they arrive as a rolling summary (see summary_stage).
 """
+import time
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -20,24 +23,37 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
 
     Reads from context:
         - session_id (str)
+        - message (str)                 — used to rank older turns by relevance
         - system_prompt (str, optional) — custom override
+        - degradation (Policy, optional) — may shrink the context window
 
     Writes to context:
         - history (list)         — Gemini-format chat history
         - system_instruction (str)
-        - context_summary (dict) — message count, window size
+        - context_summary (dict) — message count, window size, summary token savings
+        - summary_due (bool)     — history is long enough to fold into the summary
     """
     from src.core.memory_manager import memory_manager
     from config.settings import settings
 
     session_id = context["session_id"]
     system_instruction = context.get("system_prompt") or DEFAULT_SYSTEM_PROMPT
+    window = settings.max_context_messages
+    policy = context.get("degradation")
+    if policy is not None and policy.context_messages:
+        window = min(window, policy.context_messages)
 
-    # Load history in Gemini format
-    history = memory_manager.get_gemini_history(
-        session_id,
-        last_n=settings.max_context_messages
-    )
+    if settings.retrieval_enabled:
+        history, summary_info = _retrieved_history(session_id, context["message"], settings, window)
+    elif settings.summary_enabled:
+        history, summary_info = _summarized_history(session_id, settings, window)
+    else:
+        # Load history in Gemini format
+        history = memory_manager.get_gemini_history(
+            session_id,
+            last_n=window
+        )
+        summary_info = {}
 
     message_count = len(history)
     logger.debug(f"[context] session={session_id} history_msgs={message_count}")
@@ -47,9 +63,58 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
         "system_instruction": system_instruction,
         "context_summary": {
             "history_message_count": message_count,
-            "context_window_limit": settings.max_context_messages,
+            "context_window_limit": window,
+            **summary_info,
         },
+        "summary_due": summary_info.get("summary_due", False),
         "_stages": context.get("_stages", []) + ["context"],
     })
 
     return context
+
+
+def _retrieved_history(
+    session_id: str, message: str, settings, window: int
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """The older turns most relevant to the new message (BM25) plus the most recent ones."""
+    from src.core.session_store import session_store
+
+    start = time.perf_counter()
+    history, retrieved = session_store.get_relevant_history(
+        session_id,
+        message,
+        k=min(settings.retrieval_top_k, window),
+        recent=min(settings.retrieval_recent_messages, window),
+    )
+    return history, {
+        "retrieved_messages": retrieved,
+        "retrieval_ms": round((time.perf_counter() - start) * 1000, 3),
+    }
+
+
+def _summarized_history(
+    session_id: str, settings, window: int
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Rolling summary (as one leading message) plus the turns it does not cover yet.
+    Flags the session for summarization once those turns exceed the token trigger.
+    """
+    from src.core.session_store import session_store
+    from src.pipeline.stages.summary_stage import estimate_tokens, summary_message
+
+    summary, recent, source_tokens = session_store.get_context(session_id, last_n=window)
+    history = [m.to_gemini_format() for m in recent]
+    recent_tokens = sum(estimate_tokens(m.content) for m in recent)
+    summary_tokens = 0
+    if summary:
+        history.insert(0, summary_message(summary))
+        summary_tokens = estimate_tokens(summary)
+
+    return history, {
+        "summary_used": bool(summary),
+        "summary_tokens": summary_tokens,
+        "history_tokens": recent_tokens + summary_tokens,
+        "tokens_saved": max(0, source_tokens - summary_tokens),
+        "summary_due": recent_tokens > settings.summary_trigger_tokens
+        and len(recent) > settings.summary_keep_recent,
+    }
@@ -2,7 +2,6 @@
 Stage 4 — Output Stage.
 Formats the AI response, saves to memory, and builds the final output dict.
 """
-import uuid
 import logging
 from typing import Dict, Any
 
@@ -24,8 +23,7 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
     Writes to context:
         - result (dict)            — final API response payload
     """
-    from src.core.memory_manager import memory_manager
-    from src.core.session_manager import session_manager
+    from src.core.session_store import session_store
 
     session_id = context["session_id"]
     user_message = context["message"]
@@ -33,19 +31,16 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
     model_used = context.get("model_used", "gemini-2.0-flash-exp")
     latency = context.get("ai_latency_ms", 0)
 
-    # Persist both turns to memory
-    memory_manager.add_message(session_id, "user", user_message)
-    memory_manager.add_message(session_id, "assistant", ai_response)
-
-    # Update session metadata
-    session_manager.touch(session_id)
-
-    message_id = str(uuid.uuid4())
+    # Persist both turns and update session metadata in one store lookup;
+    # the ids returned are the stored ones (usable for fork and ?before=)
+    user_msg, assistant_msg = session_store.add_turn(session_id, user_message, ai_response)
+    message_id = assistant_msg.message_id
 
     result = {
         "response": ai_response,
         "session_id": session_id,
         "message_id": message_id,
+        "user_message_id": user_msg.message_id,
         "model": model_used,
         "ai_latency_ms": latency,
         "pipeline_stages": context.get("_stages", []) + ["output"],
@@ -0,0 +1,130 @@
+"""
+Stage 5 — Summary Stage (optional, SUMMARY_ENABLED).
+Folds older turns into a rolling per-session summary, off the request path.
+
+The context stage flags a session once its unsummarized history exceeds
+SUMMARY_TRIGGER_TOKENS. This stage then schedules the summary on a background
+thread and returns immediately, so the response is never delayed by it; the
+next turn sends the summary as one leading message plus the recent turns.
+"""
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Set
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_PROMPT = """You maintain a running summary of a conversation between a user and an AI assistant.
+Merge the previous summary with the new turns into one concise summary written in the third person.
+Keep facts, names, numbers, decisions, user preferences and open questions. Drop greetings and filler.
+Reply with the summary only."""
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summarizer")
+_in_flight: Set[str] = set()
+_lock = threading.Lock()
+_stats = {"summaries": 0, "failures": 0, "messages_folded": 0, "latency_ms_total": 0.0}
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap offline token estimate (~4 characters per token for Gemini models)."""
+    return len(text) // 4 + 1
+
+
+def summary_message(summary: str) -> Dict[str, Any]:
+    """The leading Gemini-format history message that carries the summary."""
+    return {"role": "user", "parts": [SUMMARY_PREFIX + summary]}
+
+
+def run(context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Summary Stage: schedule a summary refresh if the context stage asked for one.
+
+    Reads from context:
+        - session_id (str)
+        - summary_due (bool)      — set by context_stage
+
+    Writes to context:
+        - result.context_info.summary_scheduled (bool)
+    """
+    session_id = context["session_id"]
+    scheduled = False
+    if context.get("summary_due"):
+        with _lock:
+            if session_id not in _in_flight:
+                _in_flight.add(session_id)
+                scheduled = True
+        if scheduled:
+            _executor.submit(_refresh, session_id)
+
+    context.get("result", {}).get("context_info", {})["summary_scheduled"] = scheduled
+    context["_stages"] = context.get("_stages", []) + ["summary"]
+    return context
+
+
+def _refresh(session_id: str):
+    try:
+        refresh(session_id)
+    except Exception as e:
+        _stats["failures"] += 1
+        logger.error(f"[summary] session={session_id} failed: {e}", exc_info=True)
+    finally:
+        with _lock:
+            _in_flight.discard(session_id)
+
+
+def refresh(session_id: str) -> bool:
+    """Fold all but the most recent SUMMARY_KEEP_RECENT unsummarized messages into the summary."""
+    from src.core.session_store import session_store
+    from src.core.gemini_client import gemini_client
+    from config.settings import settings
+
+    summary, pending, source_tokens = session_store.get_context(session_id)
+    fold = pending[:-settings.summary_keep_recent] if settings.summary_keep_recent else pending
+    if not fold:
+        return False
+
+    turns = "\n".join(
+        f"{'Assistant' if m.role == 'assistant' else 'User'}: {m.content}" for m in fold
+    )
+    prompt = (
+        f"Previous summary:\n{summary or '(none)'}\n\n"
+        f"New turns:\n{turns}\n\n"
+        f"Write the updated summary in at most {settings.summary_max_tokens} tokens."
+    )
+
+    start = time.perf_counter()
+    new_summary = gemini_client.generate_text_response(
+        prompt=prompt,
+        system_instruction=SUMMARY_SYSTEM_PROMPT,
+        temperature=0.2,
+    ).strip()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    folded_tokens = sum(estimate_tokens(m.content) for m in fold)
+    stored = session_store.set_summary(
+        session_id, new_summary, fold[-1].message_id, source_tokens + folded_tokens
+    )
+    if stored:
+        _stats["summaries"] += 1
+        _stats["messages_folded"] += len(fold)
+        _stats["latency_ms_total"] += elapsed_ms
+    logger.debug(
+        f"[summary] session={session_id} folded={len(fold)} msgs "
+        f"tokens={source_tokens + folded_tokens}→{estimate_tokens(new_summary)} "
+        f"latency={elapsed_ms:.1f}ms stored={stored}"
+    )
+    return stored
+
+
+def stats() -> Dict[str, Any]:
+    done = _stats["summaries"]
+    return {
+        "summaries": done,
+        "failures": _stats["failures"],
+        "messages_folded": _stats["messages_folded"],
+        "in_flight": len(_in_flight),
+        "avg_latency_ms": round(_stats["latency_ms_total"] / done, 2) if done else None,
+    }
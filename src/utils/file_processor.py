@@ -1,17 +1,19 @@
 """
 File processing utilities for various document formats.
+
+The format libraries (pandas, PyPDF2, python-docx, Pillow) are imported by
+the branch that needs them, so a process that never parses a document
+never pays for them.
 """
 import logging
-import io
 import json
-from typing import Dict, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
 from pathlib import Path
-import pandas as pd
-from PIL import Image
-import PyPDF2
-from docx import Document
 from config.settings import settings
 
+if TYPE_CHECKING:
+    from PIL import Image
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -71,6 +73,7 @@ class FileProcessor:
                 content = uploaded_file.read().decode('utf-8')
 
             elif file_extension == 'csv':
+                import pandas as pd
                 df = pd.read_csv(uploaded_file)
                 content = f"CSV File Analysis:\n"
                 content += f"Shape: {df.shape[0]} rows, {df.shape[1]} columns\n"
@@ -85,6 +88,7 @@ class FileProcessor:
                 content = json.dumps(json_data, indent=2, ensure_ascii=False)
 
             elif file_extension == 'pdf':
+                import PyPDF2
                 reader = PyPDF2.PdfReader(uploaded_file)
                 content = ""
                 for page_num, page in enumerate(reader.pages):
@@ -92,12 +96,14 @@ class FileProcessor:
                     content += f"--- Page {page_num + 1} ---\n{page_text}\n\n"
 
             elif file_extension == 'docx':
+                from docx import Document
                 doc = Document(uploaded_file)
                 content = ""
                 for paragraph in doc.paragraphs:
                     content += paragraph.text + "\n"
 
             elif file_extension == 'xlsx':
+                import pandas as pd
                 # Read all sheets
                 excel_file = pd.ExcelFile(uploaded_file)
                 content = f"Excel File Analysis:\n"
@@ -119,7 +125,7 @@ class FileProcessor:
             logger.error(f"Text file processing error: {str(e)}")
             return False, "", f"Failed to process file: {str(e)}"
 
-    def process_image_file(self, uploaded_file) -> Tuple[bool, Image.Image, str]:
+    def process_image_file(self, uploaded_file) -> Tuple[bool, "Image.Image", str]:
         """
         Process image files.
         
@@ -130,6 +136,7 @@ class FileProcessor:
             Tuple of (success, image, error_message)
         """
         try:
+            from PIL import Image
             image = Image.open(uploaded_file)
 
             # Convert to RGB if necessary